@@ -0,0 +1,366 @@
+"""
+Local stand-in for the Strava API used by the benchmark suite.
+
+`MockStravaServer` serves deterministic synthetic data on a local port:
+
+* `GET /api/v3/athlete/activities` (`page`, `per_page`, `after`)
+* `GET /api/v3/activities/{id}/streams` (`keys`, `resolution`)
+* `POST /oauth/token`
+
+Latency, payload size, rate-limit behaviour and a rate of injected transient
+failures (503s) are configurable, and every
+response carries `X-RateLimit-Limit`/`X-RateLimit-Usage` headers like the real
+API, so the pipeline's pacing logic is exercised as well. GET responses carry
+an `ETag`; a request whose `If-None-Match` matches it is answered with an
+empty `304 Not Modified`.
+
+Run it standalone to point a real `strava-fetcher sync` at it::
+
+    python -m benchmarks.mock_server --activities 500 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+RESOLUTION_POINTS = {"low": 100, "medium": 1000, "high": 10000}
+STREAMS_PATH = re.compile(r"^/api/v3/activities/(\d+)/streams$")
+FIRST_START = datetime(2015, 1, 1, 7, 0, tzinfo=UTC)
+
+
+@dataclass
+class MockServerConfig:
+    """Behaviour of the mock Strava API."""
+
+    activities: int = 200
+    stream_points: int = 3600
+    latency_ms: float = 0.0
+    short_limit: int = 100_000
+    daily_limit: int = 1_000_000
+    enforce_rate_limits: bool = False
+    trainer_every: int = 0
+    failure_rate: float = 0.0
+    seed: int = 0
+    stream_keys: list[str] = field(
+        default_factory=lambda: [
+            "time",
+            "distance",
+            "latlng",
+            "altitude",
+            "velocity_smooth",
+            "heartrate",
+            "cadence",
+            "watts",
+            "moving",
+            "grade_smooth",
+        ]
+    )
+
+
+def activity_start(index: int) -> datetime:
+    """Start time of the synthetic activity with the given index (0 = oldest)."""
+    return FIRST_START + timedelta(days=index // 2, hours=10 * (index % 2))
+
+
+def make_activity(index: int, trainer_every: int = 0) -> dict[str, Any]:
+    """Build a synthetic activity summary resembling Strava's payload."""
+    start = activity_start(index).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "id": 1_000_000 + index,
+        "name": f"Activity {index}",
+        "type": "Ride" if index % 3 else "Run",
+        "distance": 20_000.0 + index,
+        "moving_time": 3600,
+        "elapsed_time": 3700,
+        "total_elevation_gain": 150.0,
+        "start_date": start,
+        "start_date_local": start,
+        "timezone": "(GMT+00:00) Europe/London",
+        "average_speed": 6.5,
+        "max_speed": 12.0,
+        "has_heartrate": True,
+        "average_heartrate": 145.0,
+        "trainer": bool(trainer_every) and index % trainer_every == 0,
+        "commute": False,
+        "manual": False,
+        "private": False,
+        "start_latlng": [51.5, -0.12],
+        "map": {"id": f"a{index}", "summary_polyline": "abc", "resource_state": 2},
+    }
+
+
+def make_stream_value(key: str, i: int) -> Any:
+    """Return sample `i` of the stream `key`."""
+    if key == "time":
+        return i
+    if key == "distance":
+        return round(i * 7.1, 1)
+    if key == "latlng":
+        return [round(51.5 + i * 1e-5, 6), round(-0.12 + i * 1e-5, 6)]
+    if key == "altitude":
+        return round(100.0 + 10 * math.sin(i / 100), 1)
+    if key == "velocity_smooth":
+        return round(7.0 + (i % 10) * 0.1, 1)
+    if key == "heartrate":
+        return 130 + i % 40
+    if key == "cadence":
+        return 80 + i % 15
+    if key == "watts":
+        return 180 + i % 120
+    if key == "moving":
+        return i % 50 != 0
+    if key == "temp":
+        return 20 + i % 3
+    return round((i % 20) * 0.1, 1)
+
+
+def make_streams(keys: list[str], points: int) -> dict[str, Any]:
+    """Build a `key_by_type=true` streams payload."""
+    return {
+        key: {
+            "data": [make_stream_value(key, i) for i in range(points)],
+            "series_type": "time",
+            "original_size": points,
+            "resolution": "high",
+        }
+        for key in keys
+    }
+
+
+class MockStravaServer:
+    """Threaded HTTP server emulating the Strava endpoints used by the package."""
+
+    def __init__(self, config: MockServerConfig | None = None, port: int = 0):
+        self.config = config or MockServerConfig()
+        self.request_counts: dict[str, int] = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._short_usage = 0
+        self._daily_usage = 0
+        self._window_start = time.time()
+        self._random = random.Random(self.config.seed)
+        self._activities = [
+            make_activity(i, self.config.trainer_every)
+            for i in range(self.config.activities)
+        ]
+        self._stream_cache: dict[tuple[str, ...], bytes] = {}
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        """Port the server listens on."""
+        return self._httpd.server_address[1]
+
+    @property
+    def api_base_url(self) -> str:
+        """Value for `StravaAPISettings.api_base_url`."""
+        return f"http://127.0.0.1:{self.port}/api/v3"
+
+    @property
+    def oauth_url(self) -> str:
+        """Value for `StravaAPISettings.oauth_url`."""
+        return f"http://127.0.0.1:{self.port}/oauth"
+
+    @property
+    def total_requests(self) -> int:
+        """Number of requests served so far."""
+        with self._lock:
+            return sum(self.request_counts.values())
+
+    def reset_counters(self) -> None:
+        """Zero the request and byte counters."""
+        with self._lock:
+            self.request_counts.clear()
+            self.bytes_sent = 0
+
+    def start(self) -> "MockStravaServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockStravaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    # --- Request handling ---
+
+    def _count(self, endpoint: str, body_size: int) -> tuple[bool, dict[str, str]]:
+        """Record a request; return whether it is rate limited and the headers."""
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            self.bytes_sent += body_size
+            now = time.time()
+            if now - self._window_start >= 15 * 60:
+                self._window_start = now
+                self._short_usage = 0
+            self._short_usage += 1
+            self._daily_usage += 1
+            limited = self.config.enforce_rate_limits and (
+                self._short_usage > self.config.short_limit
+                or self._daily_usage > self.config.daily_limit
+            )
+            headers = {
+                "X-RateLimit-Limit": (
+                    f"{self.config.short_limit},{self.config.daily_limit}"
+                ),
+                "X-RateLimit-Usage": f"{self._short_usage},{self._daily_usage}",
+            }
+        return limited, headers
+
+    def inject_failure(self, endpoint: str) -> bool:
+        """Whether to answer this API request with a transient 503."""
+        if endpoint not in ("activities", "streams") or not self.config.failure_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.config.failure_rate
+
+    def list_activities(self, query: dict[str, list[str]]) -> list[dict[str, Any]]:
+        """Return one page of activities, newest first (oldest first with after)."""
+        page = int(query.get("page", ["1"])[0])
+        per_page = min(int(query.get("per_page", ["30"])[0]), 200)
+        after = query.get("after", [None])[0]
+        if after is not None:
+            after_dt = datetime.fromtimestamp(int(after), tz=UTC)
+            activities = [
+                a
+                for i, a in enumerate(self._activities)
+                if activity_start(i) > after_dt
+            ]
+        else:
+            activities = list(reversed(self._activities))
+        start = (page - 1) * per_page
+        return activities[start : start + per_page]
+
+    def streams_body(self, keys: list[str], resolution: str | None = None) -> bytes:
+        """Return the encoded streams payload for the requested keys."""
+        points = self.config.stream_points
+        if resolution in RESOLUTION_POINTS:
+            points = min(points, RESOLUTION_POINTS[resolution])
+        cache_key = (*keys, str(points))
+        if cache_key not in self._stream_cache:
+            payload = make_streams(keys, points)
+            self._stream_cache[cache_key] = json.dumps(payload).encode("utf-8")
+        return self._stream_cache[cache_key]
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(self, endpoint: str, status: int, body: bytes) -> None:
+                if server.config.latency_ms:
+                    time.sleep(server.config.latency_ms / 1000)
+                etag = None
+                if self.command == "GET" and status == 200:
+                    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        status, body = 304, b""
+                limited, headers = server._count(endpoint, len(body))
+                if limited:
+                    status, body = 429, b'{"message": "Rate Limit Exceeded"}'
+                elif server.inject_failure(endpoint):
+                    status, body = 503, b'{"message": "Service Unavailable"}'
+                elif etag is not None:
+                    headers["ETag"] = etag
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/api/v3/athlete/activities":
+                    body = json.dumps(server.list_activities(query)).encode("utf-8")
+                    self._send("activities", 200, body)
+                    return
+                match = STREAMS_PATH.match(url.path)
+                if match:
+                    keys = query.get("keys", [""])[0].split(",")
+                    keys = [k for k in keys if k] or server.config.stream_keys
+                    resolution = query.get("resolution", [None])[0]
+                    self._send("streams", 200, server.streams_body(keys, resolution))
+                    return
+                self._send("other", 404, b'{"message": "Record Not Found"}')
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                if urlparse(self.path).path == "/oauth/token":
+                    token = {
+                        "token_type": "Bearer",
+                        "access_token": "mock_access_token",
+                        "refresh_token": "mock_refresh_token",
+                        "expires_at": int(time.time()) + 6 * 3600,
+                        "expires_in": 6 * 3600,
+                    }
+                    self._send("token", 200, json.dumps(token).encode("utf-8"))
+                    return
+                self._send("other", 404, b'{"message": "Record Not Found"}')
+
+        return Handler
+
+
+def main() -> None:
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--stream-points", type=int, default=3600)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--short-limit", type=int, default=100_000)
+    parser.add_argument("--daily-limit", type=int, default=1_000_000)
+    parser.add_argument("--enforce-rate-limits", action="store_true")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = MockServerConfig(
+        activities=args.activities,
+        stream_points=args.stream_points,
+        latency_ms=args.latency_ms,
+        short_limit=args.short_limit,
+        daily_limit=args.daily_limit,
+        enforce_rate_limits=args.enforce_rate_limits,
+        failure_rate=args.failure_rate,
+    )
+    server = MockStravaServer(config, port=args.port)
+    print(f"Mock Strava API: api_base_url={server.api_base_url}")
+    print(f"                 oauth_url={server.oauth_url}")
+    try:
+        server.start()
+        server._thread.join()  # type: ignore[union-attr]
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
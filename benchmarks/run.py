@@ -0,0 +1,439 @@
+"""
+Throughput benchmarks for Strava Fetcher.
+
+Every scenario runs against temporary directories and, where it talks to the
+API, against the local `MockStravaServer`, so results are reproducible and
+never touch the real Strava API. Results are printed as JSON (one object per
+benchmark) and can be written to a file to be compared across releases::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --only full_backfill --activities 1000 --latency-ms 20
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from strava_fetcher.client import STREAM_CHUNK_SIZE
+from strava_fetcher.persistence import ActivityPersistence, PartitionedActivityStore
+from strava_fetcher.pipeline import StravaSyncPipeline
+from strava_fetcher.settings import PathSettings, Settings, StravaAPISettings
+from strava_fetcher.storage import get_storage_backend, get_stream_backend
+from strava_fetcher.streams import decode_stream_body, decode_streams
+
+from .mock_server import (
+    MockServerConfig,
+    MockStravaServer,
+    make_activity,
+    make_streams,
+)
+
+
+@dataclass
+class BenchmarkResult:
+    """Outcome of one benchmark run."""
+
+    name: str
+    seconds: float
+    items: int
+    requests: int = 0
+    params: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        result = asdict(self)
+        result["items_per_second"] = round(self.items_per_second, 2)
+        result["seconds"] = round(self.seconds, 4)
+        return result
+
+
+def _package_version() -> str:
+    try:
+        return metadata.version("strava-fetcher")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _pipeline_settings(
+    server: MockStravaServer, data_dir: Path, args: argparse.Namespace
+) -> Settings:
+    """Build settings pointing a pipeline at the mock server and `data_dir`."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    settings = Settings(
+        strava_api=StravaAPISettings(
+            client_id="benchmark",
+            client_secret="benchmark",
+            api_base_url=server.api_base_url,
+            oauth_url=server.oauth_url,
+        ),
+        paths=PathSettings(
+            data_dir=data_dir,
+            storage_format=args.storage_format,
+            stream_format=args.stream_format,
+        ),
+    )
+    settings.sync.rate_limit_per_15_minutes = server.config.short_limit
+    settings.sync.rate_limit_per_day = server.config.daily_limit
+    settings.sync.max_concurrent_requests = args.concurrency
+    settings.sync.encoding_processes = args.encoding_processes
+    # Injected failures are answered immediately; keep backoff short so the
+    # benchmark measures the sync rather than the sleeps.
+    settings.sync.retry_backoff_seconds = 0.05
+    settings.ensure_paths_exist()
+    # A valid token lets the pipeline skip the interactive authorization step.
+    token = {
+        "access_token": "mock_access_token",
+        "refresh_token": "mock_refresh_token",
+        "expires_at": int(time.time()) + 6 * 3600,
+    }
+    assert settings.paths.token_file is not None
+    settings.paths.token_file.write_text(json.dumps(token), encoding="utf-8")
+    return settings
+
+
+def _server_config(args: argparse.Namespace, activities: int) -> MockServerConfig:
+    return MockServerConfig(
+        activities=activities,
+        stream_points=args.stream_points,
+        latency_ms=args.latency_ms,
+        failure_rate=args.failure_rate,
+    )
+
+
+def bench_full_backfill(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Sync every activity and stream into an empty data directory."""
+    with MockStravaServer(_server_config(args, args.activities)) as server:
+        settings = _pipeline_settings(server, workdir / "full", args)
+        pipeline = StravaSyncPipeline(settings)
+        start = time.perf_counter()
+        pipeline.run()
+        elapsed = time.perf_counter() - start
+        return BenchmarkResult(
+            "full_backfill",
+            elapsed,
+            items=server.request_counts.get("streams", 0),
+            requests=server.total_requests,
+            params={
+                "activities": args.activities,
+                "max_write_queue_depth": pipeline.writer_stats.max_depth,
+                "write_wait_seconds": round(
+                    pipeline.writer_stats.producer_wait_seconds, 4
+                ),
+                "retries": pipeline.retry_stats.retries,
+                "failed_after_retries": pipeline.retry_stats.exhausted,
+            },
+        )
+
+
+def bench_incremental_sync(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Sync a handful of new activities on top of an existing history."""
+    new_activities = max(1, args.activities // 20)
+    data_dir = workdir / "incremental"
+    with MockStravaServer(_server_config(args, args.activities)) as server:
+        StravaSyncPipeline(_pipeline_settings(server, data_dir, args)).run()
+    total = args.activities + new_activities
+    with MockStravaServer(_server_config(args, total)) as server:
+        settings = _pipeline_settings(server, data_dir, args)
+        start = time.perf_counter()
+        StravaSyncPipeline(settings).run()
+        elapsed = time.perf_counter() - start
+        return BenchmarkResult(
+            "incremental_sync",
+            elapsed,
+            items=server.request_counts.get("streams", 0),
+            requests=server.total_requests,
+            params={"history": args.activities, "new_activities": new_activities},
+        )
+
+
+def bench_repeat_full_sync(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Re-walk the complete, unchanged activity history of an existing sync."""
+    data_dir = workdir / "repeat"
+    with MockStravaServer(_server_config(args, args.activities)) as server:
+        StravaSyncPipeline(_pipeline_settings(server, data_dir, args)).run()
+        server.reset_counters()
+        settings = _pipeline_settings(server, data_dir, args)
+        pipeline = StravaSyncPipeline(settings)
+        start = time.perf_counter()
+        pipeline.run(full=True)
+        elapsed = time.perf_counter() - start
+        cache_stats = pipeline.http_cache.stats if pipeline.http_cache else None
+        return BenchmarkResult(
+            "repeat_full_sync",
+            elapsed,
+            items=server.request_counts.get("activities", 0),
+            requests=server.total_requests,
+            params={
+                "history": args.activities,
+                "bytes_received": server.bytes_sent,
+                "pages_not_modified": cache_stats.hits if cache_stats else 0,
+            },
+        )
+
+
+def bench_replay_full_backfill(
+    args: argparse.Namespace, workdir: Path
+) -> BenchmarkResult:
+    """Replay a recorded full backfill from a cassette, without any server."""
+    cassette_file = workdir / "cassette.sqlite"
+    with MockStravaServer(_server_config(args, args.activities)) as server:
+        settings = _pipeline_settings(server, workdir / "record", args)
+        settings.strava_api.cassette_mode = "record"
+        settings.strava_api.cassette_file = cassette_file
+        StravaSyncPipeline(settings).run()
+    # The server is gone; every response now comes from the cassette.
+    settings = _pipeline_settings(server, workdir / "replay", args)
+    settings.strava_api.cassette_mode = "replay"
+    settings.strava_api.cassette_file = cassette_file
+    settings.strava_api.cassette_latency_scale = args.replay_latency_scale
+    pipeline = StravaSyncPipeline(settings)
+    start = time.perf_counter()
+    pipeline.run()
+    elapsed = time.perf_counter() - start
+    return BenchmarkResult(
+        "replay_full_backfill",
+        elapsed,
+        items=pipeline.writer_stats.written,
+        params={
+            "activities": args.activities,
+            "latency_scale": args.replay_latency_scale,
+            "cassette_bytes": cassette_file.stat().st_size,
+        },
+    )
+
+
+def _sample_stream_df(points: int) -> pd.DataFrame:
+    return decode_streams(make_streams(MockServerConfig().stream_keys, points))
+
+
+def _stream_persistence(args: argparse.Namespace, directory: Path):
+    backend = get_stream_backend(args.stream_format or args.storage_format)
+    return ActivityPersistence(None, directory, stream_backend=backend)
+
+
+def bench_stream_write(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Write stream files through the configured stream backend."""
+    persistence = _stream_persistence(args, workdir / "write_streams")
+    stream_df = _sample_stream_df(args.stream_points)
+    start = time.perf_counter()
+    for activity_id in range(args.streams):
+        persistence.write_stream(activity_id, stream_df)
+    elapsed = time.perf_counter() - start
+    return BenchmarkResult(
+        "stream_write",
+        elapsed,
+        items=args.streams,
+        params={
+            "format": persistence.stream_backend.name,
+            "points": args.stream_points,
+        },
+    )
+
+
+def bench_stream_read(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Read every stream back and sum one column, as an analytics scan would."""
+    persistence = _stream_persistence(args, workdir / "read_streams")
+    stream_df = _sample_stream_df(args.stream_points)
+    for activity_id in range(args.streams):
+        persistence.write_stream(activity_id, stream_df)
+    start = time.perf_counter()
+    total = 0.0
+    for activity_id in range(args.streams):
+        arrays = persistence.read_stream(activity_id)
+        assert arrays is not None
+        total += float(arrays["distance"].sum())
+    elapsed = time.perf_counter() - start
+    return BenchmarkResult(
+        "stream_read",
+        elapsed,
+        items=args.streams,
+        params={
+            "format": persistence.stream_backend.name,
+            "points": args.stream_points,
+        },
+    )
+
+
+def bench_stream_decode(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Convert stream payloads to DataFrames, compared with plain list columns."""
+    payload = make_streams(MockServerConfig().stream_keys, args.stream_points)
+
+    start = time.perf_counter()
+    for _ in range(args.streams):
+        legacy_df = pd.DataFrame({k: v["data"] for k, v in payload.items()})
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.streams):
+        typed_df = decode_streams(payload)
+    elapsed = time.perf_counter() - start
+
+    # From the raw response body: json.loads versus the incremental decoder.
+    body = json.dumps(payload).encode("utf-8")
+    chunks = [
+        body[i : i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)
+    ]
+    body_results = {}
+    for name, decode in (
+        ("json", lambda: decode_streams(json.loads(body))),
+        ("incremental", lambda: decode_streams(decode_stream_body(chunks))),
+    ):
+        start = time.perf_counter()
+        for _ in range(args.streams):
+            decode()
+        body_results[f"{name}_body_seconds"] = round(time.perf_counter() - start, 4)
+        tracemalloc.start()
+        decode()
+        body_results[f"{name}_body_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        "stream_decode",
+        elapsed,
+        items=args.streams,
+        params={
+            "points": args.stream_points,
+            "legacy_seconds": round(legacy_elapsed, 4),
+            "legacy_bytes": int(legacy_df.memory_usage(deep=True).sum()),
+            "typed_bytes": int(typed_df.memory_usage(deep=True).sum()),
+            "body_bytes": len(body),
+            **body_results,
+        },
+    )
+
+
+def bench_cache_load(args: argparse.Namespace, workdir: Path) -> BenchmarkResult:
+    """Load the activity cache, as a single file and as monthly partitions."""
+    backend = get_storage_backend(args.storage_format)
+    activities_df = pd.json_normalize(
+        [make_activity(i) for i in range(args.cache_activities)]
+    )
+    single = ActivityPersistence(
+        workdir / f"cache{backend.extension}", None, backend=backend
+    )
+    single.write_cache(activities_df)
+    partitioned = ActivityPersistence(
+        None,
+        None,
+        backend=backend,
+        activity_store=PartitionedActivityStore(workdir / "Activities", backend),
+    )
+    partitioned.upsert_activities(activities_df)
+
+    start = time.perf_counter()
+    single.read_cache()
+    single_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    partitioned.read_cache()
+    partitioned_elapsed = time.perf_counter() - start
+    return BenchmarkResult(
+        "cache_load",
+        single_elapsed + partitioned_elapsed,
+        items=2 * args.cache_activities,
+        params={
+            "format": backend.name,
+            "activities": args.cache_activities,
+            "single_file_seconds": round(single_elapsed, 4),
+            "partitioned_seconds": round(partitioned_elapsed, 4),
+        },
+    )
+
+
+BENCHMARKS: dict[str, Callable[[argparse.Namespace, Path], BenchmarkResult]] = {
+    "full_backfill": bench_full_backfill,
+    "incremental_sync": bench_incremental_sync,
+    "repeat_full_sync": bench_repeat_full_sync,
+    "replay_full_backfill": bench_replay_full_backfill,
+    "stream_write": bench_stream_write,
+    "stream_read": bench_stream_read,
+    "stream_decode": bench_stream_decode,
+    "cache_load": bench_cache_load,
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run Strava Fetcher benchmarks.")
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="Run only the named benchmark (repeatable).",
+    )
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--stream-points", type=int, default=3600)
+    parser.add_argument("--streams", type=int, default=100)
+    parser.add_argument("--cache-activities", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of API requests the mock server fails with a 503.",
+    )
+    parser.add_argument(
+        "--replay-latency-scale",
+        type=float,
+        default=0.0,
+        help="Replay cassettes at this multiple of the recorded response times.",
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--encoding-processes",
+        type=int,
+        default=0,
+        help="Encode fetched streams in this many worker processes.",
+    )
+    parser.add_argument("--storage-format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument(
+        "--stream-format",
+        choices=["csv", "parquet", "binary"],
+        help="Format of stream files (defaults to --storage-format).",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results to a file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="strava_bench_") as tmp:
+        for name in args.only or list(BENCHMARKS):
+            workdir = Path(tmp) / name
+            workdir.mkdir()
+            result = BENCHMARKS[name](args, workdir)
+            results.append(result.to_dict())
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    report = {
+        "version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Persistent index of the partition each cached activity is stored in.
+
+An activity whose `start_date` changed belongs to another partition file, and
+has to be dropped from its old one. Finding that partition by reading every
+partition on each run would make incremental syncs read the whole history
+again. `ActivityIndex` keeps one row per cached activity in a small SQLite
+database next to the partitions instead, so an upsert looks up only the
+activities it writes.
+"""
+
+from collections.abc import Iterable, Mapping
+
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    activity_id INTEGER PRIMARY KEY,
+    partition TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Ids looked up per query, below SQLite's limit on bound parameters.
+_LOOKUP_BATCH = 500
+
+
+class ActivityIndex(SQLiteStore):
+    """SQLite-backed map from activity id to the partition storing it."""
+
+    schema = _SCHEMA
+
+    @property
+    def is_built(self) -> bool:
+        """Whether the index has been populated from the partition files."""
+        return self._meta_value("built") is not None
+
+    def partitions(self, activity_ids: Iterable[int]) -> dict[int, str]:
+        """Return the partition of each of `activity_ids` that is indexed."""
+        ids = [int(i) for i in activity_ids]
+        found: dict[int, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), _LOOKUP_BATCH):
+                batch = ids[start : start + _LOOKUP_BATCH]
+                found.update(
+                    self._conn.execute(
+                        "SELECT activity_id, partition FROM activities "
+                        f"WHERE activity_id IN ({', '.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+        return found
+
+    def assign(self, partitions: Mapping[int, str]) -> None:
+        """Record the partition each activity is now stored in."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO activities VALUES (?, ?)",
+                ((int(i), key) for i, key in partitions.items()),
+            )
+
+    def rebuild(self, partitions: Mapping[int, str]) -> None:
+        """Replace every entry with `partitions` and mark the index as built."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM activities")
+            self._conn.executemany(
+                "INSERT INTO activities VALUES (?, ?)",
+                ((int(i), key) for i, key in partitions.items()),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('built', '1')")
@@ -0,0 +1,265 @@
+"""
+Consolidated archive of activity streams.
+
+Storing one file per activity leaves tens of thousands of small files in the
+streams directory, which is slow to list, back up and replicate on network
+storage. `StreamArchive` appends encoded streams to a few large segment files
+instead and keeps an offset index in SQLite, so that:
+
+* a single activity is read with one seek (or mapped without copying), and
+* all activities are scanned sequentially, one segment at a time.
+
+Each record in a segment starts on a 64-byte boundary with a fixed header
+(magic, activity id, payload length), so the index can be rebuilt from the
+segments alone. Re-writing an activity appends a new record and points the
+index at it; the superseded bytes stay in the segment.
+
+An index row is only committed once the bytes it points at are on disk:
+appended records are fsynced and indexed in batches of `batch_size`, and on
+`flush`. A crash may lose the records of the last batch, which are then
+fetched again, but never leaves the index pointing at bytes never written.
+"""
+
+import os
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .atomic import fsync_directory
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    activity_id INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_position ON entries (segment, offset);
+"""
+
+_RECORD_HEADER = struct.Struct("<4sqQ")
+_RECORD_MAGIC = b"SFAR"
+_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def segment_name(segment: int) -> str:
+    """Return the file name of the segment numbered `segment`."""
+    return f"segment_{segment:05d}.dat"
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """Location of one activity's encoded streams inside the archive."""
+
+    activity_id: int
+    segment: int
+    offset: int
+    length: int
+
+    @property
+    def segment_name(self) -> str:
+        """File name of the segment holding the entry."""
+        return segment_name(self.segment)
+
+
+class StreamArchive(SQLiteStore):
+    """Append-only segment files with a SQLite offset index."""
+
+    schema = _SCHEMA
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_size: int = 256 * 1024 * 1024,
+        batch_size: int = 100,
+    ):
+        super().__init__(directory / "archive_index.sqlite")
+        self.directory = directory
+        self.segment_size = segment_size
+        self.batch_size = batch_size
+        self.flushes = 0
+        # Appended records whose index rows wait for the segments' fsync.
+        self._pending: dict[int, ArchiveEntry] = {}
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / segment_name(segment)
+
+    def _segments(self) -> list[int]:
+        """Return the numbers of the segment files on disk, in order."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            int(f.stem.removeprefix("segment_"))
+            for f in self.directory.glob("segment_*.dat")
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of appended records not yet durable and indexed."""
+        with self._lock:
+            return len(self._pending)
+
+    def append(self, activity_id: int, data: bytes) -> ArchiveEntry:
+        """
+        Append the encoded streams of an activity.
+
+        The record is readable at once but only indexed on disk with its batch.
+        """
+        with self._lock:
+            segments = self._segments()
+            segment = segments[-1] if segments else 1
+            path = self._segment_path(segment)
+            start = _align(path.stat().st_size) if path.is_file() else 0
+            if start and start + _ALIGNMENT + len(data) > self.segment_size:
+                segment, start = segment + 1, 0
+                path = self._segment_path(segment)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(b"\0" * (start - f.tell()))
+                header = _RECORD_HEADER.pack(_RECORD_MAGIC, activity_id, len(data))
+                f.write(header.ljust(_ALIGNMENT, b"\0"))
+                f.write(data)
+            entry = ArchiveEntry(activity_id, segment, start + _ALIGNMENT, len(data))
+            self._pending[entry.activity_id] = entry
+            if len(self._pending) >= self.batch_size:
+                self._flush_pending()
+        return entry
+
+    def flush(self) -> None:
+        """Make the appended records durable, then commit their index rows."""
+        with self._lock:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        """Fsync the segments written to and index their records. Lock held."""
+        if not self._pending:
+            return
+        for segment in sorted({e.segment for e in self._pending.values()}):
+            with open(self._segment_path(segment), "ab") as f:
+                os.fsync(f.fileno())
+        fsync_directory(self.directory)  # New segment files.
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (
+                    (e.activity_id, e.segment, e.offset, e.length)
+                    for e in self._pending.values()
+                ),
+            )
+        self._pending.clear()
+        self.flushes += 1
+
+    def close(self) -> None:
+        """Flush pending records and close the index."""
+        self.flush()
+        super().close()
+
+    def get(self, activity_id: int) -> ArchiveEntry | None:
+        """Return the location of an activity's streams, if archived."""
+        with self._lock:
+            if int(activity_id) in self._pending:
+                return self._pending[int(activity_id)]
+            row = self._conn.execute(
+                "SELECT * FROM entries WHERE activity_id = ?", (int(activity_id),)
+            ).fetchone()
+        return ArchiveEntry(*row) if row is not None else None
+
+    def activity_ids(self) -> set[int]:
+        """Return the ids of all archived activities."""
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute("SELECT activity_id FROM entries")
+            } | set(self._pending)
+
+    def entries(self) -> list[ArchiveEntry]:
+        """Return all index entries in storage order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM entries").fetchall()
+            latest = {row[0]: ArchiveEntry(*row) for row in rows}
+            latest.update(self._pending)
+        return sorted(latest.values(), key=lambda e: (e.segment, e.offset))
+
+    def read_bytes(self, activity_id: int) -> bytes | None:
+        """Read the encoded streams of one activity."""
+        entry = self.get(activity_id)
+        if entry is None:
+            return None
+        with open(self._segment_path(entry.segment), "rb") as f:
+            f.seek(entry.offset)
+            return f.read(entry.length)
+
+    def read_buffer(self, activity_id: int) -> np.ndarray | None:
+        """Return a read-only memory-mapped view of one activity's streams."""
+        entry = self.get(activity_id)
+        if entry is None:
+            return None
+        return np.memmap(
+            self._segment_path(entry.segment),
+            dtype=np.uint8,
+            mode="r",
+            offset=entry.offset,
+            shape=(entry.length,),
+        )
+
+    def scan(self) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Yield `(activity_id, buffer)` for every archived activity.
+
+        Segments are mapped one at a time and read front to back; the buffers
+        are views into the mapping and are only valid during the scan.
+        """
+        mapped: dict[int, np.ndarray] = {}
+        for entry in self.entries():
+            if entry.segment not in mapped:
+                mapped.clear()
+                mapped[entry.segment] = np.memmap(
+                    self._segment_path(entry.segment), dtype=np.uint8, mode="r"
+                )
+            buffer = mapped[entry.segment]
+            yield entry.activity_id, buffer[entry.offset : entry.offset + entry.length]
+
+    def rebuild_index(self) -> int:
+        """
+        Re-create the offset index by walking the record headers of every segment.
+
+        Returns:
+            The number of archived activities.
+
+        """
+        self.flush()
+        latest: dict[int, ArchiveEntry] = {}
+        for segment in self._segments():
+            path = self._segment_path(segment)
+            size = path.stat().st_size
+            with open(path, "rb") as f:
+                position = 0
+                while header := f.read(_RECORD_HEADER.size):
+                    if len(header) < _RECORD_HEADER.size:
+                        break
+                    magic, activity_id, length = _RECORD_HEADER.unpack(header)
+                    offset = position + _ALIGNMENT
+                    if magic != _RECORD_MAGIC or offset + length > size:
+                        break  # truncated or corrupt tail
+                    latest[activity_id] = ArchiveEntry(
+                        activity_id, segment, offset, length
+                    )
+                    position = _align(offset + length)
+                    f.seek(position)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                (
+                    (e.activity_id, e.segment, e.offset, e.length)
+                    for e in latest.values()
+                ),
+            )
+        return len(latest)
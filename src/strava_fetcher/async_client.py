@@ -0,0 +1,175 @@
+"""
+Asyncio counterpart of the Strava API client.
+
+This module provides `AsyncStravaClient`, which exposes the same methods as
+`StravaClient` as coroutines on top of a pooled `httpx.AsyncClient`. A single
+process can therefore keep many requests in flight over a bounded set of
+keep-alive connections. The `httpx` dependency is optional and installed with
+the `async` extra (`pip install "strava-fetcher[async]"`).
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from pydantic import SecretStr
+
+from .client import STREAM_CHUNK_SIZE, BaseStravaClient, RequestControls
+from .exceptions import ConfigError
+from .models import Token
+from .settings import StravaAPISettings
+from .streams import StreamOptions, decode_stream_body_async
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without the extra
+    httpx = None  # type: ignore[assignment]
+
+
+class AsyncStravaClient(BaseStravaClient):
+    """An asyncio client for interacting with the Strava API."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        api_settings: StravaAPISettings,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int | None = None,
+        timeout_seconds: float = 30.0,
+        transport: Any = None,
+        controls: RequestControls | None = None,
+    ):
+        if httpx is None:
+            raise ConfigError(
+                "AsyncStravaClient requires 'httpx'. "
+                'Install it with: pip install "strava-fetcher[async]"'
+            )
+        super().__init__(api_settings, controls)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=(
+                max_connections
+                if max_keepalive_connections is None
+                else max_keepalive_connections
+            ),
+        )
+        self.session = httpx.AsyncClient(
+            limits=limits, timeout=timeout_seconds, transport=transport
+        )
+
+    async def __aenter__(self) -> "AsyncStravaClient":
+        """Return the client, whose connection pool is already open."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the underlying connection pool."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self.session.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        read: Callable[["httpx.Response"], Awaitable[Any]] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Send a request once the rate-limit budget allows it.
+
+        Transient failures are retried with backoff, as in `StravaClient`.
+        With `read`, the body of a successful response is streamed into
+        `read` as part of the attempt, so a connection reset while reading it
+        is retried too, and its result is returned instead.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.rate_limiter.acquire_async()
+            outcome: httpx.Response | Exception
+            try:
+                request = self.session.build_request(method, url, **kwargs)
+                outcome = await self.session.send(request, stream=read is not None)
+                if read is not None and outcome.status_code == 200:
+                    try:
+                        return await read(outcome)
+                    finally:
+                        await outcome.aclose()
+            except httpx.TransportError as e:
+                outcome = e
+            if (delay := self._should_retry(method, attempt, outcome)) is None:
+                return self._final(outcome)
+            if isinstance(outcome, httpx.Response):
+                await outcome.aclose()
+            await asyncio.sleep(delay)
+
+    async def exchange_auth_code_for_token(self, auth_code: str) -> Token:
+        """Exchange an authorization code for a full token."""
+        return self._token_from(
+            await self._request(
+                "POST", **self._token_request(self._auth_code_payload(auth_code))
+            )
+        )
+
+    async def refresh_token(self, refresh_token: SecretStr) -> Token:
+        """Refresh an expired access token."""
+        logging.info("Refreshing Strava access token.")
+        return self._token_from(
+            await self._request(
+                "POST", **self._token_request(self._refresh_payload(refresh_token))
+            )
+        )
+
+    async def get_activities(
+        self,
+        access_token: SecretStr,
+        page: int,
+        per_page: int,
+        after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch a single page of activities.
+
+        If `after` (Unix seconds) is given, only activities that started after
+        that time are listed, oldest first.
+        """
+        return self._handle_response(
+            await self._request(
+                "GET", **self._activities_request(access_token, page, per_page, after)
+            )
+        )
+
+    async def get_activity_streams(
+        self,
+        access_token: SecretStr,
+        activity_id: int,
+        options: StreamOptions | None = None,
+    ) -> dict[str, Any]:
+        """
+        Fetch the streams of a single activity (all default keys if no options).
+
+        Like `StravaClient.get_activity_streams`, the body is streamed and
+        decoded incrementally, so every stream's `data` is a float array.
+        """
+
+        async def read(response: httpx.Response) -> dict[str, Any]:
+            self.rate_limiter.update_from_headers(response.headers)
+            return await decode_stream_body_async(
+                response.aiter_bytes(STREAM_CHUNK_SIZE)
+            )
+
+        outcome = await self._request(
+            "GET",
+            read=read,
+            **self._streams_request(access_token, activity_id, options),
+        )
+        if isinstance(outcome, httpx.Response):
+            try:
+                await outcome.aread()
+                return self._handle_response(outcome)
+            finally:
+                await outcome.aclose()
+        return outcome
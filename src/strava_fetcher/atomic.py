@@ -0,0 +1,99 @@
+"""
+Crash-safe file writes.
+
+Writing straight to the final path leaves a truncated file behind if the
+process is killed part way through, and such a file is indistinguishable
+from a complete one. `atomic_write` instead writes to a temporary file in the
+same directory, flushes it to disk and renames it over the target, so the
+target holds either the old or the new content.
+
+A rename is only durable once the directory itself has been flushed. During a
+bulk backfill that would cost an extra fsync per activity, so writers that
+produce many files pass a `DirectorySync`, which flushes each touched
+directory once per batch of writes instead.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+def fsync_directory(directory: Path) -> None:
+    """Flush a directory's entries (e.g. a completed rename) to disk."""
+    if os.name == "nt":  # Directories cannot be opened (or fsynced) on Windows.
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DirectorySync:
+    """Defers and batches the directory fsyncs of many atomic writes."""
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.flushes = 0
+        self._pending: set[Path] = set()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def add(self, directory: Path) -> None:
+        """Schedule `directory` to be flushed; flush once the batch is full."""
+        with self._lock:
+            self._pending.add(directory)
+            self._writes += 1
+            if self._writes >= self.batch_size:
+                self._flush_pending()
+
+    def flush(self) -> None:
+        """Flush every directory written to since the last flush."""
+        with self._lock:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        for directory in self._pending:
+            fsync_directory(directory)
+        if self._pending:
+            self.flushes += 1
+        self._pending.clear()
+        self._writes = 0
+
+
+def atomic_write(
+    path: Path,
+    data: bytes,
+    directory_sync: DirectorySync | None = None,
+    mode: int = 0o644,
+) -> None:
+    """
+    Replace the contents of `path` with `data` atomically and durably.
+
+    Args:
+        path: The file to write. Its directory must exist.
+        data: The new contents.
+        directory_sync: Batches the flush of the directory entry; without one
+            the directory is flushed immediately.
+        mode: Permission bits of the written file.
+
+    """
+    fd, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with open(fd, "wb") as f:
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    if directory_sync is not None:
+        directory_sync.add(path.parent)
+    else:
+        fsync_directory(path.parent)
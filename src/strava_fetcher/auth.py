@@ -0,0 +1,181 @@
+"""
+In-memory management of the Strava access token during a sync.
+
+Strava access tokens expire six hours after they are issued, so a long backfill
+started with a token read once from disk begins failing with 401s part way
+through. `TokenManager` keeps the current token in memory for all workers,
+refreshes it on a background thread shortly before `expires_at`, and coalesces
+simultaneous refresh attempts (e.g. several workers receiving a 401 at once)
+into a single `/oauth/token` request.
+
+Processes sharing a token file coordinate through `TokenPersistence.lock`: a
+refresh re-reads the file under the lock and adopts a token another process
+has just saved instead of refreshing (and invalidating) it again.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+from pydantic import SecretStr
+
+from .exceptions import ConfigError
+from .models import Token
+from .persistence import TokenPersistence
+
+# Seconds to wait before retrying a failed background refresh.
+_RETRY_SECONDS = 30.0
+
+
+class TokenManager:
+    """
+    Shares one Strava token between workers and refreshes it ahead of expiry.
+
+    `refresh` exchanges a refresh token for a new token (normally
+    `StravaClient.refresh_token`); every new token is saved through
+    `persistence`. The background thread refreshes the token
+    `refresh_margin_seconds` before it expires.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[SecretStr], Token],
+        persistence: TokenPersistence | None = None,
+        refresh_margin_seconds: float = 600,
+    ):
+        self._refresh = refresh
+        self._persistence = persistence
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.refreshes = 0
+        self._token: Token | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def set(self, token: Token) -> None:
+        """Use `token` as the current token."""
+        with self._lock:
+            self._token = token
+
+    def get(self) -> Token:
+        """
+        Return the current token, refreshing it first if it has expired.
+
+        The token is loaded from the persistence layer on first use.
+        """
+        token = self._token
+        if token is None:
+            token = self._load()
+        if token.is_expired():
+            token = self.refresh(token)
+        return token
+
+    def access_token(self) -> SecretStr:
+        """Return the current access token."""
+        return self.get().access_token
+
+    def refresh(self, stale: Token | None = None) -> Token:
+        """
+        Replace `stale` with a freshly issued token and return the new token.
+
+        Concurrent callers holding the same stale token wait for a single
+        refresh: whoever gets there first refreshes, the others receive its
+        result. If the current token already differs from `stale`, it is
+        returned without a request.
+        """
+        with self._lock:
+            current = self._token
+            if current is not None and current is not stale:
+                return current
+            if current is None:
+                raise ConfigError("No Strava token available to refresh.")
+            if self._persistence is None:
+                token = self._request_refresh(current)
+            else:
+                # The file lock extends the coalescing to other processes
+                # sharing the token file: the first one refreshes, the others
+                # pick up the token it saved.
+                with self._persistence.lock():
+                    saved = self._refreshed_elsewhere(current)
+                    token = (
+                        saved if saved is not None else self._request_refresh(current)
+                    )
+            self._token = token
+            return token
+
+    def _request_refresh(self, current: Token) -> Token:
+        logging.info("Refreshing Strava access token.")
+        token = self._refresh(current.refresh_token)
+        if self._persistence is not None:
+            self._persistence.write(token)
+        self.refreshes += 1
+        return token
+
+    def _refreshed_elsewhere(self, current: Token) -> Token | None:
+        """Return a newer token saved by another process, if there is one."""
+        assert self._persistence is not None
+        saved = self._persistence.read()
+        if (
+            saved is None
+            or saved.access_token.get_secret_value()
+            == current.access_token.get_secret_value()
+            or saved.is_expired(self.refresh_margin_seconds)
+        ):
+            return None
+        logging.info("Using the Strava token refreshed by another process.")
+        return saved
+
+    def _load(self) -> Token:
+        token = self._persistence.read() if self._persistence is not None else None
+        if token is None:
+            raise ConfigError("No Strava token available. Run a sync to authorize.")
+        with self._lock:
+            if self._token is None:
+                self._token = token
+            return self._token
+
+    # --- Background refresh ---
+
+    def start(self) -> None:
+        """Refresh the token in a background thread until `stop` is called."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="token-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _seconds_until_refresh(self, token: Token) -> float:
+        return max(0.0, token.expires_at - self.refresh_margin_seconds - time.time())
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            token = self._token
+            if token is None:
+                self._stop.wait(_RETRY_SECONDS)
+                continue
+            if self._stop.wait(self._seconds_until_refresh(token)):
+                break
+            try:
+                self.refresh(token)
+            except Exception as e:
+                logging.warning(f"Background token refresh failed: {e}")
+                self._stop.wait(_RETRY_SECONDS)
+
+    def __enter__(self) -> "TokenManager":
+        """Start the background refresh thread."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop the background refresh thread."""
+        self.stop()
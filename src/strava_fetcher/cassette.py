@@ -0,0 +1,260 @@
+"""
+Recording and replaying Strava API traffic.
+
+Profiling the pipeline against the real API costs rate-limit budget and is
+never repeatable. A cassette captures the raw responses of a sync once, so it
+can be replayed any number of times on a machine without network:
+
+* `RecordingAdapter` is a pooled `requests` adapter that sends requests as
+  usual and stores every response in a `Cassette`.
+* `ReplayAdapter` answers requests from the cassette without opening a
+  connection, optionally sleeping for (a multiple of) the recorded response
+  time to simulate network latency.
+
+A `Cassette` is a SQLite file with one zlib-compressed response per request,
+indexed by method, URL path and sorted query parameters. The host is not part
+of the key, so traffic recorded against one server (e.g. the benchmark mock)
+replays under any `api_base_url`. Request bodies are not recorded; token
+responses have their secrets redacted and, on replay, their expiry moved
+forward by the time elapsed since recording, so replayed tokens stay valid.
+"""
+
+import io
+import json
+import time
+import zlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Literal
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .exceptions import CassetteError
+from .sqlite_store import SQLiteStore
+
+CassetteMode = Literal["off", "record", "replay"]
+
+# Transport options of `BaseAdapter.send`.
+_Timeout = float | tuple[float | None, float | None] | None
+_Cert = str | tuple[str, str] | None
+
+TOKEN_PATH = "/oauth/token"
+_REDACTED = "redacted-by-cassette"
+# The stored body is decoded, so transfer framing headers no longer apply.
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    elapsed REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+
+def _method_and_url(request: requests.PreparedRequest) -> tuple[str, str]:
+    """Return the method and URL of a prepared request."""
+    if request.method is None or request.url is None:
+        raise CassetteError("Cannot record or replay a request without method or URL.")
+    return request.method, request.url
+
+
+def request_key(method: str, url: str) -> str:
+    """Return the cassette key of a request: method, path and sorted query."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path}?{query}"
+
+
+class Cassette(SQLiteStore):
+    """SQLite file of recorded API responses, one per request key."""
+
+    schema = _SCHEMA
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response):
+        """Store a response; a later response for the same request replaces it."""
+        method, url = _method_and_url(request)
+        body = response.content
+        if urlsplit(url).path.endswith(TOKEN_PATH):
+            body = _redact_token(body)
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in _DROPPED_HEADERS
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    request_key(method, url),
+                    method,
+                    url,
+                    response.status_code,
+                    json.dumps(headers),
+                    zlib.compress(body),
+                    response.elapsed.total_seconds(),
+                    time.time(),
+                ),
+            )
+
+    def lookup(self, method: str, url: str) -> dict[str, Any] | None:
+        """Return the recorded response for a request, if there is one."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, elapsed, recorded_at "
+                "FROM responses WHERE key = ?",
+                (request_key(method, url),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "status": row[0],
+            "headers": json.loads(row[1]),
+            "body": zlib.decompress(row[2]),
+            "elapsed": row[3],
+            "recorded_at": row[4],
+        }
+
+    def __len__(self) -> int:
+        """Return the number of recorded responses."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def _redact_token(body: bytes) -> bytes:
+    """Replace the secrets in a token response, keeping its structure."""
+    try:
+        token = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(token, dict):
+        return body
+    for field in ("access_token", "refresh_token"):
+        if field in token:
+            token[field] = _REDACTED
+    return json.dumps(token).encode("utf-8")
+
+
+def _redate_token(body: bytes, recorded_at: float) -> bytes:
+    """Move a recorded token's expiry forward by the time since recording."""
+    try:
+        token = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(token, dict) or "expires_at" not in token:
+        return body
+    token["expires_at"] = int(token["expires_at"] + time.time() - recorded_at)
+    return json.dumps(token).encode("utf-8")
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Pooled transport adapter that records every response in a cassette."""
+
+    def __init__(self, cassette: Cassette, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: _Timeout = None,
+        verify: bool | str = True,
+        cert: _Cert = None,
+        proxies: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """Send the request over the network and record its response."""
+        response = super().send(request, stream, timeout, verify, cert, proxies)
+        self.cassette.record(request, response)
+        return response
+
+    def close(self) -> None:
+        """Close the pooled connections and the cassette."""
+        super().close()
+        self.cassette.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter serving recorded responses instead of the network.
+
+    `latency_scale` multiplies the recorded response times: 0 replays as fast
+    as possible, 1 at the speed of the recording.
+    """
+
+    def __init__(self, cassette: Cassette, latency_scale: float = 0.0):
+        super().__init__()
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+
+    def send(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: _Timeout = None,
+        verify: bool | str = True,
+        cert: _Cert = None,
+        proxies: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """
+        Return the recorded response to the request.
+
+        The transport options are accepted for compatibility and ignored.
+
+        Raises:
+            CassetteError: If the cassette holds no response to the request.
+
+        """
+        method, url = _method_and_url(request)
+        recorded = self.cassette.lookup(method, url)
+        if recorded is None:
+            key = request_key(method, url)
+            raise CassetteError(
+                f"No recorded response for {key} in {self.cassette.db_path}."
+            )
+        if self.latency_scale:
+            time.sleep(recorded["elapsed"] * self.latency_scale)
+        body = recorded["body"]
+        if urlsplit(url).path.endswith(TOKEN_PATH):
+            body = _redate_token(body, recorded["recorded_at"])
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.raw = io.BytesIO(body)
+        response.encoding = "utf-8"
+        response.url = url
+        response.request = request
+        response.elapsed = timedelta(seconds=recorded["elapsed"])
+        return response
+
+    def close(self) -> None:
+        """Close the cassette."""
+        self.cassette.close()
+
+
+def cassette_adapter(
+    mode: CassetteMode,
+    cassette_file: Path,
+    max_connections: int = 10,
+    latency_scale: float = 0.0,
+) -> BaseAdapter:
+    """Return the transport adapter recording to or replaying `cassette_file`."""
+    cassette = Cassette(cassette_file)
+    if mode == "record":
+        return RecordingAdapter(
+            cassette, pool_connections=max_connections, pool_maxsize=max_connections
+        )
+    if mode == "replay":
+        if not cassette_file.exists():
+            raise CassetteError(f"Cassette {cassette_file} does not exist.")
+        return ReplayAdapter(cassette, latency_scale)
+    raise ValueError(f"Unknown cassette mode {mode!r}.")
@@ -6,12 +6,14 @@ allowing users to configure it via command-line arguments, environment variables
 or a configuration file.
 """
 
+import asyncio
 import logging
+from datetime import datetime
 
 import click
 
 from .exceptions import StravaFetcherError
-from .pipeline import StravaSyncPipeline
+from .pipeline import StravaSyncPipeline, build_activity_persistence
 from .settings import load_settings
 
 # --- Basic Logger Setup ---
@@ -41,13 +43,46 @@ def main():
     "--client-secret",
     help="Your Strava application's Client Secret.",
 )
-def sync(config_file: str | None, client_id: str | None, client_secret: str | None):
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Walk the complete activity history instead of only new activities.",
+)
+@click.option(
+    "--rebuild-index",
+    is_flag=True,
+    help=(
+        "Re-create the stream index by scanning the streams directory "
+        "(or the stream archive's segments)."
+    ),
+)
+@click.option(
+    "--backfill-keys",
+    is_flag=True,
+    help="Fetch configured stream types missing from already stored streams.",
+)
+@click.option(
+    "--async",
+    "use_async",
+    is_flag=True,
+    help="Use the asyncio HTTP client (requires the 'async' extra).",
+)
+def sync(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    config_file: str | None,
+    client_id: str | None,
+    client_secret: str | None,
+    full: bool,
+    rebuild_index: bool,
+    backfill_keys: bool,
+    use_async: bool,
+):
     """
     Run the full data synchronization pipeline.
 
     This command will:
-    1. Fetch and cache all new activity summaries.
+    1. Fetch and cache all new activity summaries (all of them with --full).
     2. Fetch and save detailed streams for all activities that don't have them.
+    3. With --backfill-keys, add newly configured stream types to stored streams.
     """
     click.echo("Starting the Strava data synchronization pipeline...")
 
@@ -58,7 +93,15 @@ def sync(config_file: str | None, client_id: str | None, client_secret: str | No
 
         # 2. Initialize and run the pipeline
         pipeline = StravaSyncPipeline(settings)
-        pipeline.run()
+        options = {
+            "full": full,
+            "rebuild_index": rebuild_index,
+            "backfill_keys": backfill_keys,
+        }
+        if use_async:
+            asyncio.run(pipeline.run_async(**options))
+        else:
+            pipeline.run(**options)
 
         click.secho("Synchronization completed successfully!", fg="green")
 
@@ -70,5 +113,96 @@ def sync(config_file: str | None, client_id: str | None, client_secret: str | No
         click.secho(f"An unexpected error occurred: {e}", fg="red", err=True)
 
 
+@main.command("migrate-streams")
+@click.option(
+    "--config-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Path to a YAML configuration file.",
+)
+@click.option(
+    "--delete-files",
+    is_flag=True,
+    help="Delete each stream file from the streams directory once archived.",
+)
+def migrate_streams(config_file: str | None, delete_files: bool):
+    """
+    Move per-activity stream files into the consolidated stream archive.
+
+    Streams already in the archive are skipped, so the command can be re-run
+    after an interruption. Set `stream_layout: archive` in the configuration
+    to have subsequent syncs write to the archive.
+    """
+    try:
+        settings = load_settings(config_file)
+        settings.paths.stream_layout = "archive"
+        persistence = build_activity_persistence(settings)
+        try:
+            count = persistence.migrate_streams_to_archive(delete_files=delete_files)
+        finally:
+            persistence.close()
+        click.secho(
+            f"Archived {count} stream files into {settings.paths.stream_archive_dir}",
+            fg="green",
+        )
+    except StravaFetcherError as e:
+        click.secho(f"A pipeline error occurred: {e}", fg="red", err=True)
+    except Exception as e:
+        click.secho(f"An unexpected error occurred: {e}", fg="red", err=True)
+
+
+@main.command("retry-failed")
+@click.option(
+    "--config-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Path to a YAML configuration file.",
+)
+@click.option(
+    "--include-permanent",
+    is_flag=True,
+    help="Also retry activities that failed with 403, 404 or 410.",
+)
+@click.option(
+    "--list",
+    "list_only",
+    is_flag=True,
+    help="Only list the recorded failures, without retrying them.",
+)
+def retry_failed(config_file: str | None, include_permanent: bool, list_only: bool):
+    """
+    Retry fetching streams that failed during earlier syncs.
+
+    Regular syncs skip activities whose streams could not be fetched:
+    permanent failures (private or deleted activities) for good, transient
+    ones until their next scheduled attempt. This command retries them now.
+    """
+    try:
+        settings = load_settings(config_file)
+        pipeline = StravaSyncPipeline(settings)
+        if list_only:
+            records = pipeline.failures.records()
+            pipeline.close()
+            for record in records:
+                failed_at = datetime.fromtimestamp(record.last_failed_at)
+                kind = "permanent" if record.permanent else "transient"
+                click.echo(
+                    f"{record.activity_id}\t{record.status_code or '-'}\t{kind}\t"
+                    f"{record.attempts} attempts\t{failed_at:%Y-%m-%d %H:%M}\t"
+                    f"{record.error}"
+                )
+            click.echo(f"{len(records)} failed activities.")
+            return
+        recovered = pipeline.retry_failed(include_permanent=include_permanent)
+        remaining = len(pipeline.failures.failed_ids(include_permanent=True))
+        pipeline.failures.close()
+        click.secho(
+            f"Fetched streams for {recovered} activities; {remaining} still failed.",
+            fg="green",
+        )
+    except StravaFetcherError as e:
+        click.secho(f"A pipeline error occurred: {e}", fg="red", err=True)
+    except Exception as e:
+        click.secho(f"An unexpected error occurred: {e}", fg="red", err=True)
+
+
 if __name__ == "__main__":
     main()
@@ -6,26 +6,66 @@ all HTTP requests, handling responses, and raising appropriate exceptions
 for any API errors.
 """
 
+import json
 import logging
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
 from typing import Any
 
 import requests
 from pydantic import SecretStr
+from requests.adapters import BaseAdapter, HTTPAdapter
 
 from .exceptions import APIError, ConfigError, RateLimitError, UnauthorizedError
+from .http_cache import HTTPCache
 from .models import Token
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, RetryStats
 from .settings import StravaAPISettings
+from .streams import StreamOptions, decode_stream_body
 
-STRAVA_API_BASE_URL = "https://www.strava.com/api/v3"
-STRAVA_OAUTH_URL = "https://www.strava.com/oauth"
+# Size of the response body chunks fed to the incremental stream decoder.
+STREAM_CHUNK_SIZE = 64 * 1024
 
+# Transport failures worth retrying, including a connection reset while a
+# streamed body is being read.
+_TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
 
-class StravaClient:
-    """A client for interacting with the Strava API."""
 
-    def __init__(self, api_settings: StravaAPISettings):
+@dataclass(frozen=True)
+class RequestControls:
+    """How a client paces and retries its requests, and where it counts retries."""
+
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    retry_stats: RetryStats = field(default_factory=RetryStats)
+
+
+class BaseStravaClient:
+    """
+    Transport-independent parts of a Strava API client.
+
+    Builds requests, maps HTTP status codes onto the package's exception
+    hierarchy and decides which failures to retry, so the blocking and
+    asyncio clients behave the same. Clients sharing `controls` share one
+    rate-limit budget.
+    """
+
+    def __init__(
+        self, api_settings: StravaAPISettings, controls: RequestControls | None = None
+    ):
+        controls = controls if controls is not None else RequestControls()
         self.api_settings = api_settings
-        self.session = requests.Session()
+        self.api_base_url = api_settings.api_base_url.rstrip("/")
+        self.oauth_url = api_settings.oauth_url.rstrip("/")
+        self.rate_limiter = controls.rate_limiter
+        self.retry_policy = controls.retry_policy
+        self.retry_stats = controls.retry_stats
 
     def _get_required_client_id(self) -> str:
         if self.api_settings.client_id is None:
@@ -37,86 +77,284 @@ class StravaClient:
             raise ConfigError("Strava Client Secret is not configured.")
         return self.api_settings.client_secret.get_secret_value()
 
-    def _handle_response(self, response: requests.Response) -> Any:
-        """Handle the response from the Strava API, raising exceptions for errors."""
-        if response.status_code == 401:
+    def _raise_for_status(
+        self, status_code: int, text: str, headers: Mapping[str, str]
+    ) -> None:
+        """Record the reported rate-limit usage and raise for failed responses."""
+        self.rate_limiter.update_from_headers(headers)
+        if status_code == 401:
             raise UnauthorizedError()
-        if response.status_code == 429:
+        if status_code == 429:
+            self.rate_limiter.mark_exhausted()
             raise RateLimitError()
-        if not response.ok:
-            raise APIError(response.status_code, response.text)
+        if not 200 <= status_code < 400:
+            raise APIError(status_code, text)
+
+    def _handle_response(self, response: Any) -> Any:
+        """Handle the response from the Strava API, raising exceptions for errors."""
+        self._raise_for_status(response.status_code, response.text, response.headers)
         return response.json()
 
+    def _token_from(self, response: Any) -> Token:
+        """Return the token granted by a response of the token endpoint."""
+        return Token(**self._handle_response(response))
+
+    def _should_retry(self, method: str, attempt: int, outcome: Any) -> float | None:
+        """
+        Return how long to wait before retrying an attempt, or None to stop.
+
+        `outcome` is the response of the attempt, or the transport error it
+        raised. Transport errors and the statuses in
+        `retry_policy.retry_statuses` are transient; only GET requests are
+        retried, so the token endpoint is never called twice for one refresh.
+        """
+        if isinstance(outcome, BaseException):
+            reason, headers = type(outcome).__name__, None
+        elif outcome.status_code in self.retry_policy.retry_statuses:
+            reason, headers = str(outcome.status_code), outcome.headers
+        else:
+            return None
+        if method != "GET":
+            return None
+        if headers is not None:
+            self.rate_limiter.update_from_headers(headers)
+        delay = self.retry_policy.next_delay(attempt, headers)
+        if delay is None:
+            self.retry_stats.record_exhausted()
+            return None
+        self.retry_stats.record_retry(reason)
+        logging.warning(
+            f"Transient Strava API failure ({reason}); retrying in {delay:.1f}s."
+        )
+        return delay
+
+    @staticmethod
+    def _final(outcome: Any) -> Any:
+        """Return the response of the last attempt, or raise its error."""
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    @staticmethod
+    def _auth_headers(access_token: SecretStr) -> dict[str, str]:
+        return {"Authorization": f"Bearer {access_token.get_secret_value()}"}
+
+    def _auth_code_payload(self, auth_code: str) -> dict[str, str]:
+        return {
+            "client_id": self._get_required_client_id(),
+            "client_secret": self._get_required_client_secret(),
+            "code": auth_code,
+            "grant_type": "authorization_code",
+        }
+
+    def _refresh_payload(self, refresh_token: SecretStr) -> dict[str, str]:
+        return {
+            "client_id": self._get_required_client_id(),
+            "client_secret": self._get_required_client_secret(),
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token.get_secret_value(),
+        }
+
+    def _token_request(self, payload: dict[str, str]) -> dict[str, Any]:
+        """Return the arguments of a POST to the token endpoint."""
+        return {"url": f"{self.oauth_url}/token", "data": payload}
+
+    def _activities_request(
+        self, access_token: SecretStr, page: int, per_page: int, after: int | None
+    ) -> dict[str, Any]:
+        """Return the arguments of a GET of one page of the activity listing."""
+        params = {"page": page, "per_page": per_page}
+        if after is not None:
+            params["after"] = after
+        return {
+            "url": f"{self.api_base_url}/athlete/activities",
+            "headers": self._auth_headers(access_token),
+            "params": params,
+        }
+
+    def _streams_request(
+        self, access_token: SecretStr, activity_id: int, options: StreamOptions | None
+    ) -> dict[str, Any]:
+        """Return the arguments of a GET of an activity's streams."""
+        return {
+            "url": f"{self.api_base_url}/activities/{activity_id}/streams",
+            "headers": self._auth_headers(access_token),
+            "params": (options or StreamOptions()).params(),
+        }
+
     def get_authorization_url(self) -> str:
         """Construct the Strava authorization URL for the user."""
         redirect_uri = "http://localhost"
         scope = "profile:read_all,activity:read_all"
         return (
-            f"{STRAVA_OAUTH_URL}/authorize?"
+            f"{self.oauth_url}/authorize?"
             f"client_id={self._get_required_client_id()}"
             f"&response_type=code&redirect_uri={redirect_uri}"
             f"&approval_prompt=force&scope={scope}"
         )
 
+
+class StravaClient(BaseStravaClient):
+    """
+    A client for interacting with the Strava API.
+
+    With an `http_cache`, activity listing pages are revalidated with
+    conditional requests and served from disk when unchanged. A custom
+    transport `adapter` (e.g. one recording or replaying a cassette) replaces
+    the pooled HTTP adapter.
+    """
+
+    def __init__(
+        self,
+        api_settings: StravaAPISettings,
+        *,
+        max_connections: int = 10,
+        controls: RequestControls | None = None,
+        http_cache: HTTPCache | None = None,
+        adapter: BaseAdapter | None = None,
+    ):
+        super().__init__(api_settings, controls)
+        self.http_cache = http_cache
+        self.session = requests.Session()
+        # Size the connection pool so concurrent workers can reuse keep-alive
+        # connections instead of opening (and discarding) new ones.
+        if adapter is None:
+            adapter = HTTPAdapter(
+                pool_connections=max_connections, pool_maxsize=max_connections
+            )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """Close the pooled connections and the transport adapter."""
+        self.session.close()
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        read: Callable[[requests.Response], Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Send a request once the rate-limit budget allows it.
+
+        Transient failures (connection errors, timeouts and the statuses in
+        `retry_policy.retry_statuses`) are retried with backoff; the response
+        of the last attempt is returned. With `read`, the body of a successful
+        response is streamed into `read` as part of the attempt, so a
+        connection reset while reading it is retried too, and its result is
+        returned instead.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.rate_limiter.acquire()
+            outcome: requests.Response | Exception
+            try:
+                outcome = self.session.request(
+                    method, url, stream=read is not None, **kwargs
+                )
+                if read is not None and outcome.status_code == 200:
+                    with outcome:
+                        return read(outcome)
+            except _TRANSIENT_ERRORS as e:
+                outcome = e
+            if (delay := self._should_retry(method, attempt, outcome)) is None:
+                return self._final(outcome)
+            if isinstance(outcome, requests.Response):
+                outcome.close()
+            time.sleep(delay)
+
+    def _cached_get(
+        self, url: str, headers: dict[str, str], params: dict[str, Any]
+    ) -> Any:
+        """
+        GET a JSON resource, revalidating a cached copy if there is one.
+
+        A `304 Not Modified` answer is served from the cache; a fresh answer
+        with an `ETag` or `Last-Modified` validator replaces the cached copy.
+
+        Raises:
+            APIError: On a 304 answer without a cached copy to serve, e.g. one
+                replayed from a cassette recorded with a since-evicted cache.
+
+        """
+        key = cached = None
+        if self.http_cache is not None:
+            key = self.http_cache.key(url, params, headers["Authorization"])
+            cached = self.http_cache.get(key)
+            if cached is not None:
+                headers.update(cached.conditional_headers())
+        response = self._request("GET", url, headers=headers, params=params)
+        if response.status_code == 304:
+            self.rate_limiter.update_from_headers(response.headers)
+            if self.http_cache is None or key is None or cached is None:
+                raise APIError(304, f"Not Modified, but no cached copy of {url}.")
+            self.http_cache.touch(key, cached)
+            return json.loads(cached.body)
+        data = self._handle_response(response)
+        if self.http_cache is not None and key is not None:
+            self.http_cache.put(key, url, response.headers, response.content)
+        return data
+
     def exchange_auth_code_for_token(self, auth_code: str) -> Token:
         """Exchange an authorization code for a full token."""
-        response = self.session.post(
-            f"{STRAVA_OAUTH_URL}/token",
-            data={
-                "client_id": self._get_required_client_id(),
-                "client_secret": self._get_required_client_secret(),
-                "code": auth_code,
-                "grant_type": "authorization_code",
-            },
+        return self._token_from(
+            self._request(
+                "POST", **self._token_request(self._auth_code_payload(auth_code))
+            )
         )
-        token_data = self._handle_response(response)
-        return Token(**token_data)
 
     def refresh_token(self, refresh_token: SecretStr) -> Token:
         """Refresh an expired access token."""
         logging.info("Refreshing Strava access token.")
-        response = self.session.post(
-            f"{STRAVA_OAUTH_URL}/token",
-            data={
-                "client_id": self._get_required_client_id(),
-                "client_secret": self._get_required_client_secret(),
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token.get_secret_value(),
-            },
+        return self._token_from(
+            self._request(
+                "POST", **self._token_request(self._refresh_payload(refresh_token))
+            )
         )
-        token_data = self._handle_response(response)
-        return Token(**token_data)
 
     def get_activities(
-        self, access_token: SecretStr, page: int, per_page: int
+        self,
+        access_token: SecretStr,
+        page: int,
+        per_page: int,
+        after: int | None = None,
     ) -> list[dict[str, Any]]:
-        """Fetch a single page of activities."""
-        response = self.session.get(
-            f"{STRAVA_API_BASE_URL}/athlete/activities",
-            headers={"Authorization": f"Bearer {access_token.get_secret_value()}"},
-            params={"page": page, "per_page": per_page},
+        """
+        Fetch a single page of activities.
+
+        If `after` (Unix seconds) is given, only activities that started after
+        that time are listed, oldest first.
+        """
+        return self._cached_get(
+            **self._activities_request(access_token, page, per_page, after)
         )
-        return self._handle_response(response)
 
     def get_activity_streams(
-        self, access_token: SecretStr, activity_id: int
+        self,
+        access_token: SecretStr,
+        activity_id: int,
+        options: StreamOptions | None = None,
     ) -> dict[str, Any]:
-        """Fetch the streams for a single activity."""
-        stream_keys = [
-            "time",
-            "distance",
-            "latlng",
-            "altitude",
-            "velocity_smooth",
-            "heartrate",
-            "cadence",
-            "watts",
-            "moving",
-            "grade_smooth",
-        ]
-        response = self.session.get(
-            f"{STRAVA_API_BASE_URL}/activities/{activity_id}/streams",
-            headers={"Authorization": f"Bearer {access_token.get_secret_value()}"},
-            params={"keys": ",".join(stream_keys), "key_by_type": "true"},
+        """
+        Fetch the streams of a single activity (all default keys if no options).
+
+        The body is streamed and decoded incrementally, so every stream's
+        `data` is returned as a float array rather than a list.
+        """
+
+        def read(response: requests.Response) -> dict[str, Any]:
+            self.rate_limiter.update_from_headers(response.headers)
+            return decode_stream_body(response.iter_content(STREAM_CHUNK_SIZE))
+
+        outcome = self._request(
+            "GET",
+            read=read,
+            **self._streams_request(access_token, activity_id, options),
         )
-        return self._handle_response(response)
+        if isinstance(outcome, requests.Response):
+            with outcome:
+                return self._handle_response(outcome)
+        return outcome
@@ -39,3 +39,11 @@ class UnauthorizedError(APIError):
         self, message: str = "Unauthorized. The access token may be invalid or expired."
     ):
         super().__init__(status_code=401, message=message)
+
+
+class CassetteError(StravaFetcherError):
+    """Raised when a request cannot be replayed from a recorded cassette."""
+
+
+class StreamMismatchError(StravaFetcherError):
+    """Raised when fetched streams do not line up with the stored ones."""
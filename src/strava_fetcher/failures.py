@@ -0,0 +1,168 @@
+"""
+Persistent record of stream fetches that failed.
+
+An activity whose streams could not be fetched still looks "missing" to the
+next sync, so without a record of the failure it is requested again on every
+run. `FailureStore` keeps one row per failing activity with the last status
+code, the error and the number of failed attempts, and classifies it:
+
+* Permanent failures (403 for private activities, 404/410 for deleted ones)
+  are skipped by regular syncs for good; `strava-fetcher retry-failed
+  --include-permanent` still retries them on request.
+* Transient failures are retried on an exponential schedule: after the n-th
+  failed attempt, not before `retry_seconds * 2 ** (n - 1)` have passed,
+  capped at `max_retry_seconds`.
+
+A successful fetch removes the activity from the store.
+"""
+
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from .exceptions import APIError
+from .sqlite_store import SQLiteStore
+
+PERMANENT_STATUSES = frozenset({403, 404, 410})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    activity_id INTEGER PRIMARY KEY,
+    status_code INTEGER,
+    error TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    permanent INTEGER NOT NULL,
+    first_failed_at REAL NOT NULL,
+    last_failed_at REAL NOT NULL,
+    next_attempt_at REAL
+);
+"""
+
+
+@dataclass(frozen=True)
+class FailureRecord:
+    """The failure history of one activity's stream fetch."""
+
+    activity_id: int
+    status_code: int | None
+    error: str
+    attempts: int
+    permanent: bool
+    first_failed_at: float
+    last_failed_at: float
+    next_attempt_at: float | None
+
+
+class FailureStore(SQLiteStore):
+    """SQLite-backed dead-letter store of failed stream fetches."""
+
+    schema = _SCHEMA
+
+    def __init__(
+        self,
+        db_path: Path,
+        retry_seconds: float = 3600,
+        max_retry_seconds: float = 7 * 24 * 3600,
+    ):
+        super().__init__(db_path)
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.max_retry_seconds, self.retry_seconds * 2 ** (attempts - 1))
+
+    def record(
+        self, activity_id: int, error: Exception, now: float | None = None
+    ) -> FailureRecord:
+        """Record a failed attempt and schedule the next one."""
+        now = time.time() if now is None else now
+        status_code = error.status_code if isinstance(error, APIError) else None
+        permanent = status_code in PERMANENT_STATUSES
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts, first_failed_at FROM failures WHERE activity_id = ?",
+                (int(activity_id),),
+            ).fetchone()
+            attempts, first_failed_at = (row[0] + 1, row[1]) if row else (1, now)
+            record = FailureRecord(
+                activity_id=int(activity_id),
+                status_code=status_code,
+                error=str(error),
+                attempts=attempts,
+                permanent=permanent,
+                first_failed_at=first_failed_at,
+                last_failed_at=now,
+                next_attempt_at=(
+                    None if permanent else now + self._retry_delay(attempts)
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.activity_id,
+                    record.status_code,
+                    record.error,
+                    record.attempts,
+                    int(record.permanent),
+                    record.first_failed_at,
+                    record.last_failed_at,
+                    record.next_attempt_at,
+                ),
+            )
+        return record
+
+    def clear(self, activity_ids: Iterable[int]) -> None:
+        """Forget the failures of activities whose streams are now stored."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM failures WHERE activity_id = ?",
+                ((int(i),) for i in activity_ids),
+            )
+
+    def skipped_ids(self, now: float | None = None) -> set[int]:
+        """Return the activities a regular sync should not request now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT activity_id FROM failures "
+                    "WHERE permanent = 1 OR next_attempt_at > ?",
+                    (now,),
+                )
+            }
+
+    def failed_ids(
+        self, include_permanent: bool = False, failed_before: float | None = None
+    ) -> list[int]:
+        """
+        Return the recorded activities, regardless of their retry schedule.
+
+        Args:
+            include_permanent: Also return activities that failed permanently.
+            failed_before: Only return activities whose last failure is older,
+                i.e. that were not attempted again since.
+
+        """
+        query = "SELECT activity_id FROM failures WHERE last_failed_at < ?"
+        if not include_permanent:
+            query += " AND permanent = 0"
+        cutoff = float("inf") if failed_before is None else failed_before
+        with self._lock:
+            return [
+                row[0] for row in self._conn.execute(query + " ORDER BY 1", (cutoff,))
+            ]
+
+    def records(self) -> list[FailureRecord]:
+        """Return every recorded failure, most recent first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM failures ORDER BY last_failed_at DESC"
+            ).fetchall()
+        return [
+            FailureRecord(
+                row[0], row[1], row[2], row[3], bool(row[4]), row[5], row[6], row[7]
+            )
+            for row in rows
+        ]
@@ -0,0 +1,169 @@
+"""
+On-disk cache of Strava API responses, revalidated with conditional requests.
+
+A full walk of the activity history fetches every listing page again, and
+most of them come back unchanged. `HTTPCache` keeps the body of each cached GET
+response together with its `ETag` and `Last-Modified` validators in a SQLite
+database. The next request for the same URL and parameters sends them back as
+`If-None-Match` / `If-Modified-Since`; when Strava answers `304 Not Modified`,
+the body is served from disk and only the headers crossed the network.
+
+Note that a 304 still counts against the API rate limit; the cache saves
+transfer and decoding time, not requests.
+
+Entries are also keyed on the access token the request was made with, so
+athletes sharing a data directory never receive each other's cached pages.
+Entries of a replaced token are no longer hit and age out of the cache.
+
+The cache is bounded by `max_bytes` of stored bodies. When a new entry would
+exceed it, the least recently used entries are evicted first.
+"""
+
+import hashlib
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+"""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A cached response body and the validators it was served with."""
+
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Return the headers asking the server to revalidate this response."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class CacheStats:
+    """Counts of cache lookups during one sync."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_saved: int = 0
+
+
+class HTTPCache(SQLiteStore):
+    """SQLite-backed, size-bounded LRU cache of validated GET responses."""
+
+    schema = _SCHEMA
+
+    def __init__(self, db_path: Path, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(db_path)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+    @staticmethod
+    def key(url: str, params: Mapping[str, Any] | None = None, scope: str = "") -> str:
+        """
+        Return the cache key of a GET request.
+
+        The key covers the URL, the sorted parameters and `scope`, e.g. the
+        `Authorization` header, so requests of other credentials do not match.
+        """
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f"{scope}\nGET {url}?{query}".encode()).hexdigest()
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Return the cached response for `key`, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+        return CachedResponse(row[0], row[1], bytes(row[2]))
+
+    def touch(self, key: str, cached: CachedResponse) -> None:
+        """Mark a revalidated entry as used, so it is evicted last."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.stats.hits += 1
+            self.stats.bytes_saved += len(cached.body)
+
+    def put(self, key: str, url: str, headers: Mapping[str, str], body: bytes) -> bool:
+        """
+        Store a response body if it carries a validator and fits the cache.
+
+        Returns:
+            True if the response was stored.
+
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified) or len(body) > self.max_bytes:
+            self.delete(key)
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, body, len(body), now, now),
+            )
+            self._evict()
+            self.stats.stores += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        """Drop the entry for `key`, e.g. after the resource disappeared."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def size(self) -> int:
+        """Return the total size of the cached bodies in bytes."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(bytes), 0) FROM responses"
+            ).fetchone()[0]
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries beyond `max_bytes`. Lock held."""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute(
+            "SELECT key, bytes FROM responses ORDER BY used_at, rowid"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.stats.evictions += len(evicted)
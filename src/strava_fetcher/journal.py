@@ -0,0 +1,178 @@
+"""
+Durable checkpoint journal for resumable synchronization runs.
+
+`SyncJournal` records the sync plan in a small SQLite database so that a run
+interrupted by a crash, a kill or a rate limit can resume exactly where it
+stopped:
+
+* The activity page walk: the `after` filter in use, the last page fetched
+  and the raw activities of every page fetched so far.
+* The stream plan: one row per activity with status `pending`, `in_flight`,
+  `done` or `failed`.
+
+Resuming only reads the unfinished rows of the plan; it neither re-reads the
+activity cache nor re-scans the streams directory.
+"""
+
+import json
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from .sqlite_store import SQLiteStore
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_plan (
+    activity_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stream_plan_status ON stream_plan (status);
+CREATE TABLE IF NOT EXISTS activity_pages (
+    page INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursor (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SyncJournal(SQLiteStore):
+    """SQLite-backed checkpoint journal of a synchronization run."""
+
+    schema = _SCHEMA
+
+    # --- Activity page walk ---
+
+    def resume_activity_walk(
+        self, after: int | None
+    ) -> tuple[int, list[list[dict[str, Any]]]]:
+        """
+        Return the last page fetched and the staged pages of an unfinished walk.
+
+        A walk is only resumed if it used the same `after` filter; otherwise
+        any staged pages are discarded and the walk starts from page 1.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM cursor WHERE key = 'activities'"
+            ).fetchone()
+            if row is None or json.loads(row[0]).get("after") != after:
+                self._conn.execute("DELETE FROM activity_pages")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cursor VALUES ('activities', ?)",
+                    (json.dumps({"after": after, "page": 0}),),
+                )
+                return 0, []
+            last_page = int(json.loads(row[0])["page"])
+            pages = [
+                json.loads(payload)
+                for (payload,) in self._conn.execute(
+                    "SELECT payload FROM activity_pages ORDER BY page"
+                )
+            ]
+        return last_page, pages
+
+    def record_activity_page(
+        self, after: int | None, page: int, activities: list[dict[str, Any]]
+    ) -> None:
+        """Stage a fetched page and advance the pagination cursor."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO activity_pages VALUES (?, ?)",
+                (page, json.dumps(activities)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursor VALUES ('activities', ?)",
+                (json.dumps({"after": after, "page": page}),),
+            )
+
+    def finish_activity_walk(self) -> None:
+        """Drop the staged pages once they have been merged into the cache."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM activity_pages")
+            self._conn.execute("DELETE FROM cursor WHERE key = 'activities'")
+
+    # --- Stream plan ---
+
+    def start_stream_plan(self, activity_ids: Iterable[int]) -> None:
+        """Replace the stream plan with `activity_ids`, all pending."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM stream_plan")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO stream_plan (activity_id, status, updated_at) "
+                "VALUES (?, ?, ?)",
+                ((int(i), PENDING, now) for i in activity_ids),
+            )
+
+    def add_to_stream_plan(self, activity_ids: Iterable[int]) -> int:
+        """
+        Add activities to an unfinished stream plan.
+
+        Returns:
+            The number of activities added (0 if no plan is open).
+
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            open_plan = self._conn.execute(
+                "SELECT 1 FROM stream_plan WHERE status IN (?, ?) LIMIT 1",
+                (PENDING, IN_FLIGHT),
+            ).fetchone()
+            if open_plan is None:
+                return 0
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO stream_plan (activity_id, status, updated_at) "
+                "VALUES (?, ?, ?)",
+                ((int(i), PENDING, now) for i in activity_ids),
+            )
+            return cursor.rowcount
+
+    def pending_activity_ids(self) -> list[int]:
+        """
+        Return the activities of the plan that still need their streams.
+
+        Activities left `in_flight` by an interrupted run are treated as pending.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE stream_plan SET status = ? WHERE status = ?",
+                (PENDING, IN_FLIGHT),
+            )
+            return [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT activity_id FROM stream_plan WHERE status = ? "
+                    "ORDER BY activity_id",
+                    (PENDING,),
+                )
+            ]
+
+    def mark(self, activity_id: int, status: str, error: str | None = None) -> None:
+        """Update the status of one activity in the plan."""
+        attempts_increment = 1 if status == IN_FLIGHT else 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE stream_plan SET status = ?, error = ?, updated_at = ?, "
+                "attempts = attempts + ? WHERE activity_id = ?",
+                (status, error, time.time(), attempts_increment, int(activity_id)),
+            )
+
+    def stream_plan_counts(self) -> dict[str, int]:
+        """Return the number of activities in the plan per status."""
+        with self._lock:
+            return dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM stream_plan GROUP BY status"
+                ).fetchall()
+            )
@@ -0,0 +1,220 @@
+"""
+Persistent index of the stream files stored on disk.
+
+Listing and stat-ing tens of thousands of stream files on every run is slow,
+especially on network storage. `StreamManifest` keeps one row per stored
+stream in a small SQLite database (activity id, file name, storage format,
+row count, byte size, checksum and the stream types, resolution and series
+type it was requested with), updated whenever a stream is written, so finding
+the activities without streams is an index lookup.
+
+The first index of streams written before the manifest existed is built from
+the directory listing and file sizes alone; their row count and stream types
+are filled in when a stream is first inspected, their checksum when rewritten.
+"""
+
+import hashlib
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from .sqlite_store import SQLiteStore
+from .streams import StreamOptions
+
+_STREAMS_TABLE = """
+CREATE TABLE IF NOT EXISTS streams (
+    activity_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    rows INTEGER,
+    bytes INTEGER NOT NULL,
+    checksum TEXT,
+    written_at REAL NOT NULL,
+    keys TEXT,
+    resolution TEXT,
+    series_type TEXT
+)"""
+
+_SCHEMA = f"""
+{_STREAMS_TABLE};
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def checksum(data: bytes) -> str:
+    """Return the hex SHA-256 digest used to fingerprint stored streams."""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(frozen=True)
+class StreamRecord:
+    """Manifest entry describing one stored stream file."""
+
+    activity_id: int
+    path: str
+    format: str
+    rows: int | None  # None until the stream is first inspected
+    bytes: int
+    checksum: str | None  # None until the stream is rewritten
+    written_at: float = 0.0
+    keys: tuple[str, ...] = ()
+    resolution: str | None = None
+    series_type: str | None = None
+
+
+_COLUMNS = (
+    "activity_id, path, format, rows, bytes, checksum, written_at, "
+    "keys, resolution, series_type"
+)
+
+
+class StreamManifest(SQLiteStore):
+    """SQLite-backed index of stored activity streams."""
+
+    schema = _SCHEMA
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Upgrade the streams table of manifests of earlier releases."""
+        not_null = {
+            row[1]: bool(row[3]) for row in conn.execute("PRAGMA table_info(streams)")
+        }
+        for column in ("keys", "resolution", "series_type"):
+            if column not in not_null:
+                conn.execute(f"ALTER TABLE streams ADD COLUMN {column} TEXT")
+        if not_null["rows"] or not_null["checksum"]:
+            # SQLite cannot drop a NOT NULL constraint; copy the table instead.
+            conn.execute("ALTER TABLE streams RENAME TO streams_old")
+            conn.execute(_STREAMS_TABLE)
+            conn.execute(
+                f"INSERT INTO streams ({_COLUMNS}) SELECT {_COLUMNS} FROM streams_old"
+            )
+            conn.execute("DROP TABLE streams_old")
+
+    @property
+    def is_built(self) -> bool:
+        """Whether the manifest has been populated from the streams directory."""
+        return self._meta_value("built") is not None
+
+    def _insert(self, record: StreamRecord) -> None:
+        """Insert or replace a row. Caller holds the lock and the transaction."""
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO streams ({_COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record.activity_id,
+                record.path,
+                record.format,
+                record.rows,
+                record.bytes,
+                record.checksum,
+                record.written_at or time.time(),
+                ",".join(record.keys) if record.keys else None,
+                record.resolution,
+                record.series_type,
+            ),
+        )
+
+    def record(self, record: StreamRecord) -> None:
+        """Insert or replace the entry for a stored stream."""
+        with self._lock, self._conn:
+            self._insert(record)
+
+    def describe(self, activity_id: int, rows: int, keys: tuple[str, ...]) -> None:
+        """Fill in the row count and stream types found in a stored stream."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE streams SET rows = ?, keys = ? WHERE activity_id = ?",
+                (rows, ",".join(keys) if keys else None, activity_id),
+            )
+
+    def remove(self, activity_id: int) -> None:
+        """Drop the entry of an activity, if any."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM streams WHERE activity_id = ?", (activity_id,)
+            )
+
+    def get(self, activity_id: int) -> StreamRecord | None:
+        """Return the entry of an activity, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM streams WHERE activity_id = ?",
+                (activity_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        (
+            activity_id,
+            path,
+            storage_format,
+            rows,
+            size,
+            digest,
+            written_at,
+            keys,
+            resolution,
+            series_type,
+        ) = row
+        return StreamRecord(
+            activity_id=activity_id,
+            path=path,
+            format=storage_format,
+            rows=rows,
+            bytes=size,
+            checksum=digest,
+            written_at=written_at,
+            keys=tuple(keys.split(",")) if keys else (),
+            resolution=resolution,
+            series_type=series_type,
+        )
+
+    def activity_ids(self, storage_format: str | None = None) -> set[int]:
+        """Return the IDs of all indexed streams, optionally for one format."""
+        query = "SELECT activity_id FROM streams WHERE bytes > 0"
+        params: tuple = ()
+        if storage_format is not None:
+            query += " AND format = ?"
+            params = (storage_format,)
+        with self._lock:
+            return {row[0] for row in self._conn.execute(query, params)}
+
+    def stream_options(
+        self, storage_format: str | None = None
+    ) -> dict[int, StreamOptions | None]:
+        """Return the recorded request options per activity (None if unknown)."""
+        query = (
+            "SELECT activity_id, keys, resolution, series_type FROM streams "
+            "WHERE bytes > 0"
+        )
+        params: tuple = ()
+        if storage_format is not None:
+            query += " AND format = ?"
+            params = (storage_format,)
+        with self._lock:
+            return {
+                activity_id: (
+                    StreamOptions(tuple(keys.split(",")), resolution, series_type)
+                    if keys
+                    else None
+                )
+                for activity_id, keys, resolution, series_type in self._conn.execute(
+                    query, params
+                )
+            }
+
+    def rebuild(self, records: Iterable[StreamRecord]) -> int:
+        """Replace every entry with `records` and mark the manifest as built."""
+        count = 0
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM streams")
+            for record in records:
+                self._insert(record)
+                count += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('built', ?)", (str(time.time()),)
+            )
+        return count
@@ -17,7 +17,7 @@ class Token(BaseModel):
     refresh_token: SecretStr
     expires_at: int  # Unix timestamp
 
-    def is_expired(self, buffer_seconds: int = 60) -> bool:
+    def is_expired(self, buffer_seconds: float = 60) -> bool:
         """
         Check if the token is expired or close to expiring.
 
@@ -7,19 +7,102 @@ allowing other components to remain unaware of the underlying storage details.
 
 import json
 import logging
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from .activity_index import ActivityIndex
+from .archive import StreamArchive
+from .atomic import DirectorySync, atomic_write
+from .exceptions import StreamMismatchError
+from .manifest import StreamManifest, StreamRecord, checksum
 from .models import Token
+from .storage import CSVBackend, StorageBackend
+from .streams import StreamOptions, decode_streams, stream_keys_of
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, a single process is assumed
+    fcntl = None  # type: ignore[assignment]
+
+
+# The partition index lives next to the partition files.
+PARTITION_INDEX_FILE = "partition_index.sqlite"
+
+# Without a manifest, the request options of stored streams are appended to
+# this JSON-lines file next to them; the last line of an activity wins.
+STREAM_REQUESTS_FILE = "stream_requests.jsonl"
+
+
+@dataclass(frozen=True)
+class EncodedStream:
+    """The streams of one activity, encoded for storage."""
+
+    data: bytes
+    rows: int
+    keys: tuple[str, ...]
+
+
+def encode_stream_payload(
+    streams_data: dict[str, Any], backend: StorageBackend
+) -> EncodedStream:
+    """
+    Decode a streams payload and encode it with `backend`.
+
+    This is the CPU-heavy part of storing streams; it only depends on its
+    arguments so that it can run in a worker process.
+    """
+    if not isinstance(streams_data, dict):
+        raise ValueError(
+            f"Unexpected streams payload of type {type(streams_data).__name__}"
+        )
+    stream_df = decode_streams(streams_data)
+    return EncodedStream(
+        backend.encode(stream_df, index=True),
+        len(stream_df),
+        stream_keys_of(stream_df.columns),
+    )
 
 
 class TokenPersistence:
-    """Manages reading and writing the Strava token file."""
+    """
+    Manages reading and writing the Strava token file.
+
+    Several processes may share one token file. Writes replace the file
+    atomically, and `lock` serialises read-refresh-write sequences between
+    processes so that only one of them refreshes an expiring token.
+    """
 
     def __init__(self, token_path: Path | None):
         self.token_path = token_path
 
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Hold an exclusive advisory lock on the token file.
+
+        The lock is taken on a `.lock` file next to the token file, so it
+        survives the token file being replaced. Without `fcntl` (Windows)
+        this is a no-op.
+        """
+        if self.token_path is None or fcntl is None:
+            yield
+            return
+        self.token_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.token_path.with_name(self.token_path.name + ".lock")
+        with open(lock_path, "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     def read(self) -> Token | None:
         """
         Read the token from the file system.
@@ -55,8 +138,11 @@ class TokenPersistence:
                 "expires_at": token.expires_at,
             }
 
-            with open(self.token_path, "w", encoding="utf-8") as f:
-                json.dump(token_dict_to_save, f, indent=4)
+            atomic_write(
+                self.token_path,
+                json.dumps(token_dict_to_save, indent=4).encode("utf-8"),
+                mode=0o600,
+            )
 
             logging.info("Token successfully written to %s", self.token_path)
         except OSError as e:
@@ -64,40 +150,709 @@ class TokenPersistence:
             raise
 
 
+class SyncStatePersistence:
+    """Manages the small JSON file holding incremental-sync bookkeeping."""
+
+    def __init__(self, state_path: Path | None):
+        self.state_path = state_path
+
+    def read(self) -> dict[str, Any]:
+        """Read the sync state, returning an empty dict if it is missing or invalid."""
+        if self.state_path is None or not self.state_path.is_file():
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except json.JSONDecodeError as e:
+            logging.warning(
+                "Could not read sync state file at %s: %s", self.state_path, e
+            )
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def write(self, state: dict[str, Any]) -> None:
+        """Write the sync state to the file system."""
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.state_path, json.dumps(state, indent=4).encode("utf-8"))
+
+    def read_activities_after(self) -> int | None:
+        """Return the newest activity start time (Unix seconds) already synced."""
+        value = self.read().get("activities_after")
+        return int(value) if value is not None else None
+
+    def write_activities_after(self, timestamp: int) -> None:
+        """Record the newest activity start time (Unix seconds) already synced."""
+        state = self.read()
+        state["activities_after"] = int(timestamp)
+        self.write(state)
+
+
+def upsert_by_id(
+    existing_df: pd.DataFrame | None, new_df: pd.DataFrame
+) -> pd.DataFrame:
+    """Return `existing_df` with rows replaced or added from `new_df` by `id`."""
+    if existing_df is not None:
+        existing_df = existing_df[~existing_df["id"].isin(new_df["id"])]
+    if existing_df is None or existing_df.empty:
+        return new_df.reset_index(drop=True)
+    return pd.concat([existing_df, new_df], ignore_index=True)
+
+
+class PartitionedActivityStore:
+    """
+    Stores activity summaries in per-year or per-month partition files.
+
+    Upserts only rewrite the partitions that contain new or changed
+    activities, so routine syncs cost I/O proportional to the handful of
+    activities they fetched instead of the whole history. An `ActivityIndex`
+    next to the partitions records where every activity is stored, so an
+    activity whose `start_date` moved is dropped from its old partition
+    without reading the others.
+    """
+
+    _FORMATS = {"year": "%Y", "month": "%Y-%m"}
+
+    def __init__(
+        self,
+        directory: Path,
+        backend: StorageBackend,
+        granularity: str = "month",
+        legacy_cache_file: Path | None = None,
+    ):
+        if granularity not in self._FORMATS:
+            raise ValueError(f"Unsupported partition granularity: {granularity}")
+        self.directory = directory
+        self.backend = backend
+        self.granularity = granularity
+        self.legacy_cache_file = legacy_cache_file
+        self.index = ActivityIndex(directory / PARTITION_INDEX_FILE)
+
+    def close(self) -> None:
+        """Release the partition index."""
+        self.index.close()
+
+    def _partition_path(self, key: str) -> Path:
+        return self.directory / f"activities_{key}{self.backend.extension}"
+
+    def _partition_files(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"activities_*{self.backend.extension}"))
+
+    def _rebuild_index(self, frames: dict[Path, pd.DataFrame]) -> None:
+        """Index the partition of every activity in `frames`."""
+        self.index.rebuild(
+            {
+                int(activity_id): path.stem.removeprefix("activities_")
+                for path, df in frames.items()
+                if not df.empty
+                for activity_id in df["id"]
+            }
+        )
+
+    def partition_keys(self, activities_df: pd.DataFrame) -> pd.Series:
+        """Return the partition each activity belongs to, based on `start_date`."""
+        if "start_date" not in activities_df.columns:
+            return pd.Series("unknown", index=activities_df.index)
+        start_dates = pd.to_datetime(
+            activities_df["start_date"], utc=True, errors="coerce"
+        )
+        return start_dates.dt.strftime(self._FORMATS[self.granularity]).fillna(
+            "unknown"
+        )
+
+    def _migrate_legacy_cache(self) -> None:
+        """Split a single-file cache from earlier releases into partitions once."""
+        if self._partition_files():
+            return
+        if self.legacy_cache_file is None or not self.legacy_cache_file.is_file():
+            return
+        legacy_df = self.backend.read(self.legacy_cache_file)
+        if legacy_df.empty:
+            return
+        logging.info(
+            f"Migrating {len(legacy_df)} cached activities from "
+            f"{self.legacy_cache_file} into {self.granularity} partitions."
+        )
+        self._upsert_partitions(legacy_df)
+
+    def read_all(self) -> pd.DataFrame | None:
+        """Read and concatenate every partition."""
+        self._migrate_legacy_cache()
+        frames = {path: self.backend.read(path) for path in self._partition_files()}
+        if not self.index.is_built:
+            self._rebuild_index(frames)
+        stored = [df for df in frames.values() if not df.empty]
+        if not stored:
+            return None
+        return pd.concat(stored, ignore_index=True)
+
+    def upsert(self, activities_df: pd.DataFrame) -> int:
+        """
+        Insert or replace activities by `id`, touching only affected partitions.
+
+        Returns:
+            The number of partition files rewritten.
+
+        """
+        if activities_df.empty:
+            return 0
+        self._migrate_legacy_cache()
+        return self._upsert_partitions(activities_df)
+
+    def _upsert_partitions(self, activities_df: pd.DataFrame) -> int:
+        if not self.index.is_built:
+            # Partitions written by earlier releases are indexed once.
+            self._rebuild_index(
+                {path: self.backend.read(path) for path in self._partition_files()}
+            )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keys = self.partition_keys(activities_df)
+        ids = activities_df["id"]
+        stored = self.index.partitions(ids)
+        moved_from = {
+            stored[int(activity_id)]
+            for activity_id, key in zip(ids, keys, strict=True)
+            if stored.get(int(activity_id), key) != key
+        }
+        affected = sorted(set(keys) | moved_from)
+        for key in affected:
+            path = self._partition_path(key)
+            existing = self.backend.read(path) if path.is_file() else None
+            if existing is not None and not existing.empty:
+                existing = existing[~existing["id"].isin(ids)]
+            merged = upsert_by_id(existing, activities_df[keys == key])
+            if merged.empty:
+                path.unlink(missing_ok=True)
+            else:
+                self.backend.write(merged, path)
+        self.index.assign(
+            {int(activity_id): key for activity_id, key in zip(ids, keys, strict=True)}
+        )
+        return len(affected)
+
+
 class ActivityPersistence:
     """Manages reading and writing activity and stream data."""
 
-    def __init__(self, cache_file: Path | None, streams_dir: Path | None):
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        cache_file: Path | None,
+        streams_dir: Path | None,
+        *,
+        backend: StorageBackend | None = None,
+        manifest: StreamManifest | None = None,
+        activity_store: PartitionedActivityStore | None = None,
+        stream_backend: StorageBackend | None = None,
+        stream_archive: StreamArchive | None = None,
+        directory_sync: DirectorySync | None = None,
+    ):
         self.cache_file = cache_file
         self.streams_dir = streams_dir
+        self.backend = backend if backend is not None else CSVBackend()
+        self.stream_backend = (
+            stream_backend if stream_backend is not None else self.backend
+        )
+        self.manifest = manifest
+        self.activity_store = activity_store
+        self.stream_archive = stream_archive
+        self.directory_sync = (
+            directory_sync if directory_sync is not None else DirectorySync()
+        )
+        # Manifest entries of archived streams wait for the archive's fsync.
+        self._unindexed: list[StreamRecord] = []
+        self._index_lock = threading.Lock()
+        self._logged_requests: dict[int, StreamOptions] | None = None
+
+    def flush(self) -> None:
+        """Make the stream files written so far durable."""
+        if self.stream_archive is not None:
+            with self._index_lock:
+                self._flush_archive()
+        self.directory_sync.flush()
+
+    def _flush_archive(self) -> None:
+        """Flush the archive, then index the streams it made durable. Lock held."""
+        assert self.stream_archive is not None
+        self.stream_archive.flush()
+        if self.manifest is not None:
+            for record in self._unindexed:
+                self.manifest.record(record)
+        self._unindexed.clear()
+
+    def _index(self, record: StreamRecord) -> None:
+        """Record a written stream in the manifest once its data is durable."""
+        assert self.manifest is not None
+        if self.stream_archive is None:
+            self.manifest.record(record)
+            return
+        with self._index_lock:
+            self._unindexed.append(record)
+            if len(self._unindexed) >= self.stream_archive.batch_size:
+                self._flush_archive()
+
+    def close(self) -> None:
+        """Flush pending writes and release handles such as the stream index."""
+        self.flush()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.activity_store is not None:
+            self.activity_store.close()
+        if self.stream_archive is not None:
+            self.stream_archive.close()
 
     def read_cache(self) -> pd.DataFrame | None:
-        """Read the activity summary cache file."""
+        """Read the activity summary cache (all partitions, if partitioned)."""
+        if self.activity_store is not None:
+            return self.activity_store.read_all()
         if self.cache_file is None or not self.cache_file.is_file():
             return None
-        return pd.read_csv(self.cache_file, sep=";")
+        return self.backend.read(self.cache_file)
 
     def write_cache(self, activities_df: pd.DataFrame) -> None:
         """Write the activity summary cache file."""
         if self.cache_file is None:
             return
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-        activities_df.to_csv(self.cache_file, sep=";", index=False)
+        self.backend.write(activities_df, self.cache_file)
+
+    def upsert_activities(self, activities_df: pd.DataFrame) -> None:
+        """
+        Insert new activities and replace changed ones, keyed on `id`.
+
+        With a partitioned store only the affected partitions are rewritten;
+        otherwise the single cache file is merged and rewritten.
+        """
+        if activities_df.empty:
+            return
+        if self.activity_store is not None:
+            self.activity_store.upsert(activities_df)
+            return
+        self.write_cache(upsert_by_id(self.read_cache(), activities_df))
+
+    def stream_path(self, activity_id: int) -> Path | None:
+        """Return the file holding the streams of an activity."""
+        if self.streams_dir is None:
+            return None
+        extension = self.stream_backend.extension
+        return self.streams_dir / f"stream_{activity_id:09d}{extension}"
+
+    def _scan_stream_files(self) -> list[Path]:
+        """List the non-empty stream files of the configured format."""
+        if self.streams_dir is None or not self.streams_dir.is_dir():
+            return []
+        return [
+            f
+            for f in self.streams_dir.glob(f"stream_*{self.stream_backend.extension}")
+            if f.is_file() and f.stat().st_size > 0
+        ]
 
     def get_existing_stream_ids(self) -> set[int]:
-        """Return a set of activity IDs for which stream files already exist."""
+        """
+        Return a set of activity IDs for which stream files already exist.
+
+        With a manifest this is an index lookup; the streams directory is only
+        scanned the first time, to populate a manifest that was never built.
+        """
+        if self.stream_archive is not None:
+            self.flush()
+        if self.manifest is not None:
+            if not self.manifest.is_built:
+                self.rebuild_stream_index()
+            return self.manifest.activity_ids(self.stream_backend.name)
+        if self.stream_archive is not None:
+            return self.stream_archive.activity_ids()
+        return {int(f.stem.replace("stream_", "")) for f in self._scan_stream_files()}
+
+    def rebuild_stream_index(self) -> int:
+        """
+        Re-create the manifest from the streams found on disk.
+
+        With the archive layout, the archive's offset index is first rebuilt
+        from the record headers of its segments. The manifest is built from
+        the listing and sizes of the stream files (or archive entries) alone,
+        so no stream is read; row counts and stream types are filled in as the
+        streams are first inspected.
+
+        Returns:
+            The number of indexed streams.
+
+        """
+        if self.stream_archive is not None:
+            self.flush()
+            count = self.stream_archive.rebuild_index()
+            logging.info(f"Stream archive index rebuilt with {count} entries.")
+            if self.manifest is None:
+                return count
+        if self.manifest is None:
+            return 0
+        if self.stream_archive is not None:
+            records = self._archive_records()
+        else:
+            records = self._file_records()
+        count = self.manifest.rebuild(records)
+        logging.info(f"Stream index rebuilt with {count} entries.")
+        return count
+
+    def _stream_record(
+        self, activity_id: int, path: str, data: bytes, written_at: float = 0.0
+    ) -> StreamRecord:
+        """Describe stored stream data whose request options are unknown."""
+        stream_df = self.stream_backend.decode(data)
+        return StreamRecord(
+            activity_id=activity_id,
+            path=path,
+            format=self.stream_backend.name,
+            rows=len(stream_df),
+            bytes=len(data),
+            checksum=checksum(data),
+            written_at=written_at,
+            keys=stream_keys_of(stream_df.columns),
+        )
+
+    def _listed_record(
+        self, activity_id: int, path: str, size: int, written_at: float = 0.0
+    ) -> StreamRecord:
+        """Describe stored stream data from its location and size alone."""
+        return StreamRecord(
+            activity_id=activity_id,
+            path=path,
+            format=self.stream_backend.name,
+            rows=None,
+            bytes=size,
+            checksum=None,
+            written_at=written_at,
+        )
+
+    def _file_records(self) -> Iterator[StreamRecord]:
         if self.streams_dir is None or not self.streams_dir.is_dir():
-            return set()
+            return
+        for f in self.streams_dir.glob(f"stream_*{self.stream_backend.extension}"):
+            stat = f.stat()
+            if stat.st_size > 0:
+                yield self._listed_record(
+                    int(f.stem.replace("stream_", "")),
+                    f.name,
+                    stat.st_size,
+                    stat.st_mtime,
+                )
+
+    def _archive_records(self) -> Iterator[StreamRecord]:
+        assert self.stream_archive is not None
+        for entry in self.stream_archive.entries():
+            yield self._listed_record(
+                entry.activity_id, entry.segment_name, entry.length
+            )
+
+    def write_stream(
+        self,
+        activity_id: int,
+        stream_df: pd.DataFrame,
+        options: StreamOptions | None = None,
+    ) -> None:
+        """
+        Write a single activity stream to a file (or the archive) and index it.
+
+        Args:
+            activity_id: The activity the streams belong to.
+            stream_df: One column per stream.
+            options: The request the streams were fetched with, recorded in the
+                manifest. If omitted, the stream types present are recorded.
+
+        """
+        encoded = EncodedStream(
+            self.stream_backend.encode(stream_df, index=True),
+            len(stream_df),
+            stream_keys_of(stream_df.columns),
+        )
+        self.write_encoded_stream(activity_id, encoded, options)
+
+    def write_encoded_stream(
+        self,
+        activity_id: int,
+        encoded: EncodedStream,
+        options: StreamOptions | None = None,
+    ) -> None:
+        """Store streams already encoded with `stream_backend` and index them."""
+        data = encoded.data
+        if self.stream_archive is not None:
+            path = self.stream_archive.append(activity_id, data).segment_name
+        else:
+            outfile = self.stream_path(activity_id)
+            if outfile is None:
+                return
+            outfile.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(outfile, data, self.directory_sync)
+            path = outfile.name
+        if self.manifest is not None:
+            self._index(
+                StreamRecord(
+                    activity_id=activity_id,
+                    path=path,
+                    format=self.stream_backend.name,
+                    rows=encoded.rows,
+                    bytes=len(data),
+                    checksum=checksum(data),
+                    keys=options.keys if options is not None else encoded.keys,
+                    resolution=options.resolution if options else None,
+                    series_type=options.series_type if options else None,
+                )
+            )
+        elif options is not None:
+            self._log_request(activity_id, options)
+
+    def _requests_log(self) -> Path | None:
+        """Return the request log used without a manifest, if streams are stored."""
+        directory = (
+            self.stream_archive.directory
+            if self.stream_archive is not None
+            else self.streams_dir
+        )
+        return directory / STREAM_REQUESTS_FILE if directory is not None else None
+
+    def _read_requests_log(self) -> dict[int, StreamOptions]:
+        """Return the logged request options per activity. Lock held."""
+        if self._logged_requests is None:
+            self._logged_requests = {}
+            path = self._requests_log()
+            if path is not None and path.is_file():
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            self._logged_requests[int(entry["activity_id"])] = (
+                                StreamOptions(
+                                    tuple(entry["keys"]),
+                                    entry["resolution"],
+                                    entry["series_type"],
+                                )
+                            )
+                        except (ValueError, KeyError, TypeError):
+                            continue  # A line torn by a crash.
+        return self._logged_requests
+
+    def _log_request(self, activity_id: int, options: StreamOptions) -> None:
+        """Remember the options a stream was requested with, without a manifest."""
+        path = self._requests_log()
+        if path is None:
+            return
+        line = json.dumps(
+            {
+                "activity_id": int(activity_id),
+                "keys": list(options.keys),
+                "resolution": options.resolution,
+                "series_type": options.series_type,
+            }
+        )
+        with self._index_lock:
+            logged = self._read_requests_log()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            logged[int(activity_id)] = options
+
+    def _recorded_stream_options(self) -> dict[int, StreamOptions | None]:
+        """Return the request options of every stored stream (None if unknown)."""
+        if self.stream_archive is not None:
+            self.flush()
+        if self.manifest is not None:
+            if not self.manifest.is_built:
+                self.rebuild_stream_index()
+            return self.manifest.stream_options(self.stream_backend.name)
+        stored_ids = self.get_existing_stream_ids()
+        with self._index_lock:
+            logged = self._read_requests_log()
+            return {activity_id: logged.get(activity_id) for activity_id in stored_ids}
+
+    def _stored_options(self, activity_id: int) -> StreamOptions | None:
+        """Return the recorded request options of one stored stream, if known."""
+        if self.manifest is not None:
+            record = self.manifest.get(activity_id)
+            if record is None or not record.keys:
+                return None
+            return StreamOptions(record.keys, record.resolution, record.series_type)
+        with self._index_lock:
+            return self._read_requests_log().get(int(activity_id))
+
+    def _inspect_stream_keys(self, activity_id: int) -> tuple[str, ...]:
+        """
+        Return the stream types found in a stored stream's columns.
+
+        The manifest entry, if any, is completed with them and the row count,
+        so each stream is inspected once.
+        """
+        arrays = self.read_stream(activity_id)
+        if arrays is None:
+            return ()
+        keys = stream_keys_of(arrays)
+        if self.manifest is not None:
+            rows = len(next(iter(arrays.values()))) if arrays else 0
+            self.manifest.describe(activity_id, rows, keys)
+        return keys
+
+    def stored_stream_keys(self) -> dict[int, tuple[str, ...]]:
+        """
+        Return the stream types held by every stored stream.
+
+        These are the stream types requested, as recorded in the manifest (or
+        the request log without one), including types the activity has no data
+        for. Streams without recorded keys (written by earlier releases) are
+        inspected once on disk.
+        """
         return {
-            int(f.stem.replace("stream_", ""))
-            for f in self.streams_dir.glob("stream_*.csv")
-            if f.is_file() and f.stat().st_size > 0
+            activity_id: (
+                options.keys
+                if options is not None
+                else self._inspect_stream_keys(activity_id)
+            )
+            for activity_id, options in self._recorded_stream_options().items()
         }
 
-    def write_stream(self, activity_id: int, stream_df: pd.DataFrame) -> None:
-        """Write a single activity stream to a CSV file."""
-        if self.streams_dir is None:
+    def streams_missing_keys(
+        self,
+        keys: Iterable[str],
+        resolution: str | None = None,
+        series_type: str | None = None,
+    ) -> dict[int, tuple[str, ...]]:
+        """
+        Return, per stored stream, the stream types to request for `keys`.
+
+        That is the requested types it lacks. Streams recorded with another
+        `resolution` or `series_type` cannot be merged with a new request, so
+        for those every stored and requested type is returned.
+        """
+        wanted = tuple(keys)
+        missing = {}
+        for activity_id, options in self._recorded_stream_options().items():
+            if options is None:
+                stored = self._inspect_stream_keys(activity_id)
+            else:
+                stored = options.keys
+                if (options.resolution, options.series_type) != (
+                    resolution,
+                    series_type,
+                ):
+                    missing[activity_id] = tuple(dict.fromkeys((*wanted, *stored)))
+                    continue
+            lacking = tuple(k for k in wanted if k not in stored)
+            if lacking:
+                missing[activity_id] = lacking
+        return missing
+
+    def merge_stream(
+        self, activity_id: int, stream_df: pd.DataFrame, options: StreamOptions
+    ) -> None:
+        """
+        Add the columns of `stream_df` to the stored streams of an activity.
+
+        Columns already stored are replaced. The manifest (or request log)
+        records the union of the stream types requested so far, so the same
+        keys are not requested again even if the activity has no data for them.
+        If `stream_df` holds every stored type, it simply replaces the streams.
+
+        Raises:
+            StreamMismatchError: If the stored streams were requested with
+                another resolution or series type, or have another length,
+                so that their samples would not line up.
+
+        """
+        existing = self.read_stream(activity_id)
+        if existing is None:
+            self.write_stream(activity_id, stream_df, options)
+            return
+        stored = self._stored_options(activity_id)
+        recorded = stored.keys if stored is not None else stream_keys_of(existing)
+        if set(recorded) | set(stream_keys_of(existing)) <= set(options.keys):
+            self.write_stream(activity_id, stream_df, options)
+            return
+        existing_df = pd.DataFrame(existing)
+        if stored is not None and (stored.resolution, stored.series_type) != (
+            options.resolution,
+            options.series_type,
+        ):
+            raise StreamMismatchError(
+                f"Streams of activity {activity_id} were stored at resolution "
+                f"{stored.resolution!r} and series type {stored.series_type!r}, "
+                f"not {options.resolution!r} and {options.series_type!r}."
+            )
+        if len(stream_df.columns) and len(stream_df) != len(existing_df):
+            raise StreamMismatchError(
+                f"Streams of activity {activity_id} have {len(existing_df)} "
+                f"stored samples but {len(stream_df)} fetched ones."
+            )
+        merged = pd.concat(
+            [existing_df.drop(columns=stream_df.columns, errors="ignore"), stream_df],
+            axis=1,
+        )
+        keys = tuple(dict.fromkeys((*recorded, *options.keys)))
+        self.write_stream(activity_id, merged, replace(options, keys=keys))
+
+    def read_stream(self, activity_id: int) -> dict[str, np.ndarray] | None:
+        """
+        Read the streams of an activity as one NumPy array per column.
+
+        With the `binary` stream format the arrays are read-only views over the
+        memory-mapped file or archive segment, so nothing is parsed or copied
+        until accessed.
+
+        Returns:
+            The stream columns, or None if no streams are stored.
+
+        """
+        if self.stream_archive is not None:
+            buffer = self.stream_archive.read_buffer(activity_id)
+            if buffer is None:
+                return None
+            return self.stream_backend.decode_arrays(buffer)
+        path = self.stream_path(activity_id)
+        if path is None or not path.is_file() or path.stat().st_size == 0:
+            return None
+        return self.stream_backend.read_arrays(path)
+
+    def iter_streams(self) -> Iterator[tuple[int, dict[str, np.ndarray]]]:
+        """Yield `(activity_id, columns)` for every stored stream, in storage order."""
+        if self.stream_archive is not None:
+            for activity_id, buffer in self.stream_archive.scan():
+                yield activity_id, self.stream_backend.decode_arrays(buffer)
             return
-        self.streams_dir.mkdir(parents=True, exist_ok=True)
-        outfile = self.streams_dir / f"stream_{activity_id:09d}.csv"
-        stream_df.to_csv(outfile, sep=";", index=True)
+        for f in sorted(self._scan_stream_files()):
+            yield int(f.stem.replace("stream_", "")), self.stream_backend.read_arrays(f)
+
+    def migrate_streams_to_archive(self, delete_files: bool = False) -> int:
+        """
+        Append the per-activity stream files of `streams_dir` to the archive.
+
+        Activities already archived are skipped, so an interrupted migration
+        can simply be run again.
+
+        Args:
+            delete_files: Remove each stream file once it is archived.
+
+        Returns:
+            The number of stream files archived.
+
+        """
+        if self.stream_archive is None:
+            raise ValueError("No stream archive is configured.")
+        archived = self.stream_archive.activity_ids()
+        migrated = 0
+        files = sorted(self._scan_stream_files())
+        for f in files:
+            activity_id = int(f.stem.replace("stream_", ""))
+            if activity_id not in archived:
+                data = f.read_bytes()
+                entry = self.stream_archive.append(activity_id, data)
+                if self.manifest is not None:
+                    self._index(
+                        self._stream_record(activity_id, entry.segment_name, data)
+                    )
+                migrated += 1
+        # Only delete the files once their archived copies are durable.
+        self.flush()
+        if delete_files:
+            for f in files:
+                f.unlink()
+        logging.info(f"Archived {migrated} stream files.")
+        return migrated
@@ -3,22 +3,120 @@ Orchestrates the full Strava data synchronization pipeline.
 
 This module contains the main `StravaSyncPipeline` class, which brings together
 all the components of the package to perform the following steps:
-1. Ensure a valid Strava access token is available.
+1. Ensure a valid Strava access token is available (and keep it refreshed
+   in the background for the rest of the sync).
 2. Synchronize all activity summaries.
-3. Synchronize all missing activity streams.
+3. Synchronize all missing activity streams, skipping activities whose
+   earlier fetch failed permanently or is not yet due for another attempt.
 """
 
+import asyncio
 import logging
+import multiprocessing
 import time
+from collections import deque
+from collections.abc import Callable, Mapping
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import replace
+from functools import partial
+from typing import Any
 
 import click
 import pandas as pd
+from requests.adapters import BaseAdapter
 
-from .client import StravaClient
-from .exceptions import ConfigError, RateLimitError, UnauthorizedError
+from .archive import StreamArchive
+from .async_client import AsyncStravaClient
+from .atomic import DirectorySync
+from .auth import TokenManager
+from .cassette import cassette_adapter
+from .client import RequestControls, StravaClient
+from .exceptions import (
+    ConfigError,
+    RateLimitError,
+    StreamMismatchError,
+    UnauthorizedError,
+)
+from .failures import FailureStore
+from .http_cache import HTTPCache
+from .journal import DONE, FAILED, IN_FLIGHT, PENDING, SyncJournal
+from .manifest import StreamManifest
 from .models import Token
-from .persistence import ActivityPersistence, TokenPersistence
+from .persistence import (
+    ActivityPersistence,
+    EncodedStream,
+    PartitionedActivityStore,
+    SyncStatePersistence,
+    TokenPersistence,
+    encode_stream_payload,
+)
+from .ratelimit import RateLimiter, UnlimitedRateLimiter
+from .retry import RetryPolicy, RetryStats
 from .settings import Settings
+from .storage import get_storage_backend, get_stream_backend
+from .streams import StreamOptions, decode_streams
+from .writer import StreamWriter, WriterStats
+
+StoreStreams = Callable[[int, dict, StreamOptions | None], None]
+
+
+def _newest_start_timestamp(activities_df: pd.DataFrame) -> int | None:
+    """Return the newest `start_date` in the frame as Unix seconds, if any."""
+    if "start_date" not in activities_df.columns:
+        return None
+    start_dates = pd.to_datetime(activities_df["start_date"], utc=True, errors="coerce")
+    newest = start_dates.max()
+    if pd.isna(newest):
+        return None
+    return int(newest.timestamp())
+
+
+def build_activity_persistence(settings: Settings) -> ActivityPersistence:
+    """Create the activity and stream persistence layer described by `settings`."""
+    paths = settings.paths
+    backend = get_storage_backend(paths.storage_format, paths.parquet_compression)
+    return ActivityPersistence(
+        paths.activities_cache_file,
+        paths.streams_dir,
+        backend=backend,
+        manifest=(
+            StreamManifest(paths.stream_index_file)
+            if paths.stream_index_file is not None
+            else None
+        ),
+        activity_store=(
+            PartitionedActivityStore(
+                paths.activities_dir,
+                backend,
+                granularity=paths.activities_partitioning,
+                legacy_cache_file=paths.activities_cache_file,
+            )
+            if paths.activities_partitioning != "none"
+            and paths.activities_dir is not None
+            else None
+        ),
+        stream_backend=(
+            get_stream_backend(paths.stream_format, paths.parquet_compression)
+            if paths.stream_format is not None
+            else None
+        ),
+        stream_archive=(
+            StreamArchive(
+                paths.stream_archive_dir,
+                segment_size=paths.stream_archive_segment_mb * 1024 * 1024,
+                batch_size=settings.sync.fsync_batch_size,
+            )
+            if paths.stream_layout == "archive" and paths.stream_archive_dir is not None
+            else None
+        ),
+        directory_sync=DirectorySync(settings.sync.fsync_batch_size),
+    )
 
 
 class StravaSyncPipeline:
@@ -26,14 +124,103 @@ class StravaSyncPipeline:
 
     def __init__(self, settings: Settings, max_auth_attempts: int = 3):
         self.settings = settings
-        self.client = StravaClient(settings.strava_api)
+        # A replayed cassette makes no real requests, so it is not throttled.
+        self.rate_limiter = (
+            UnlimitedRateLimiter()
+            if settings.strava_api.cassette_mode == "replay"
+            else RateLimiter(
+                short_limit=settings.sync.rate_limit_per_15_minutes,
+                daily_limit=settings.sync.rate_limit_per_day,
+                reserve=settings.sync.rate_limit_reserve,
+            )
+        )
+        self.retry_policy = RetryPolicy(
+            max_retries=settings.sync.max_retries,
+            backoff_seconds=settings.sync.retry_backoff_seconds,
+            max_backoff_seconds=settings.sync.retry_max_backoff_seconds,
+            retry_statuses=frozenset(settings.sync.retry_statuses),
+        )
+        self.retry_stats = RetryStats()
+        self.request_controls = RequestControls(
+            self.rate_limiter, self.retry_policy, self.retry_stats
+        )
+        # A cassette must hold full responses: a recorded 304 would only be
+        # answerable from this machine's cache, so caching is off while one is
+        # recorded or replayed.
+        self.http_cache = (
+            HTTPCache(
+                settings.paths.http_cache_file
+                or settings.paths.data_dir / "http_cache.sqlite",
+                max_bytes=settings.sync.http_cache_max_mb * 1024 * 1024,
+            )
+            if settings.sync.http_cache_max_mb
+            and settings.strava_api.cassette_mode == "off"
+            else None
+        )
+        self.client = StravaClient(
+            settings.strava_api,
+            max_connections=settings.sync.max_concurrent_requests,
+            controls=self.request_controls,
+            http_cache=self.http_cache,
+            adapter=self._cassette_adapter(),
+        )
         self.token_persistence = TokenPersistence(settings.paths.token_file)
-        self.activity_persistence = ActivityPersistence(
-            settings.paths.activities_cache_file, settings.paths.streams_dir
+        self.tokens = TokenManager(
+            self.client.refresh_token,
+            self.token_persistence,
+            refresh_margin_seconds=settings.sync.token_refresh_margin_seconds,
+        )
+        self.activity_persistence = build_activity_persistence(settings)
+        self.sync_state = SyncStatePersistence(settings.paths.sync_state_file)
+        self.journal = SyncJournal(
+            settings.paths.journal_file
+            or settings.paths.data_dir / "sync_journal.sqlite"
         )
+        self.failures = FailureStore(
+            settings.paths.failures_file
+            or settings.paths.data_dir / "stream_failures.sqlite",
+            retry_seconds=settings.sync.failure_retry_seconds,
+            max_retry_seconds=settings.sync.failure_max_retry_seconds,
+        )
+        self.stream_options = StreamOptions(
+            keys=tuple(settings.sync.stream_keys),
+            resolution=settings.sync.stream_resolution,
+            series_type=settings.sync.stream_series_type,
+        )
+        self.writer_stats = WriterStats()
+        self._encoding_pool: ProcessPoolExecutor | None = None
         self.max_auth_attempts = max_auth_attempts
         self._auth_attempts = 0
 
+    def _cassette_adapter(self) -> BaseAdapter | None:
+        """Return the transport adapter for the configured cassette mode, if any."""
+        api = self.settings.strava_api
+        if api.cassette_mode == "off":
+            return None
+        cassette_file = (
+            api.cassette_file or self.settings.paths.data_dir / "cassette.sqlite"
+        )
+        logging.info(f"Cassette mode '{api.cassette_mode}' using {cassette_file}.")
+        return cassette_adapter(
+            api.cassette_mode,
+            cassette_file,
+            max_connections=self.settings.sync.max_concurrent_requests,
+            latency_scale=api.cassette_latency_scale,
+        )
+
+    def close(self) -> None:
+        """Stop the token refresh and encoding workers; release database handles."""
+        self.tokens.stop()
+        if self._encoding_pool is not None:
+            self._encoding_pool.shutdown()
+            self._encoding_pool = None
+        self.activity_persistence.close()
+        self.client.close()
+        self.journal.close()
+        self.failures.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+
     def _get_valid_token(self) -> Token:
         """
         Ensure a valid Strava token is available, refreshing it if necessary.
@@ -49,9 +236,10 @@ class StravaSyncPipeline:
         if token and token.is_expired():
             logging.info("Strava token has expired. Refreshing...")
             try:
-                new_token = self.client.refresh_token(token.refresh_token)
-                self.token_persistence.write(new_token)
-                return new_token
+                # Refreshed under the token file lock, or taken over from
+                # another process that refreshed it first.
+                self.tokens.set(token)
+                return self.tokens.refresh(token)
             except UnauthorizedError:
                 logging.warning("Token refresh failed. Please re-authorize.")
                 self._auth_attempts += 1
@@ -75,104 +263,736 @@ class StravaSyncPipeline:
         self._auth_attempts = 0  # Reset attempts on successful authorization
         return new_token
 
-    def _sync_activities(self, token: Token) -> None:
-        """Synchronize all activity summaries."""
-        logging.info("Starting activity summary synchronization.")
+    def _with_token(self, request: Callable[..., Any], *args: Any, **kwargs: Any):
+        """
+        Call `request` with the current access token as its first argument.
 
-        existing_activities_df = self.activity_persistence.read_cache()
-        all_activities = []
-        if existing_activities_df is not None:
-            all_activities.append(existing_activities_df)
+        A 401 means the token was revoked or expired early; the token is then
+        refreshed (once for all workers that hit it) and the call retried.
+        """
+        token = self.tokens.get()
+        try:
+            return request(token.access_token, *args, **kwargs)
+        except UnauthorizedError:
+            token = self.tokens.refresh(token)
+            return request(token.access_token, *args, **kwargs)
 
-        for page in range(1, self.settings.sync.max_pages + 1):
-            logging.info(f"Fetching activity page {page}...")
-            activities = self.client.get_activities(
-                token.access_token, page, per_page=100
-            )
-            if not activities:
-                logging.info("No more activities found. Stopping.")
-                break
-            all_activities.append(pd.json_normalize(activities))
+    async def _with_token_async(
+        self, request: Callable[..., Any], *args: Any, **kwargs: Any
+    ):
+        """Await `request` with the current access token, like `_with_token`."""
+        token = self.tokens.get()
+        try:
+            return await request(token.access_token, *args, **kwargs)
+        except UnauthorizedError:
+            token = await asyncio.to_thread(self.tokens.refresh, token)
+            return await request(token.access_token, *args, **kwargs)
 
-        if not all_activities:
-            logging.info("No activities found to synchronize.")
-            return
+    def _activities_after(self, full: bool) -> int | None:
+        """
+        Return the `after` timestamp for an incremental sync, or None for a full one.
+
+        The persisted high-water mark is preferred; caches written before it
+        existed fall back to the newest `start_date` in the cache.
+        """
+        if full:
+            return None
+        after = self.sync_state.read_activities_after()
+        if after is None:
+            existing_activities_df = self.activity_persistence.read_cache()
+            if existing_activities_df is not None:
+                after = _newest_start_timestamp(existing_activities_df)
+        return after
+
+    def _sync_activities(self, full: bool = False) -> pd.DataFrame:
+        """
+        Synchronize activity summaries.
+
+        By default only activities newer than the stored high-water mark are
+        requested. With `full=True`, every page up to `max_pages` is walked.
+        Every fetched page is checkpointed in the journal, so an interrupted
+        walk resumes after the last page it fetched.
+
+        Returns:
+            The activities fetched from the API during this walk.
 
-        combined_df = (
-            pd.concat(all_activities)
-            .drop_duplicates(subset="id")
-            .reset_index(drop=True)
+        """
+        logging.info("Starting activity summary synchronization.")
+
+        after = self._activities_after(full)
+        last_page, fetched_pages = self._resume_activity_walk(after)
+        per_page = self.settings.sync.activities_per_page
+        max_pages = self.settings.sync.max_pages
+        window = 1
+        next_page = last_page + 1
+        in_flight: deque[tuple[int, Future]] = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=self.settings.sync.activity_page_window
         )
-        self.activity_persistence.write_cache(combined_df)
+
+        try:
+            while True:
+                while len(in_flight) < window and next_page <= max_pages:
+                    logging.info(f"Fetching activity page {next_page}...")
+                    future = executor.submit(
+                        self._with_token,
+                        self.client.get_activities,
+                        next_page,
+                        per_page=per_page,
+                        after=after,
+                    )
+                    in_flight.append((next_page, future))
+                    next_page += 1
+                if not in_flight:
+                    break
+                page, future = in_flight.popleft()
+                activities = future.result()
+                if not self._record_activity_page(after, page, activities):
+                    break
+                fetched_pages.append(activities)
+                window = self._next_page_window(window, activities)
+        finally:
+            # Pages past the end (or past a failure) are not needed.
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return self._write_activities(fetched_pages)
+
+    def _record_activity_page(
+        self, after: int | None, page: int, activities: list[dict]
+    ) -> bool:
+        """Checkpoint a fetched page; return False once the end is reached."""
+        if not activities:
+            logging.info("No more activities found. Stopping.")
+            return False
+        self.journal.record_activity_page(after, page, activities)
+        return True
+
+    def _next_page_window(self, window: int, activities: list[dict]) -> int:
+        """
+        Return how many pages to keep in flight after a page came back.
+
+        Full pages mean more are likely to follow, so the window doubles up to
+        `activity_page_window`; a short page suggests the end is near and
+        keeps the walk sequential to avoid requesting empty pages.
+        """
+        if len(activities) < self.settings.sync.activities_per_page:
+            return 1
+        return min(window * 2, self.settings.sync.activity_page_window)
+
+    def _resume_activity_walk(self, after: int | None) -> tuple[int, list[list[dict]]]:
+        """Return the last fetched page and the pages staged by an earlier walk."""
+        if after is not None:
+            logging.info(f"Fetching activities started after {after} (incremental).")
+        last_page, fetched_pages = self.journal.resume_activity_walk(after)
+        if last_page:
+            logging.info(f"Resuming interrupted activity walk after page {last_page}.")
+        return last_page, fetched_pages
+
+    def _write_activities(self, fetched_pages: list[list[dict]]) -> pd.DataFrame:
+        """
+        Upsert freshly fetched activity pages into the cache.
+
+        Returns:
+            The fetched activities as a DataFrame (empty if none were fetched).
+
+        """
+        if not fetched_pages:
+            logging.info("No new activities found to synchronize.")
+            self.journal.finish_activity_walk()
+            return pd.DataFrame()
+
+        fetched_df = pd.json_normalize([a for page in fetched_pages for a in page])
+        self.activity_persistence.upsert_activities(fetched_df)
         logging.info(
-            f"Activity cache updated with {len(combined_df)} total activities."
+            f"Activity cache updated with {len(fetched_df)} new or changed activities."
         )
 
-    def _sync_streams(self, token: Token) -> None:
-        """Synchronize all missing activity streams."""
-        logging.info("Starting activity stream synchronization.")
+        newest = _newest_start_timestamp(fetched_df)
+        previous = self.sync_state.read_activities_after()
+        if newest is not None and (previous is None or newest > previous):
+            self.sync_state.write_activities_after(newest)
+        self.journal.finish_activity_walk()
+        return fetched_df
 
-        activities_df = self.activity_persistence.read_cache()
-        if activities_df is None or activities_df.empty:
-            logging.warning("No activities found in cache. Cannot sync streams.")
-            return
+    def _rate_limit_wait_seconds(self) -> float:
+        """
+        Seconds to wait after a 429: until the exhausted window resets.
+
+        Falls back to `retry_interval_seconds` if the limiter has no budget
+        information pointing at a reset.
+        """
+        wait_time = self.rate_limiter.seconds_until_available()
+        return wait_time if wait_time > 0 else self.settings.sync.retry_interval_seconds
+
+    def _select_stream_candidates(
+        self, activities_df: pd.DataFrame, existing_stream_ids: set[int]
+    ) -> list[int]:
+        """
+        Return the activities without stored streams.
 
-        existing_stream_ids = self.activity_persistence.get_existing_stream_ids()
+        Trainer activities are skipped if so configured, as are activities
+        whose stream fetch failed permanently or is not due for a retry yet.
+        """
         activities_to_sync = activities_df[
             ~activities_df["id"].isin(existing_stream_ids)
         ]
-
-        if activities_to_sync.empty:
-            logging.info("All activity streams are already up to date.")
-            return
-
-        logging.info(f"Found {len(activities_to_sync)} activities needing streams.")
-
+        skipped_failures = self.failures.skipped_ids()
+        failed = 0
+        activity_ids = []
         for _, activity in activities_to_sync.iterrows():
-            activity_id = activity["id"]
+            activity_id = int(activity["id"])
             if self.settings.sync.skip_trainer_activities and activity.get(
                 "trainer", False
             ):
                 logging.info(f"Skipping trainer activity {activity_id}.")
                 continue
+            if activity_id in skipped_failures:
+                failed += 1
+                continue
+            activity_ids.append(activity_id)
+        if failed:
+            logging.info(
+                f"Skipping {failed} activities whose stream fetch failed before; "
+                "see `strava-fetcher retry-failed`."
+            )
+        return activity_ids
+
+    def _find_activities_needing_streams(self) -> list[int]:
+        """Return the IDs of cached activities whose streams are not stored yet."""
+        activities_df = self.activity_persistence.read_cache()
+        if activities_df is None or activities_df.empty:
+            logging.warning("No activities found in cache. Cannot sync streams.")
+            return []
+
+        activity_ids = self._select_stream_candidates(
+            activities_df, self.activity_persistence.get_existing_stream_ids()
+        )
+        if not activity_ids:
+            logging.info("All activity streams are already up to date.")
+            return []
+
+        logging.info(f"Found {len(activity_ids)} activities needing streams.")
+        return activity_ids
+
+    def _plan_streams(self) -> list[int]:
+        """
+        Return the activities whose streams should be fetched now.
+
+        An unfinished plan in the journal is resumed as-is, without reading the
+        activity cache or the stream index. Otherwise a fresh plan is computed
+        and recorded.
+        """
+        pending = self.journal.pending_activity_ids()
+        if pending:
+            logging.info(
+                f"Resuming stream sync with {len(pending)} activities left "
+                "in the journal."
+            )
+            return pending
+        activity_ids = self._find_activities_needing_streams()
+        self.journal.start_stream_plan(activity_ids)
+        return activity_ids
+
+    def _extend_stream_plan(self, fetched_df: pd.DataFrame) -> None:
+        """Add newly fetched activities to a stream plan resumed from the journal."""
+        if fetched_df.empty or "id" not in fetched_df.columns:
+            return
+        activity_ids = self._select_stream_candidates(
+            fetched_df, self.activity_persistence.get_existing_stream_ids()
+        )
+        added = self.journal.add_to_stream_plan(activity_ids)
+        if added:
+            logging.info(f"Added {added} new activities to the unfinished stream plan.")
+
+    def _store_streams(
+        self,
+        activity_id: int,
+        streams_data: dict,
+        options: StreamOptions | None = None,
+    ) -> None:
+        """Convert a streams payload into a typed DataFrame and persist it."""
+        stream_df = decode_streams(streams_data)
+        self.activity_persistence.write_stream(
+            activity_id, stream_df, options or self.stream_options
+        )
+        self.journal.mark(activity_id, DONE)
+        self.failures.clear([activity_id])
+
+    def _merge_streams(
+        self,
+        activity_id: int,
+        streams_data: dict,
+        options: StreamOptions | None = None,
+    ) -> None:
+        """Merge a payload of additional stream types into the stored streams."""
+        self.activity_persistence.merge_stream(
+            activity_id, decode_streams(streams_data), options or self.stream_options
+        )
 
-            logging.info(f"Fetching streams for activity {activity_id}...")
+    def _store_encoded_streams(
+        self,
+        activity_id: int,
+        encoded: EncodedStream,
+        options: StreamOptions | None = None,
+    ) -> None:
+        """Persist streams encoded by an encoding worker."""
+        self.activity_persistence.write_encoded_stream(
+            activity_id, encoded, options or self.stream_options
+        )
+        self.journal.mark(activity_id, DONE)
+        self.failures.clear([activity_id])
+
+    def _encoder(self) -> ProcessPoolExecutor | None:
+        """Return the encoding worker pool, if `encoding_processes` enables one."""
+        processes = self.settings.sync.encoding_processes
+        if processes and self._encoding_pool is None:
+            # Spawned rather than forked: the parent already runs threads.
+            self._encoding_pool = ProcessPoolExecutor(
+                processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._encoding_pool
+
+    def _stream_writer(self, store: StoreStreams | None = None) -> StreamWriter:
+        """
+        Return a writer persisting payloads with `store`, keeping its stats.
+
+        New streams (no custom `store`) are decoded and encoded in the
+        encoding worker pool when one is configured.
+        """
+        encoder = self._encoder() if store is None else None
+        if encoder is not None:
+            writer = StreamWriter(
+                self._store_encoded_streams,
+                self._record_stream_failure,
+                max_queue_size=self.settings.sync.write_queue_size,
+                transform=partial(
+                    encode_stream_payload,
+                    backend=self.activity_persistence.stream_backend,
+                ),
+                encoder=encoder,
+            )
+        else:
+            writer = StreamWriter(
+                store or self._store_streams,
+                self._record_stream_failure,
+                max_queue_size=self.settings.sync.write_queue_size,
+            )
+        self.writer_stats = writer.stats
+        return writer
+
+    def _record_stream_failure(self, activity_id: int, error: Exception) -> None:
+        """Log a failed stream fetch and record it in the journal and failure store."""
+        if isinstance(error, RateLimitError):
+            # Not attempted successfully; leave it for the resumed run.
+            self.journal.mark(activity_id, PENDING)
+            return
+        logging.error(f"Failed to fetch streams for activity {activity_id}: {error}")
+        self.journal.mark(activity_id, FAILED, str(error))
+        record = self.failures.record(activity_id, error)
+        if record.permanent:
+            logging.warning(
+                f"Activity {activity_id} is not accessible "
+                f"(HTTP {record.status_code}); its streams will not be requested "
+                "again."
+            )
+
+    def _sync_streams(self) -> None:
+        """Synchronize all missing activity streams."""
+        logging.info("Starting activity stream synchronization.")
+        activity_ids = self._plan_streams()
+        if activity_ids:
+            self._fetch_streams_concurrently(activity_ids)
+
+    def _backfill_stream_keys(self) -> None:
+        """
+        Fetch only the configured stream types missing from stored streams.
+
+        Progress is recorded in the stream manifest (or request log) as each
+        activity is merged, so an interrupted backfill recomputes its (smaller)
+        plan. Activities whose fetched streams do not line up with the stored
+        ones are fetched again with every stream type, replacing them.
+        """
+        logging.info("Checking stored streams for missing stream types.")
+        persistence = self.activity_persistence
+        missing = persistence.streams_missing_keys(
+            self.stream_options.keys,
+            self.stream_options.resolution,
+            self.stream_options.series_type,
+        )
+        if not missing:
+            logging.info("All stored streams contain the configured stream types.")
+            return
+        logging.info(f"Backfilling stream types for {len(missing)} activities.")
+        mismatched: list[int] = []
+
+        def merge(
+            activity_id: int, streams_data: dict, options: StreamOptions | None = None
+        ) -> None:
             try:
-                streams_data = self.client.get_activity_streams(
-                    token.access_token, activity_id
-                )
-                stream_df = pd.DataFrame(
-                    {k: v["data"] for k, v in streams_data.items()}
+                self._merge_streams(activity_id, streams_data, options)
+            except StreamMismatchError as e:
+                logging.warning(f"{e} Fetching all of its stream types again.")
+                mismatched.append(activity_id)
+
+        self._fetch_streams_concurrently(
+            sorted(missing),
+            options_by_id={
+                activity_id: replace(self.stream_options, keys=keys)
+                for activity_id, keys in missing.items()
+            },
+            store=merge,
+        )
+        if mismatched:
+            stored = persistence.stored_stream_keys()
+            wanted = self.stream_options.keys
+            self._fetch_streams_concurrently(
+                sorted(mismatched),
+                options_by_id={
+                    activity_id: replace(
+                        self.stream_options,
+                        keys=tuple(dict.fromkeys((*wanted, *stored[activity_id]))),
+                    )
+                    for activity_id in mismatched
+                },
+            )
+
+    def _fetch_streams_concurrently(
+        self,
+        activity_ids: list[int],
+        options_by_id: Mapping[int, StreamOptions] | None = None,
+        store: StoreStreams | None = None,
+    ) -> None:
+        """
+        Fetch streams for the given activities using a bounded worker pool.
+
+        At most `max_concurrent_requests` requests are in flight at any time.
+        Each result is handed to a `StreamWriter` as soon as it arrives, so the
+        next request goes out while the previous payload is still being
+        written. On a rate-limit error no new requests are issued; the requests
+        already in flight are drained (and saved if they succeeded) before the
+        error is propagated.
+
+        Args:
+            activity_ids: The activities to fetch, in order.
+            options_by_id: Per-activity request options; defaults to the
+                configured stream options.
+            store: Persists one payload; defaults to writing it as new streams.
+
+        """
+        options_by_id = options_by_id or {}
+        max_workers = self.settings.sync.max_concurrent_requests
+        pending_ids = iter(activity_ids)
+        rate_limited = False
+
+        with (
+            self._stream_writer(store) as writer,
+            ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="stream-fetch"
+            ) as executor,
+        ):
+            in_flight: dict[Future, int] = {}
+
+            def submit_next() -> bool:
+                activity_id = next(pending_ids, None)
+                if activity_id is None:
+                    return False
+                logging.info(f"Fetching streams for activity {activity_id}...")
+                self.journal.mark(activity_id, IN_FLIGHT)
+                future = executor.submit(
+                    self._with_token,
+                    self.client.get_activity_streams,
+                    activity_id,
+                    options_by_id.get(activity_id, self.stream_options),
                 )
-                self.activity_persistence.write_stream(activity_id, stream_df)
+                in_flight[future] = activity_id
+                return True
+
+            while len(in_flight) < max_workers and submit_next():
+                pass
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    activity_id = in_flight.pop(future)
+                    try:
+                        streams_data = future.result()
+                    except Exception as e:
+                        rate_limited |= isinstance(e, RateLimitError)
+                        self._record_stream_failure(activity_id, e)
+                    else:
+                        writer.submit(
+                            activity_id,
+                            streams_data,
+                            options_by_id.get(activity_id, self.stream_options),
+                        )
+                    if not rate_limited:
+                        submit_next()
+
+        # Make the batch durable before a potentially long rate-limit wait.
+        self.activity_persistence.flush()
+        if rate_limited:
+            wait_time = self._rate_limit_wait_seconds()
+            logging.warning(f"Rate limit hit. Waiting {wait_time:.0f} seconds...")
+            time.sleep(wait_time)
+            # Re-raise to be handled by the main run loop
+            raise RateLimitError()
+
+    async def _sync_activities_async(
+        self, client: AsyncStravaClient, full: bool = False
+    ) -> pd.DataFrame:
+        """Synchronize activity summaries using the asyncio client."""
+        logging.info("Starting activity summary synchronization.")
+
+        after = self._activities_after(full)
+        last_page, fetched_pages = self._resume_activity_walk(after)
+        per_page = self.settings.sync.activities_per_page
+        max_pages = self.settings.sync.max_pages
+        window = 1
+        next_page = last_page + 1
+        in_flight: deque[tuple[int, asyncio.Task]] = deque()
+
+        try:
+            while True:
+                while len(in_flight) < window and next_page <= max_pages:
+                    logging.info(f"Fetching activity page {next_page}...")
+                    task = asyncio.create_task(
+                        self._with_token_async(
+                            client.get_activities,
+                            next_page,
+                            per_page=per_page,
+                            after=after,
+                        )
+                    )
+                    in_flight.append((next_page, task))
+                    next_page += 1
+                if not in_flight:
+                    break
+                page, task = in_flight.popleft()
+                activities = await task
+                if not self._record_activity_page(after, page, activities):
+                    break
+                fetched_pages.append(activities)
+                window = self._next_page_window(window, activities)
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(*(t for _, t in in_flight), return_exceptions=True)
+
+        return self._write_activities(fetched_pages)
+
+    async def _sync_streams_async(self, client: AsyncStravaClient) -> None:
+        """
+        Synchronize all missing activity streams using the asyncio client.
+
+        Every missing activity gets its own task, but a semaphore keeps at most
+        `max_concurrent_requests` requests in flight. Results are queued to a
+        `StreamWriter` as they complete, so disk writes never block the event
+        loop. After a rate-limit error, tasks still waiting for the semaphore
+        return without issuing their request.
+        """
+        logging.info("Starting activity stream synchronization.")
+        activity_ids = self._plan_streams()
+        if not activity_ids:
+            return
+
+        semaphore = asyncio.Semaphore(self.settings.sync.max_concurrent_requests)
+        rate_limited = False
+
+        async def fetch(activity_id: int) -> tuple[int, dict | None, Exception | None]:
+            async with semaphore:
+                if rate_limited:
+                    return activity_id, None, None
+                logging.info(f"Fetching streams for activity {activity_id}...")
+                self.journal.mark(activity_id, IN_FLIGHT)
+                try:
+                    data = await self._with_token_async(
+                        client.get_activity_streams, activity_id, self.stream_options
+                    )
+                    return activity_id, data, None
+                except Exception as e:
+                    return activity_id, None, e
+
+        tasks = [
+            asyncio.create_task(fetch(activity_id)) for activity_id in activity_ids
+        ]
+        writer = self._stream_writer().start()
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                activity_id, streams_data, error = await next_done
+                if error is not None:
+                    rate_limited |= isinstance(error, RateLimitError)
+                    self._record_stream_failure(activity_id, error)
+                elif streams_data is not None:
+                    # Blocks while the queue is full, so wait off the loop.
+                    await asyncio.to_thread(
+                        writer.submit, activity_id, streams_data, self.stream_options
+                    )
+        finally:
+            await asyncio.to_thread(writer.close)
+
+        self.activity_persistence.flush()
+        if rate_limited:
+            wait_time = self._rate_limit_wait_seconds()
+            logging.warning(f"Rate limit hit. Waiting {wait_time:.0f} seconds...")
+            await asyncio.sleep(wait_time)
+            raise RateLimitError()
+
+    def _log_request_stats(self) -> None:
+        stats = self.retry_stats
+        if stats.retries or stats.exhausted:
+            reasons = ", ".join(f"{r}: {n}" for r, n in stats.by_reason.most_common())
+            logging.info(
+                f"Retried {stats.retries} transient API failures ({reasons}); "
+                f"{stats.exhausted} requests failed after all retries."
+            )
+        if self.http_cache is not None and self.http_cache.stats.hits:
+            cache_stats = self.http_cache.stats
+            logging.info(
+                f"{cache_stats.hits} activity pages unchanged since the last sync "
+                f"({cache_stats.bytes_saved / 1024:.0f} KiB served from the cache)."
+            )
+
+    def _sync_missing_stream_keys(self) -> None:
+        """Run `_backfill_stream_keys`, waiting out rate limits until it completes."""
+        while True:
+            try:
+                self._backfill_stream_keys()
+                break
             except RateLimitError:
-                wait_time = self.settings.sync.retry_interval_seconds
-                logging.warning(f"Rate limit hit. Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
-                # Re-raise to be handled by the main run loop
-                raise
-            except Exception as e:
-                logging.error(
-                    f"Failed to fetch streams for activity {activity_id}: {e}"
-                )
+                continue
+
+    def retry_failed(self, include_permanent: bool = False) -> int:
+        """
+        Fetch the streams of activities in the failure store right away.
+
+        Unlike a regular sync, this ignores the retry schedule. Activities
+        that fail again stay in the store with their attempt count increased.
+
+        Args:
+            include_permanent: Also retry activities that failed with a
+                permanent error, e.g. after making a private activity public.
+
+        Returns:
+            The number of activities whose streams are stored now.
 
-    def run(self) -> None:
-        """Execute the full data synchronization pipeline."""
+        """
+        started = time.time()
+        activity_ids = self.failures.failed_ids(include_permanent)
+        logging.info(f"Retrying stream fetches for {len(activity_ids)} activities.")
+        try:
+            if activity_ids:
+                self.tokens.set(self._get_valid_token())
+                self.tokens.start()
+            remaining = activity_ids
+            while remaining:
+                try:
+                    self._fetch_streams_concurrently(remaining)
+                    break
+                except RateLimitError:
+                    remaining = self.failures.failed_ids(
+                        include_permanent, failed_before=started
+                    )
+            still_failed = set(self.failures.failed_ids(include_permanent=True))
+        finally:
+            self.close()
+        self._log_request_stats()
+        return sum(activity_id not in still_failed for activity_id in activity_ids)
+
+    def run(
+        self,
+        full: bool = False,
+        rebuild_index: bool = False,
+        backfill_keys: bool = False,
+    ) -> None:
+        """
+        Execute the full data synchronization pipeline.
+
+        Args:
+            full: If True, walk every activity page instead of only fetching
+                activities newer than the last sync.
+            rebuild_index: If True, re-create the stream index from the files
+                in the streams directory (or the archive segments) before
+                syncing streams.
+            backfill_keys: If True, afterwards fetch the configured stream
+                types missing from already stored streams and merge them in.
+
+        """
         logging.info("--- Starting Strava Data Synchronization ---")
 
         try:
-            token = self._get_valid_token()
-            self._sync_activities(token)
+            self.tokens.set(self._get_valid_token())
+            self.tokens.start()
+            fetched_df = self._sync_activities(full=full)
+            self._extend_stream_plan(fetched_df)
+            if rebuild_index:
+                self.activity_persistence.rebuild_stream_index()
 
             while True:
                 try:
-                    self._sync_streams(token)
+                    self._sync_streams()
                     break  # Exit loop if sync completes without rate limit error
                 except RateLimitError:
                     continue  # Loop will restart after waiting
+            if backfill_keys:
+                self._sync_missing_stream_keys()
+
+        except Exception as e:
+            logging.critical(f"A critical error occurred: {e}", exc_info=True)
+            raise
+        finally:
+            self.close()
+
+        self._log_request_stats()
+        logging.info("--- Strava Data Synchronization Completed ---")
+
+    async def run_async(
+        self,
+        full: bool = False,
+        rebuild_index: bool = False,
+        backfill_keys: bool = False,
+    ) -> None:
+        """
+        Execute the full pipeline on top of `AsyncStravaClient`.
+
+        The token is obtained with the blocking client (authorization may need
+        user input); activity pages and streams are then fetched over a pooled
+        asyncio connection whose size matches `max_concurrent_requests`. A
+        stream type backfill runs on the blocking client in a worker thread.
+        """
+        logging.info("--- Starting Strava Data Synchronization (asyncio) ---")
+        if self.settings.strava_api.cassette_mode != "off":
+            raise ConfigError(
+                "Cassette recording and replay are only supported by the "
+                "blocking client; run without --async."
+            )
+
+        try:
+            self.tokens.set(self._get_valid_token())
+            self.tokens.start()
+            async with AsyncStravaClient(
+                self.settings.strava_api,
+                max_connections=self.settings.sync.max_concurrent_requests,
+                controls=self.request_controls,
+            ) as client:
+                fetched_df = await self._sync_activities_async(client, full=full)
+                self._extend_stream_plan(fetched_df)
+                if rebuild_index:
+                    self.activity_persistence.rebuild_stream_index()
+
+                while True:
+                    try:
+                        await self._sync_streams_async(client)
+                        break
+                    except RateLimitError:
+                        continue
+            if backfill_keys:
+                await asyncio.to_thread(self._sync_missing_stream_keys)
 
         except Exception as e:
             logging.critical(f"A critical error occurred: {e}", exc_info=True)
             raise
+        finally:
+            self.close()
 
+        self._log_request_stats()
         logging.info("--- Strava Data Synchronization Completed ---")
@@ -0,0 +1,210 @@
+"""
+Client-side scheduling of requests against Strava's rate limits.
+
+Strava enforces two windows per application: a short one that resets every
+15 minutes on the quarter hour and a daily one that resets at midnight UTC.
+Every response reports the limits and current usage of both windows in the
+`X-RateLimit-Limit`/`X-RateLimit-Usage` headers (and, for read requests, the
+stricter `X-ReadRateLimit-*` pair) as comma-separated "short,daily" values.
+
+`RateLimiter` keeps a budget for each window, reserves one unit per request
+before it is sent, reconciles the budget with the headers of every response,
+and blocks only until the exact reset time of an exhausted window.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime, timedelta
+
+SHORT_WINDOW_SECONDS = 15 * 60
+
+# Header pairs in order of preference; the read limits are stricter and apply
+# to every request this package makes.
+_HEADER_PAIRS = (
+    ("X-ReadRateLimit-Limit", "X-ReadRateLimit-Usage"),
+    ("X-RateLimit-Limit", "X-RateLimit-Usage"),
+)
+
+
+def _short_window_start(now: float) -> float:
+    return now - (now % SHORT_WINDOW_SECONDS)
+
+
+def _daily_window_start(now: float) -> float:
+    day = datetime.fromtimestamp(now, tz=UTC).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return day.timestamp()
+
+
+def _daily_window_end(start: float) -> float:
+    day = datetime.fromtimestamp(start, tz=UTC) + timedelta(days=1)
+    return day.timestamp()
+
+
+class RateLimitWindow:
+    """Budget of a single fixed rate-limit window."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        start_of: Callable[[float], float],
+        end_of: Callable[[float], float],
+    ):
+        self.name = name
+        self.limit = limit
+        self.usage = 0
+        self._start_of = start_of
+        self._end_of = end_of
+        self.window_start = float("-inf")
+
+    def roll(self, now: float) -> None:
+        """Reset the usage if `now` falls into a new window."""
+        start = self._start_of(now)
+        if start != self.window_start:
+            self.window_start = start
+            self.usage = 0
+
+    @property
+    def reset_at(self) -> float:
+        """Unix timestamp at which the current window resets."""
+        return self._end_of(self.window_start)
+
+    @property
+    def remaining(self) -> int:
+        """Requests left in the current window."""
+        return max(self.limit - self.usage, 0)
+
+
+class RateLimiter:
+    """
+    Thread-safe request budget tracking Strava's short and daily windows.
+
+    Args:
+        short_limit: Requests allowed per 15-minute window until a response
+            reports the real value.
+        daily_limit: Requests allowed per day until a response reports the
+            real value.
+        reserve: Requests held back in each window as a safety margin for
+            other clients sharing the same application.
+        clock: Source of the current Unix time.
+
+    """
+
+    def __init__(
+        self,
+        short_limit: int = 100,
+        daily_limit: int = 1000,
+        reserve: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.reserve = reserve
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.short = RateLimitWindow(
+            "15-minute",
+            short_limit,
+            _short_window_start,
+            lambda start: start + SHORT_WINDOW_SECONDS,
+        )
+        self.daily = RateLimitWindow(
+            "daily", daily_limit, _daily_window_start, _daily_window_end
+        )
+
+    @property
+    def windows(self) -> tuple[RateLimitWindow, RateLimitWindow]:
+        """Both windows, shortest first."""
+        return self.short, self.daily
+
+    def _delay(self, now: float) -> float:
+        """Seconds until every window has budget left. Caller holds the lock."""
+        delay = 0.0
+        for window in self.windows:
+            window.roll(now)
+            if window.remaining <= self.reserve:
+                delay = max(delay, window.reset_at - now)
+        return delay
+
+    def _reserve(self) -> float:
+        """Reserve one request, or return the seconds to wait before retrying."""
+        with self._lock:
+            delay = self._delay(self._clock())
+            if delay > 0:
+                return delay
+            for window in self.windows:
+                window.usage += 1
+            return 0.0
+
+    def acquire(self, sleep: Callable[[float], None] = time.sleep) -> None:
+        """Block until the request budget allows one more request, then take it."""
+        while (delay := self._reserve()) > 0:
+            logging.warning(
+                f"Rate-limit budget exhausted. Waiting {delay:.0f} seconds "
+                "for the window to reset..."
+            )
+            sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Asyncio variant of `acquire`."""
+        while (delay := self._reserve()) > 0:
+            logging.warning(
+                f"Rate-limit budget exhausted. Waiting {delay:.0f} seconds "
+                "for the window to reset..."
+            )
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Reconcile the budget with the limits and usage reported by Strava."""
+        for limit_header, usage_header in _HEADER_PAIRS:
+            if limit_header in headers and usage_header in headers:
+                limit_value = headers[limit_header]
+                usage_value = headers[usage_header]
+                break
+        else:
+            return
+
+        try:
+            limits = [int(v) for v in limit_value.split(",")]
+            usages = [int(v) for v in usage_value.split(",")]
+        except ValueError:
+            logging.debug(f"Ignoring malformed rate-limit headers: {headers}")
+            return
+
+        with self._lock:
+            now = self._clock()
+            for window, limit, usage in zip(self.windows, limits, usages, strict=False):
+                window.roll(now)
+                window.limit = limit
+                # Requests still in flight were reserved locally but not yet
+                # counted by the server, so never lower the local count.
+                window.usage = max(window.usage, usage)
+
+    def mark_exhausted(self) -> None:
+        """Treat the short window as used up, e.g. after an unexpected 429."""
+        with self._lock:
+            self.short.roll(self._clock())
+            self.short.usage = max(self.short.usage, self.short.limit)
+
+    def seconds_until_available(self) -> float:
+        """Seconds until the next request may be sent (0 if it may go now)."""
+        with self._lock:
+            return self._delay(self._clock())
+
+
+class UnlimitedRateLimiter(RateLimiter):
+    """
+    Rate limiter that never waits, for responses that do not reach Strava.
+
+    Replayed cassettes are served locally, so neither the configured limits
+    nor the recorded rate-limit headers apply to them.
+    """
+
+    def _delay(self, now: float) -> float:
+        return 0.0
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Ignore the reported usage; replayed headers describe another run."""
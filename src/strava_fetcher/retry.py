@@ -0,0 +1,100 @@
+"""
+Retrying transient Strava API failures.
+
+A 502 from a load balancer or a connection reset says nothing about the
+request itself, so giving up on it drops an activity until the next run
+re-scans. `RetryPolicy` decides which failures are transient and how long to
+back off before the next attempt: exponentially growing delays with "full
+jitter" (a random delay between zero and the exponential bound), so that
+concurrent workers failing together do not retry in lockstep. A `Retry-After`
+header sent with the response takes precedence over the computed delay.
+
+Rate-limit responses (429) are not retried here; the pipeline waits for the
+exhausted window to reset instead. Only idempotent (GET) requests are retried.
+"""
+
+import random
+import threading
+from collections import Counter
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+DEFAULT_RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Return the delay in seconds given by a `Retry-After` header, if valid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max(0.0, (when - (now or datetime.now(UTC))).total_seconds())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often, and after how long, failed requests are retried."""
+
+    max_retries: int = 3
+    backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 60.0
+    retry_statuses: frozenset[int] = DEFAULT_RETRY_STATUSES
+
+    def next_delay(
+        self,
+        attempt: int,
+        headers: Mapping[str, str] | None = None,
+        uniform: Callable[[float, float], float] = random.uniform,
+    ) -> float | None:
+        """
+        Return the seconds to wait after failed attempt `attempt` (from 1).
+
+        Honours `Retry-After` if the response carried one; otherwise draws a
+        random delay up to `backoff_seconds * 2 ** (attempt - 1)`, capped at
+        `max_backoff_seconds`.
+
+        Returns:
+            The delay, or None if no attempts are left or the server asks to
+            wait longer than `max_backoff_seconds`.
+
+        """
+        if attempt > self.max_retries:
+            return None
+        retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff_seconds else None
+        bound = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        return uniform(0.0, bound)
+
+
+@dataclass
+class RetryStats:
+    """Counts of retried requests, by the status code or exception behind them."""
+
+    retries: int = 0
+    exhausted: int = 0
+    by_reason: Counter[str] = field(default_factory=Counter)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def record_retry(self, reason: str) -> None:
+        """Count one retry caused by `reason`."""
+        with self._lock:
+            self.retries += 1
+            self.by_reason[reason] += 1
+
+    def record_exhausted(self) -> None:
+        """Count a request that failed after its last allowed attempt."""
+        with self._lock:
+            self.exhausted += 1
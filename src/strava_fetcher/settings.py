@@ -10,10 +10,11 @@ from __future__ import annotations
 import logging
 import os
 from pathlib import Path
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
 import yaml
 from pydantic import (
+    AfterValidator,
     BaseModel,
     BeforeValidator,
     DirectoryPath,
@@ -25,6 +26,7 @@ from pydantic import (
 from pydantic_settings import BaseSettings
 
 from .exceptions import ConfigError
+from .streams import AVAILABLE_STREAM_KEYS, STREAM_KEYS
 
 
 def to_str(v: Any) -> str | None:
@@ -37,11 +39,54 @@ def to_str(v: Any) -> str | None:
 StrOrNone = Annotated[SecretStr | None, BeforeValidator(to_str)]
 
 
+def check_stream_keys(keys: list[str]) -> list[str]:
+    """Reject unknown stream types and drop duplicates."""
+    unknown = [k for k in keys if k not in AVAILABLE_STREAM_KEYS]
+    if unknown:
+        raise ValueError(
+            f"Unknown stream keys {unknown}; "
+            f"choose from {', '.join(AVAILABLE_STREAM_KEYS)}."
+        )
+    return list(dict.fromkeys(keys))
+
+
+StreamKeys = Annotated[list[str], AfterValidator(check_stream_keys)]
+
+STRAVA_API_BASE_URL = "https://www.strava.com/api/v3"
+STRAVA_OAUTH_URL = "https://www.strava.com/oauth"
+
+
 class StravaAPISettings(BaseSettings):
-    """Settings related to the Strava API credentials."""
+    """Settings related to the Strava API credentials and endpoints."""
 
     client_id: StrOrNone = None
     client_secret: StrOrNone = None
+    api_base_url: str = Field(
+        default=STRAVA_API_BASE_URL,
+        description="Base URL of the Strava REST API (override for local stand-ins).",
+    )
+    oauth_url: str = Field(
+        default=STRAVA_OAUTH_URL, description="Base URL of the Strava OAuth endpoints."
+    )
+    cassette_mode: Literal["off", "record", "replay"] = Field(
+        default="off",
+        description=(
+            "Record API responses to `cassette_file`, or replay them from it "
+            "instead of using the network."
+        ),
+    )
+    cassette_file: Path | None = Field(
+        default=None,
+        description="Cassette of recorded API responses; default in the data dir.",
+    )
+    cassette_latency_scale: float = Field(
+        default=0.0,
+        ge=0,
+        description=(
+            "Multiple of the recorded response times to wait when replaying; "
+            "0 replays as fast as possible."
+        ),
+    )
 
 
 class PathSettings(BaseModel):
@@ -60,15 +105,93 @@ class PathSettings(BaseModel):
     streams_dir: DirectoryPath | None = Field(
         default=None, description="Directory to store activity stream files."
     )
+    storage_format: Literal["csv", "parquet"] = Field(
+        default="csv",
+        description="File format of the activity cache and stream files.",
+    )
+    stream_format: Literal["csv", "parquet", "binary"] | None = Field(
+        default=None,
+        description=(
+            "File format of the stream files; defaults to storage_format. "
+            "'binary' stores memory-mappable columns for fast analytics reads."
+        ),
+    )
+    stream_layout: Literal["files", "archive"] = Field(
+        default="files",
+        description=(
+            "Store one file per activity in streams_dir, or append streams to "
+            "large segment files in stream_archive_dir."
+        ),
+    )
+    stream_archive_dir: Path | None = Field(
+        default=None,
+        description="Directory holding the stream archive segments and index.",
+    )
+    stream_archive_segment_mb: int = Field(
+        default=256,
+        gt=0,
+        description="Size in MiB after which a new archive segment is started.",
+    )
+    activities_partitioning: Literal["none", "year", "month"] = Field(
+        default="none",
+        description=(
+            "Split the activity cache into per-year or per-month files in "
+            "activities_dir so syncs only rewrite the partitions they touch."
+        ),
+    )
+    activities_dir: Path | None = Field(
+        default=None,
+        description="Directory holding the activity cache partitions.",
+    )
+    parquet_compression: str = Field(
+        default="zstd",
+        description="Compression codec used when storage_format is 'parquet'.",
+    )
+    stream_index_file: Path | None = Field(
+        default=None,
+        description="Path to the SQLite index of stored stream files.",
+    )
+    journal_file: Path | None = Field(
+        default=None,
+        description="Path to the checkpoint journal used to resume interrupted syncs.",
+    )
+    sync_state_file: Path | None = Field(
+        default=None,
+        description="Path to the incremental sync state file (high-water mark).",
+    )
+    failures_file: Path | None = Field(
+        default=None,
+        description="Path to the store of activities whose stream fetch failed.",
+    )
+    http_cache_file: Path | None = Field(
+        default=None,
+        description="Path to the cache of revalidated API responses.",
+    )
 
     def __init__(self, **data: Any):
         super().__init__(**data)
         if self.token_file is None:
             self.token_file = self.data_dir / "token.json"
         if self.activities_cache_file is None:
-            self.activities_cache_file = self.data_dir / "activities.csv"
+            self.activities_cache_file = (
+                self.data_dir / f"activities.{self.storage_format}"
+            )
         if self.streams_dir is None:
             self.streams_dir = self.data_dir / "Streams"
+        if self.activities_dir is None:
+            self.activities_dir = self.data_dir / "Activities"
+        if self.stream_archive_dir is None:
+            self.stream_archive_dir = self.data_dir / "StreamArchive"
+        if self.stream_index_file is None:
+            self.stream_index_file = self.data_dir / "stream_index.sqlite"
+        if self.journal_file is None:
+            self.journal_file = self.data_dir / "sync_journal.sqlite"
+        if self.sync_state_file is None:
+            self.sync_state_file = self.data_dir / "sync_state.json"
+        if self.failures_file is None:
+            self.failures_file = self.data_dir / "stream_failures.sqlite"
+        if self.http_cache_file is None:
+            self.http_cache_file = self.data_dir / "http_cache.sqlite"
 
 
 class SyncSettings(BaseModel):
@@ -77,12 +200,148 @@ class SyncSettings(BaseModel):
     max_pages: int = Field(
         default=100, gt=0, description="Maximum number of activity pages to fetch."
     )
+    activities_per_page: int = Field(
+        default=200,
+        gt=0,
+        le=200,
+        description="Activities requested per page (Strava allows at most 200).",
+    )
+    activity_page_window: int = Field(
+        default=8,
+        gt=0,
+        description=(
+            "Maximum number of activity pages requested concurrently. The "
+            "window starts at one page and doubles after every full page."
+        ),
+    )
     retry_interval_seconds: int = Field(
-        default=900, gt=0, description="Seconds to wait after hitting a rate limit."
+        default=900,
+        gt=0,
+        description=(
+            "Seconds to wait after hitting a rate limit when the window reset "
+            "time is unknown."
+        ),
+    )
+    max_retries: int = Field(
+        default=3,
+        ge=0,
+        description="Retries of a request failing with a transient error.",
+    )
+    retry_backoff_seconds: float = Field(
+        default=1.0,
+        ge=0,
+        description=(
+            "Upper bound of the random delay before the first retry; doubles "
+            "with every further retry."
+        ),
+    )
+    retry_max_backoff_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        description=(
+            "Longest delay between retries. A longer Retry-After from the "
+            "server fails the request instead."
+        ),
+    )
+    retry_statuses: list[int] = Field(
+        default_factory=lambda: [500, 502, 503, 504],
+        description="HTTP statuses treated as transient and retried.",
+    )
+    rate_limit_per_15_minutes: int = Field(
+        default=100,
+        gt=0,
+        description="Requests allowed per 15-minute window until Strava reports it.",
+    )
+    rate_limit_per_day: int = Field(
+        default=1000,
+        gt=0,
+        description="Requests allowed per day until Strava reports it.",
+    )
+    rate_limit_reserve: int = Field(
+        default=0,
+        ge=0,
+        description="Requests per window left unused for other clients of the app.",
+    )
+    stream_keys: StreamKeys = Field(
+        default_factory=lambda: list(STREAM_KEYS),
+        min_length=1,
+        description="Stream types requested for every activity.",
+    )
+    stream_resolution: Literal["low", "medium", "high"] | None = Field(
+        default=None,
+        description=(
+            "Downsample streams to Strava's low (~100), medium (~1000) or high "
+            "(~10000 points) resolution; full resolution if unset."
+        ),
+    )
+    stream_series_type: Literal["time", "distance"] | None = Field(
+        default=None,
+        description="Series used to downsample streams when a resolution is set.",
+    )
+    write_queue_size: int = Field(
+        default=32,
+        gt=0,
+        description=(
+            "Fetched stream payloads that may wait for the background writer "
+            "before fetching pauses."
+        ),
+    )
+    encoding_processes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Worker processes that decode and encode fetched streams; 0 "
+            "encodes them on the writer thread. Worth enabling for parquet "
+            "streams on multi-core machines."
+        ),
+    )
+    fsync_batch_size: int = Field(
+        default=100,
+        gt=0,
+        description=(
+            "Stream files written between flushes of the streams directory "
+            "(or records between flushes of the stream archive). Every write "
+            "is crash-safe; this only bounds how many completed writes a "
+            "power loss can undo."
+        ),
+    )
+    token_refresh_margin_seconds: int = Field(
+        default=600,
+        ge=0,
+        description=(
+            "Seconds before the access token expires at which it is refreshed "
+            "in the background during a sync."
+        ),
+    )
+    failure_retry_seconds: float = Field(
+        default=3600.0,
+        gt=0,
+        description=(
+            "Seconds before a transiently failed stream fetch is attempted "
+            "again; doubles with every further failure."
+        ),
+    )
+    failure_max_retry_seconds: float = Field(
+        default=7 * 24 * 3600.0,
+        gt=0,
+        description="Upper bound for the delay between failed stream fetches.",
+    )
+    http_cache_max_mb: int = Field(
+        default=64,
+        ge=0,
+        description=(
+            "Size bound of the on-disk cache of activity listing pages, which "
+            "are revalidated with ETag/Last-Modified. 0 disables the cache."
+        ),
     )
     skip_trainer_activities: bool = Field(
         default=False, description="If True, skip streams for 'trainer' activities."
     )
+    max_concurrent_requests: int = Field(
+        default=4,
+        gt=0,
+        description="Maximum number of stream requests kept in flight at once.",
+    )
 
 
 class Settings(BaseModel):
@@ -122,6 +381,8 @@ class Settings(BaseModel):
             self.paths.token_file.parent.mkdir(parents=True, exist_ok=True)
         if self.paths.activities_cache_file is not None:
             self.paths.activities_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        if self.paths.sync_state_file is not None:
+            self.paths.sync_state_file.parent.mkdir(parents=True, exist_ok=True)
 
 
 def load_settings(
@@ -0,0 +1,55 @@
+"""
+Shared plumbing for the package's small SQLite bookkeeping databases.
+
+The stream index and the sync journal are both single-file SQLite databases
+that are opened lazily, shared between threads behind a lock, and run in WAL
+mode so that frequent small commits stay cheap.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import ClassVar
+
+
+class SQLiteStore:
+    """Base class owning a lazily opened, lock-protected SQLite connection."""
+
+    schema: ClassVar[str] = ""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Open the database on first use. Caller holds the lock."""
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(self.schema)
+                self._migrate(conn)
+            self._connection = conn
+        return self._connection
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Upgrade a database created by an earlier release. Runs on open."""
+
+    def _meta_value(self, key: str) -> str | None:
+        """Return a value of the `meta` table, for stores whose schema has one."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
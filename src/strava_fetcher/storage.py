@@ -0,0 +1,269 @@
+"""
+File formats used to store activity summaries and streams.
+
+`ActivityPersistence` delegates the encoding of DataFrames to a
+`StorageBackend`, so the on-disk format can be chosen in the settings without
+the rest of the package noticing. Two backends are available:
+
+* `csv` (default): semicolon-separated text, as written by earlier releases.
+* `parquet`: compressed, columnar and typed. Requires the optional `pyarrow`
+  dependency (`pip install "strava-fetcher[parquet]"`).
+
+Streams, which are purely numeric, can additionally be stored in the `binary`
+format: uncompressed fixed-dtype columns that are read back as memory-mapped
+NumPy views without any parsing or copying.
+"""
+
+import importlib.util
+import io
+import json
+import struct
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, ClassVar
+
+import numpy as np
+import pandas as pd
+
+from .atomic import atomic_write
+from .exceptions import ConfigError
+
+# Encoded data: bytes, or a view of them such as a memory-mapped archive record.
+EncodedData = bytes | memoryview | np.ndarray
+
+
+def _to_bytes(data: EncodedData) -> bytes:
+    """Return `data` as bytes, copying it out of a view if needed."""
+    if isinstance(data, bytes):
+        return data
+    return np.frombuffer(data, dtype=np.uint8).tobytes()
+
+
+class StorageBackend(ABC):
+    """Encodes DataFrames to bytes and decodes them back."""
+
+    name: ClassVar[str]
+    extension: ClassVar[str]
+
+    @abstractmethod
+    def encode(self, df: pd.DataFrame, index: bool = False) -> bytes:
+        """Serialize a DataFrame, optionally including its index."""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> pd.DataFrame:
+        """Deserialize bytes produced by `encode`."""
+
+    @abstractmethod
+    def read(self, path: Path) -> pd.DataFrame:
+        """Read a DataFrame from a file written by `write`."""
+
+    def write(self, df: pd.DataFrame, path: Path, index: bool = False) -> None:
+        """Write a DataFrame to `path`, atomically replacing any previous file."""
+        atomic_write(path, self.encode(df, index=index))
+
+    def decode_arrays(self, data: EncodedData) -> dict[str, np.ndarray]:
+        """Decode data encoded with `index=True` into one NumPy array per column."""
+        df = self.decode(_to_bytes(data))
+        return {str(column): df[column].to_numpy() for column in df.columns}
+
+    def read_arrays(self, path: Path) -> dict[str, np.ndarray]:
+        """Read the columns of a file written with `index=True` as NumPy arrays."""
+        return self.decode_arrays(path.read_bytes())
+
+
+class CSVBackend(StorageBackend):
+    """Semicolon-separated text files."""
+
+    name = "csv"
+    extension = ".csv"
+
+    def encode(self, df: pd.DataFrame, index: bool = False) -> bytes:
+        """Serialize a DataFrame as semicolon-separated text."""
+        return df.to_csv(sep=";", index=index).encode("utf-8")
+
+    def decode(self, data: bytes) -> pd.DataFrame:
+        """Parse semicolon-separated text."""
+        return pd.read_csv(io.BytesIO(data), sep=";")
+
+    def read(self, path: Path) -> pd.DataFrame:
+        """Read a semicolon-separated file."""
+        return pd.read_csv(path, sep=";")
+
+    def decode_arrays(self, data: EncodedData) -> dict[str, np.ndarray]:
+        """Decode data encoded with `index=True`, dropping the index column."""
+        df = pd.read_csv(io.BytesIO(_to_bytes(data)), sep=";", index_col=0)
+        return {str(column): df[column].to_numpy() for column in df.columns}
+
+
+class ParquetBackend(StorageBackend):
+    """Compressed columnar Parquet files with preserved dtypes."""
+
+    name = "parquet"
+    extension = ".parquet"
+
+    def __init__(self, compression: str = "zstd"):
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ConfigError(
+                "The 'parquet' storage format requires 'pyarrow'. "
+                'Install it with: pip install "strava-fetcher[parquet]"'
+            )
+        self.compression = compression
+
+    def encode(self, df: pd.DataFrame, index: bool = False) -> bytes:
+        """Serialize a DataFrame as a compressed Parquet file."""
+        buffer = io.BytesIO()
+        df.to_parquet(
+            buffer, engine="pyarrow", compression=self.compression, index=index
+        )
+        return buffer.getvalue()
+
+    def decode(self, data: bytes) -> pd.DataFrame:
+        """Parse a Parquet file held in memory."""
+        return pd.read_parquet(io.BytesIO(data), engine="pyarrow")
+
+    def read(self, path: Path) -> pd.DataFrame:
+        """Read a Parquet file."""
+        return pd.read_parquet(path, engine="pyarrow")
+
+
+class BinaryBackend(StorageBackend):
+    """
+    Uncompressed, memory-mappable columnar files for numeric streams.
+
+    Layout: an 8-byte magic, a little-endian `uint32` header length, a JSON
+    header listing every column's name, dtype and byte offset, then the raw
+    column data, each column aligned to 64 bytes. Only numeric and boolean
+    columns are supported; missing values must be encoded as NaN.
+    """
+
+    name = "binary"
+    extension = ".bin"
+
+    MAGIC = b"SFSTRM1\n"
+    INDEX_COLUMN = "__index__"
+    _ALIGNMENT = 64
+    _PREFIX = struct.Struct("<8sI")
+
+    @classmethod
+    def _column_array(cls, name: str, values: pd.Series | pd.Index) -> np.ndarray:
+        if values.dtype.kind not in "biuf":
+            raise ValueError(
+                f"Column '{name}' has unsupported dtype {values.dtype} "
+                f"for the {cls.name} format."
+            )
+        if isinstance(values.dtype, np.dtype):
+            array = np.ascontiguousarray(values.to_numpy())
+        else:
+            # Nullable extension dtypes (e.g. "boolean") are stored as NaN floats.
+            array = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        return array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+    def encode(self, df: pd.DataFrame, index: bool = False) -> bytes:
+        """Serialize the numeric columns of a DataFrame."""
+        columns = {
+            str(name): self._column_array(str(name), df[name]) for name in df.columns
+        }
+        if index and not isinstance(df.index, pd.RangeIndex):
+            columns[self.INDEX_COLUMN] = self._column_array(self.INDEX_COLUMN, df.index)
+
+        def align(offset: int) -> int:
+            return -(-offset // self._ALIGNMENT) * self._ALIGNMENT
+
+        # Offsets depend on the header size, so lay out the columns relative to
+        # the data section first and fix the header size afterwards.
+        relative: list[dict[str, Any]] = []
+        position = 0
+        for name, array in columns.items():
+            position = align(position)
+            relative.append(
+                {"name": name, "dtype": array.dtype.str, "offset": position}
+            )
+            position += array.nbytes
+        header = {"rows": len(df), "columns": relative}
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = align(self._PREFIX.size + len(header_bytes) + 32)
+        for column in relative:
+            column["offset"] += data_start
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * (data_start - self._PREFIX.size - len(header_bytes))
+
+        buffer = bytearray(data_start + position)
+        buffer[: self._PREFIX.size] = self._PREFIX.pack(self.MAGIC, len(header_bytes))
+        buffer[self._PREFIX.size : data_start] = header_bytes
+        for column, array in zip(relative, columns.values(), strict=True):
+            offset = column["offset"]
+            buffer[offset : offset + array.nbytes] = array.tobytes()
+        return bytes(buffer)
+
+    def _columns(self, buffer: np.ndarray) -> dict[str, np.ndarray]:
+        """Return zero-copy views of the columns held in a `uint8` buffer."""
+        magic, header_length = self._PREFIX.unpack(
+            buffer[: self._PREFIX.size].tobytes()
+        )
+        if magic != self.MAGIC:
+            raise ValueError("Not a binary stream file.")
+        start = self._PREFIX.size
+        header = json.loads(buffer[start : start + header_length].tobytes())
+        rows = header["rows"]
+        arrays = {}
+        for column in header["columns"]:
+            dtype = np.dtype(column["dtype"])
+            offset = column["offset"]
+            arrays[column["name"]] = buffer[
+                offset : offset + rows * dtype.itemsize
+            ].view(dtype)
+        return arrays
+
+    def _frame(self, arrays: dict[str, np.ndarray]) -> pd.DataFrame:
+        index = arrays.pop(self.INDEX_COLUMN, None)
+        return pd.DataFrame(arrays, index=index)
+
+    def decode(self, data: EncodedData) -> pd.DataFrame:
+        """Parse bytes produced by `encode`."""
+        return self._frame(self._columns(np.frombuffer(data, dtype=np.uint8)))
+
+    def read(self, path: Path) -> pd.DataFrame:
+        """Read a binary stream file into a DataFrame."""
+        return self.decode(path.read_bytes())
+
+    def decode_arrays(self, data: EncodedData) -> dict[str, np.ndarray]:
+        """Return zero-copy views of the columns held in `data`."""
+        arrays = self._columns(np.frombuffer(data, dtype=np.uint8))
+        arrays.pop(self.INDEX_COLUMN, None)
+        return arrays
+
+    def read_arrays(self, path: Path) -> dict[str, np.ndarray]:
+        """Return read-only NumPy views over the memory-mapped file."""
+        arrays = self._columns(np.memmap(path, dtype=np.uint8, mode="r"))
+        arrays.pop(self.INDEX_COLUMN, None)
+        return arrays
+
+
+STORAGE_BACKENDS: dict[str, type[StorageBackend]] = {
+    CSVBackend.name: CSVBackend,
+    ParquetBackend.name: ParquetBackend,
+}
+
+STREAM_BACKENDS: dict[str, type[StorageBackend]] = {
+    **STORAGE_BACKENDS,
+    BinaryBackend.name: BinaryBackend,
+}
+
+
+def get_storage_backend(name: str, compression: str = "zstd") -> StorageBackend:
+    """Instantiate the storage backend registered under `name`."""
+    if name == ParquetBackend.name:
+        return ParquetBackend(compression=compression)
+    if name not in STORAGE_BACKENDS:
+        raise ConfigError(
+            f"Unknown storage format '{name}'. "
+            f"Choose one of: {', '.join(sorted(STORAGE_BACKENDS))}."
+        )
+    return STORAGE_BACKENDS[name]()
+
+
+def get_stream_backend(name: str, compression: str = "zstd") -> StorageBackend:
+    """Instantiate the backend used for stream files, which may also be binary."""
+    if name == BinaryBackend.name:
+        return BinaryBackend()
+    return get_storage_backend(name, compression)
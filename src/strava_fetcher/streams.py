@@ -0,0 +1,356 @@
+"""
+Stream requests and conversion of stream payloads into typed DataFrames.
+
+`StreamOptions` selects which stream types are requested and at which
+resolution, so that consumers needing only a few streams download less.
+
+The streams endpoint returns one JSON list per stream type. Building a
+DataFrame straight from those lists leaves every column as generic Python
+objects and `latlng` as a column of two-element lists. `decode_streams`
+instead converts each stream into a typed NumPy array in one step:
+
+* counters (`time`, `heartrate`, `cadence`, `watts`) become `int32`,
+* measurements (`distance`, `altitude`, `velocity_smooth`, ...) `float32`,
+* `moving` becomes `bool`,
+* `latlng` is split into `lat` and `lng` `float64` columns.
+
+Integer streams containing gaps (`null` samples) fall back to `float32` with
+`NaN`; streams shorter than the longest one are padded the same way.
+
+A multi-hour ride's payload is several megabytes of JSON. `json.loads` would
+materialise it as nested lists of boxed Python numbers first, several times
+the size of the body. `StreamPayloadDecoder` instead parses the body as it
+arrives, chunk by chunk, and turns each `data` array straight into a NumPy
+array; everything else in the payload is small and decoded as plain JSON.
+`decode_streams` accepts either form.
+"""
+
+import json
+import re
+from collections.abc import AsyncIterable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Every stream type offered by the Strava API.
+AVAILABLE_STREAM_KEYS = (
+    "time",
+    "distance",
+    "latlng",
+    "altitude",
+    "velocity_smooth",
+    "heartrate",
+    "cadence",
+    "watts",
+    "temp",
+    "moving",
+    "grade_smooth",
+)
+
+# Stream types requested unless configured otherwise.
+STREAM_KEYS = [
+    "time",
+    "distance",
+    "latlng",
+    "altitude",
+    "velocity_smooth",
+    "heartrate",
+    "cadence",
+    "watts",
+    "moving",
+    "grade_smooth",
+]
+
+INT_STREAMS = frozenset({"time", "heartrate", "cadence", "watts"})
+FLOAT_STREAMS = frozenset(
+    {"distance", "altitude", "velocity_smooth", "grade_smooth", "temp"}
+)
+BOOL_STREAMS = frozenset({"moving"})
+LATLNG_STREAM = "latlng"
+
+
+@dataclass(frozen=True)
+class StreamOptions:
+    """Which streams to request from the API, and at what resolution."""
+
+    keys: tuple[str, ...] = tuple(STREAM_KEYS)
+    resolution: str | None = None
+    series_type: str | None = None
+
+    def params(self) -> dict[str, str]:
+        """Return the query parameters of a streams request."""
+        params = {"keys": ",".join(self.keys), "key_by_type": "true"}
+        if self.resolution is not None:
+            params["resolution"] = self.resolution
+        if self.series_type is not None:
+            params["series_type"] = self.series_type
+        return params
+
+
+def stream_keys_of(columns: Iterable[str]) -> tuple[str, ...]:
+    """Return the stream types held by the given stored columns."""
+    keys = {"latlng" if c in ("lat", "lng") else c for c in columns}
+    return tuple(k for k in AVAILABLE_STREAM_KEYS if k in keys)
+
+
+def _integer_array(data: list[Any]) -> np.ndarray:
+    """Return `int32` values, or `float32` if the stream has gaps or fractions."""
+    values = np.asarray(data, dtype=np.float64)
+    if np.isfinite(values).all() and (values == np.trunc(values)).all():
+        return values.astype(np.int32)
+    return values.astype(np.float32)
+
+
+def _bool_array(data: Any) -> np.ndarray | pd.api.extensions.ExtensionArray:
+    """Return `bool` values, or a nullable boolean array if the stream has gaps."""
+    if isinstance(data, np.ndarray):
+        # Decoded incrementally: 1.0/0.0 with NaN for gaps.
+        gaps = np.isnan(data)
+        if gaps.any():
+            return pd.arrays.BooleanArray(data.astype(bool), gaps)
+        return data.astype(bool)
+    if None in data:
+        return pd.array(data, dtype="boolean")
+    return np.asarray(data, dtype=bool)
+
+
+def _latlng_arrays(data: list[Any]) -> tuple[np.ndarray, np.ndarray]:
+    """Split `[lat, lng]` pairs into two `float64` arrays."""
+    try:
+        pairs = np.asarray(data, dtype=np.float64).reshape(-1, 2)
+    except (TypeError, ValueError):
+        # Ragged payload: missing or malformed points become NaN.
+        pairs = np.array(
+            [
+                p if isinstance(p, list | tuple) and len(p) == 2 else (None, None)
+                for p in data
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _convert(key: str, data: list[Any]) -> Any:
+    if key in INT_STREAMS:
+        return _integer_array(data)
+    if key in FLOAT_STREAMS:
+        return np.asarray(data, dtype=np.float64).astype(np.float32)
+    if key in BOOL_STREAMS:
+        return _bool_array(data)
+    return np.asarray(data)
+
+
+def _pad(values: Any, length: int) -> Any:
+    """Extend a column to `length` rows with missing values."""
+    missing = length - len(values)
+    if missing == 0:
+        return values
+    if isinstance(values, np.ndarray) and values.dtype == bool:
+        values = pd.array(values, dtype="boolean")
+    if not isinstance(values, np.ndarray):
+        return pd.concat(
+            [pd.Series(values), pd.Series([pd.NA] * missing, dtype=values.dtype)],
+            ignore_index=True,
+        ).array
+    if values.dtype.kind in "iu":
+        values = values.astype(np.float32)
+    if values.dtype.kind == "f":
+        return np.concatenate([values, np.full(missing, np.nan, dtype=values.dtype)])
+    return np.concatenate([values.astype(object), np.full(missing, None)])
+
+
+def decode_streams(streams_data: dict[str, Any]) -> pd.DataFrame:
+    """
+    Convert a `key_by_type=true` streams payload into a typed DataFrame.
+
+    Args:
+        streams_data: Mapping of stream type to stream object, each holding
+            its samples under `data` (a JSON list, or a float array from
+            `StreamPayloadDecoder`). Streams without data are skipped.
+
+    Returns:
+        One column per stream (two for `latlng`), in payload order.
+
+    """
+    columns: dict[str, Any] = {}
+    for key, stream in streams_data.items():
+        data = stream.get("data") if isinstance(stream, dict) else None
+        if data is None or len(data) == 0:
+            continue
+        if key == LATLNG_STREAM:
+            columns["lat"], columns["lng"] = _latlng_arrays(data)
+        else:
+            columns[key] = _convert(key, data)
+
+    length = max((len(values) for values in columns.values()), default=0)
+    columns = {key: _pad(values, length) for key, values in columns.items()}
+    return pd.DataFrame(columns, copy=False)
+
+
+_KEY = re.compile(rb'\s*,?\s*"((?:[^"\\]|\\.)*)"\s*:\s*')
+_WHITESPACE = re.compile(rb"\s*")
+# End of a `latlng` array: the `]` closing its last pair (or null point), or
+# the `]` of an empty array.
+_NESTED_ARRAY_END = re.compile(rb"(?:\]|null|\[)\s*\]")
+_VALUE_WINDOW = 4096
+
+
+class StreamPayloadDecoder:
+    """
+    Incremental decoder of a `key_by_type=true` streams payload.
+
+    Feed it the response body in chunks of any size; `close` returns the
+    payload with every stream's `data` as a `float64` array (`null` samples as
+    `NaN`, booleans as 1.0/0.0, `latlng` flattened to lat, lng, lat, ...).
+    Only the unparsed tail of the body is buffered, never the whole of it.
+
+    Raises:
+        ValueError: If the body is not a streams payload or is truncated.
+
+    """
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._state = "start"
+        self._payload: dict[str, Any] = {}
+        self._stream: dict[str, Any] | None = None
+        self._stream_key = ""
+        self._chunks: list[np.ndarray] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse as much of the body as the data received so far allows."""
+        self._buffer += chunk
+        pos = 0
+        while True:
+            new_pos = self._step(pos)
+            if new_pos is None:
+                break
+            pos = new_pos
+        self._buffer = self._buffer[pos:]
+
+    def close(self) -> dict[str, Any]:
+        """Return the decoded payload once the whole body has been fed."""
+        if self._state != "done" or self._buffer.strip():
+            raise ValueError("Truncated or malformed streams payload.")
+        return self._payload
+
+    def _step(self, pos: int) -> int | None:
+        """Consume one token at `pos`; return the new position, or None to wait."""
+        buffer = self._buffer
+        whitespace = _WHITESPACE.match(buffer, pos)
+        assert whitespace is not None  # `\s*` matches at any position.
+        pos = whitespace.end()
+        if pos == len(buffer):
+            return None
+        if self._state == "start":
+            if buffer[pos : pos + 1] != b"{":
+                raise ValueError("Streams payload is not a JSON object.")
+            self._state = "streams"
+            return pos + 1
+        if self._state == "done":
+            raise ValueError("Unexpected data after the streams payload.")
+        if self._state == "array":
+            return self._step_array(pos)
+
+        if buffer[pos : pos + 1] == b"}":
+            self._state = "done" if self._state == "streams" else "streams"
+            return pos + 1
+        match = _KEY.match(buffer, pos)
+        if match is None or match.end() == len(buffer):
+            return self._wait(pos)
+        key = json.loads(b'"' + match.group(1) + b'"')
+        pos = match.end()
+        value_start = buffer[pos : pos + 1]
+        if self._state == "streams" and value_start == b"{":
+            self._stream = self._payload[key] = {}
+            self._stream_key = key
+            self._state = "members"
+            return pos + 1
+        if self._state == "members" and key == "data" and value_start == b"[":
+            self._chunks = []
+            self._state = "array"
+            return pos  # The opening bracket is part of the first samples.
+        return self._step_value(key, pos)
+
+    def _step_value(self, key: str, pos: int) -> int | None:
+        """Decode a (small) JSON value other than a stream's samples."""
+        # Metadata values are short; avoid decoding the whole buffer for each.
+        for window in (_VALUE_WINDOW, None):
+            stop = None if window is None else pos + window
+            try:
+                text = self._buffer[pos:stop].decode("utf-8")
+                value, end = json.JSONDecoder().raw_decode(text)
+            except ValueError:
+                continue
+            # A number at the end of the data may continue in the next chunk.
+            is_number = isinstance(value, int | float)
+            if end < len(text) or (window is None and not is_number):
+                break
+        else:
+            return None
+        target = self._payload if self._state == "streams" else self._stream
+        assert target is not None, "stream members are parsed inside a stream"
+        target[key] = value
+        return pos + len(text[:end].encode("utf-8"))
+
+    def _step_array(self, pos: int) -> int | None:
+        """Convert the samples received so far; finish at the array's end."""
+        buffer = self._buffer
+        if self._stream_key == LATLNG_STREAM:
+            match = _NESTED_ARRAY_END.search(buffer, pos)
+            end = match.end() - 1 if match else -1
+        else:
+            end = buffer.find(b"]", pos)
+        if end < 0:
+            # Parse whole samples only: up to the last separator received.
+            cut = buffer.rfind(b",", pos)
+            if cut < 0:
+                return None
+            self._chunks.append(self._parse_samples(buffer[pos:cut]))
+            return cut + 1
+        self._chunks.append(self._parse_samples(buffer[pos:end]))
+        assert self._stream is not None, "samples are parsed inside a stream"
+        self._stream["data"] = (
+            np.concatenate(self._chunks) if self._chunks else np.empty(0)
+        )
+        self._chunks = []
+        self._state = "members"
+        return end + 1
+
+    def _parse_samples(self, text: bytes) -> np.ndarray:
+        """Parse comma-separated JSON samples without boxing each value."""
+        text = text.translate(None, b"[]")
+        if self._stream_key == LATLNG_STREAM:
+            text = text.replace(b"null", b"nan,nan")
+        text = text.replace(b"null", b"nan")
+        text = text.replace(b"true", b"1").replace(b"false", b"0").strip()
+        if not text:
+            return np.empty(0)
+        values = np.fromstring(text, dtype=np.float64, sep=",")
+        if len(values) != text.count(b",") + 1:
+            raise ValueError(f"Malformed samples in the {self._stream_key} stream.")
+        return values
+
+    def _wait(self, pos: int) -> int | None:
+        """Wait for more data, unless the buffer cannot be a key in progress."""
+        if self._buffer[pos : pos + 1] in (b",", b'"'):
+            return None
+        raise ValueError("Malformed streams payload.")
+
+
+def decode_stream_body(chunks: Iterable[bytes]) -> dict[str, Any]:
+    """Decode a streams payload from the chunks of a response body."""
+    decoder = StreamPayloadDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
+
+
+async def decode_stream_body_async(chunks: AsyncIterable[bytes]) -> dict[str, Any]:
+    """Decode a streams payload from the chunks of an asynchronous response body."""
+    decoder = StreamPayloadDecoder()
+    async for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
@@ -0,0 +1,149 @@
+"""
+Background persistence of fetched streams.
+
+Decoding, encoding and writing a stream takes long enough that doing it on
+the thread that collects API responses leaves the connection pool idle in the
+meantime. `StreamWriter` turns persistence into a separate pipeline stage:
+fetched payloads go into a bounded queue and a dedicated thread stores them
+while the next requests are already on the wire.
+
+With an `encoder` pool (e.g. a `ProcessPoolExecutor`), each payload is first
+passed through `transform` in the pool, such as decoding and compressing it in
+another process, and the writer thread only stores the result. Encoding then
+scales across cores instead of being serialised by the GIL.
+
+The queue bound provides backpressure. When the disk cannot keep up,
+`submit` blocks until there is room, so fetched but unwritten payloads never
+pile up in memory. `WriterStats` reports how deep the queue got and how long
+producers waited, which tells whether a sync is bound by the network or by
+the disk.
+
+Failed writes are reported to `on_error`. If `on_error` itself fails, the
+writer logs it and keeps writing, so producers never block on a dead thread;
+`close` then re-raises the first such error.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any
+
+# A payload to persist: (activity_id, payload or its pending transform, options).
+WriteJob = tuple[int, Any, Any]
+
+
+@dataclass
+class WriterStats:
+    """Counters describing one writer's queue and throughput."""
+
+    submitted: int = 0
+    written: int = 0
+    failed: int = 0
+    max_depth: int = 0
+    producer_wait_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+
+class StreamWriter:
+    """Stores stream payloads on a background thread fed by a bounded queue."""
+
+    def __init__(
+        self,
+        store: Callable[[int, Any, Any], None],
+        on_error: Callable[[int, Exception], None],
+        max_queue_size: int = 32,
+        transform: Callable[[dict], Any] | None = None,
+        encoder: Executor | None = None,
+    ):
+        self._store = store
+        self._on_error = on_error
+        self._transform = transform
+        self._encoder = encoder
+        self._queue: queue.Queue[WriteJob | None] = queue.Queue(max_queue_size)
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self._callback_error: Exception | None = None
+        self.stats = WriterStats()
+
+    @property
+    def depth(self) -> int:
+        """Number of payloads waiting to be written."""
+        return self._queue.qsize()
+
+    def start(self) -> "StreamWriter":
+        """Start the writer thread."""
+        self._thread = threading.Thread(
+            target=self._run, name="stream-writer", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def submit(self, activity_id: int, streams_data: dict, options: Any) -> None:
+        """Queue a payload for writing, blocking while the queue is full."""
+        payload: Any = streams_data
+        if self._encoder is not None and self._transform is not None:
+            payload = self._encoder.submit(self._transform, streams_data)
+        start = time.perf_counter()
+        self._queue.put((activity_id, payload, options))
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats.producer_wait_seconds += waited
+            self.stats.submitted += 1
+            self.stats.max_depth = max(self.stats.max_depth, self._queue.qsize())
+
+    def close(self) -> None:
+        """
+        Write everything still queued and stop the writer thread.
+
+        Raises:
+            Exception: The first error raised by `on_error`, if any.
+
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        logging.info(
+            f"Stream writer: {self.stats.written} written, "
+            f"{self.stats.failed} failed, max queue depth {self.stats.max_depth}, "
+            f"producers waited {self.stats.producer_wait_seconds:.2f}s."
+        )
+        error, self._callback_error = self._callback_error, None
+        if error is not None:
+            raise error
+
+    def _run(self) -> None:
+        while (job := self._queue.get()) is not None:
+            activity_id, payload, options = job
+            start = time.perf_counter()
+            try:
+                if isinstance(payload, Future):
+                    payload = payload.result()
+                self._store(activity_id, payload, options)
+                self.stats.written += 1
+            except Exception as e:
+                self.stats.failed += 1
+                self._report(activity_id, e)
+            self.stats.write_seconds += time.perf_counter() - start
+
+    def _report(self, activity_id: int, error: Exception) -> None:
+        """Pass a failed write to `on_error` without letting it stop the thread."""
+        try:
+            self._on_error(activity_id, error)
+        except Exception as e:
+            logging.exception(f"Error handler failed for activity {activity_id}.")
+            if self._callback_error is None:
+                self._callback_error = e
+
+    def __enter__(self) -> "StreamWriter":
+        """Start the writer thread."""
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Write everything still queued and stop the writer thread."""
+        self.close()
@@ -0,0 +1,38 @@
+"""Unit tests for activity_index module."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from strava_fetcher.activity_index import ActivityIndex
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> Iterator[ActivityIndex]:
+    """Provide an index backed by a temporary database."""
+    index = ActivityIndex(tmp_path / "partition_index.sqlite")
+    yield index
+    index.close()
+
+
+@pytest.mark.unit
+def test_index_looks_up_assigned_partitions(index: ActivityIndex):
+    """Test that the latest assignment of each activity is returned."""
+    index.assign({1: "2023", 2: "2024"})
+    index.assign({1: "2024"})
+
+    assert index.partitions([1, 2, 3]) == {1: "2024", 2: "2024"}
+    assert index.partitions(range(1000)) == {1: "2024", 2: "2024"}
+
+
+@pytest.mark.unit
+def test_index_rebuild_marks_built(index: ActivityIndex):
+    """Test that rebuilding replaces entries and flags the index as built."""
+    index.assign({1: "2023"})
+    assert not index.is_built
+
+    index.rebuild({2: "2024"})
+
+    assert index.is_built
+    assert index.partitions([1, 2]) == {2: "2024"}
@@ -0,0 +1,165 @@
+"""Unit tests for archive module."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from strava_fetcher.archive import StreamArchive
+from strava_fetcher.manifest import StreamManifest
+from strava_fetcher.persistence import ActivityPersistence
+from strava_fetcher.storage import BinaryBackend
+from strava_fetcher.streams import decode_streams
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Iterator[StreamArchive]:
+    """Provide an archive with small segments in a temporary directory."""
+    archive = StreamArchive(tmp_path / "StreamArchive", segment_size=1024)
+    yield archive
+    archive.close()
+
+
+@pytest.mark.unit
+def test_archive_random_access_and_scan(archive: StreamArchive):
+    """Test that records are readable by id and scanned in storage order."""
+    payloads = {i: bytes([i]) * (100 * i) for i in range(1, 6)}
+    for activity_id, data in payloads.items():
+        archive.append(activity_id, data)
+
+    assert archive.read_bytes(3) == payloads[3]
+    assert archive.read_bytes(99) is None
+    assert bytes(archive.read_buffer(5)) == payloads[5]
+    assert {a: bytes(b) for a, b in archive.scan()} == payloads
+    assert [e.activity_id for e in archive.entries()] == [1, 2, 3, 4, 5]
+    # 1 KiB segments force a roll-over
+    assert len(list(archive.directory.glob("segment_*.dat"))) > 1
+
+
+@pytest.mark.unit
+def test_archive_rewrite_and_rebuild_index(archive: StreamArchive):
+    """Test that the latest record wins, also when re-indexing the segments."""
+    archive.append(1, b"old")
+    archive.append(2, b"other")
+    archive.append(1, b"new")
+
+    assert archive.read_bytes(1) == b"new"
+    archive.close()
+    archive.db_path.unlink()
+
+    assert archive.rebuild_index() == 2
+    assert archive.read_bytes(1) == b"new"
+    assert archive.activity_ids() == {1, 2}
+
+
+@pytest.mark.unit
+def test_persistence_archive_layout(
+    tmp_path: Path, archive: StreamArchive, mock_stream_response: dict
+):
+    """Test that streams are written to and read from the archive."""
+    manifest = StreamManifest(tmp_path / "stream_index.sqlite")
+    persistence = ActivityPersistence(
+        None,
+        tmp_path / "Streams",
+        stream_backend=BinaryBackend(),
+        manifest=manifest,
+        stream_archive=archive,
+    )
+    stream_df = decode_streams(mock_stream_response)
+
+    persistence.write_stream(42, stream_df)
+    persistence.write_stream(43, stream_df)
+
+    assert not (tmp_path / "Streams").exists()
+    assert persistence.get_existing_stream_ids() == {42, 43}
+    arrays = persistence.read_stream(42)
+    assert arrays is not None
+    np.testing.assert_array_equal(arrays["watts"], stream_df["watts"].to_numpy())
+    assert [activity_id for activity_id, _ in persistence.iter_streams()] == [42, 43]
+    assert persistence.rebuild_stream_index() == 2
+    persistence.close()
+
+
+@pytest.mark.unit
+def test_migrate_streams_to_archive(
+    tmp_path: Path, archive: StreamArchive, sample_stream_df
+):
+    """Test that stream files are moved into the archive once."""
+    streams_dir = tmp_path / "Streams"
+    files = ActivityPersistence(None, streams_dir)
+    files.write_stream(7, sample_stream_df)
+    files.write_stream(8, sample_stream_df)
+    persistence = ActivityPersistence(None, streams_dir, stream_archive=archive)
+
+    assert persistence.migrate_streams_to_archive() == 2
+    assert persistence.migrate_streams_to_archive(delete_files=True) == 0
+
+    assert list(streams_dir.iterdir()) == []
+    assert persistence.get_existing_stream_ids() == {7, 8}
+    arrays = persistence.read_stream(8)
+    assert arrays is not None
+    assert list(arrays) == list(sample_stream_df.columns)
+
+
+@pytest.mark.unit
+def test_archive_indexes_records_only_once_durable(tmp_path: Path):
+    """Test that a crash before the fsync cannot leave index rows behind."""
+    directory = tmp_path / "archive"
+    archive = StreamArchive(directory, batch_size=2)
+    archive.append(1, b"a" * 100)
+    archive.append(2, b"b" * 100)  # completes a batch: fsynced and indexed
+    archive.append(3, b"c" * 100)
+    assert archive.read_bytes(3) == b"c" * 100
+    assert archive.flushes == 1
+
+    # Simulate a crash that loses the unflushed tail of the segment.
+    segment = directory / "segment_00001.dat"
+    end_of_batch = archive.get(2).offset + 100
+    with open(segment, "r+b") as f:
+        f.truncate(end_of_batch + 10)
+    recovered = StreamArchive(directory)
+
+    assert recovered.activity_ids() == {1, 2}
+    assert recovered.read_bytes(2) == b"b" * 100
+    recovered.append(3, b"c" * 100)
+    recovered.close()
+    assert StreamArchive(directory).read_bytes(3) == b"c" * 100
+
+
+@pytest.mark.unit
+def test_persistence_indexes_archived_streams_after_flush(
+    tmp_path: Path, sample_stream_df
+):
+    """Test that the manifest never lists streams the archive has not synced."""
+    archive = StreamArchive(tmp_path / "archive", batch_size=100)
+    manifest = StreamManifest(tmp_path / "stream_index.sqlite")
+    persistence = ActivityPersistence(
+        None, None, manifest=manifest, stream_archive=archive
+    )
+
+    persistence.write_stream(7, sample_stream_df)
+
+    assert manifest.activity_ids() == set()
+    assert archive.pending == 1
+    persistence.flush()
+    assert manifest.activity_ids() == {7}
+    assert archive.pending == 0
+    persistence.close()
+
+
+@pytest.mark.unit
+def test_rebuild_stream_index_rebuilds_archive_index(
+    tmp_path: Path, archive: StreamArchive, sample_stream_df
+):
+    """Test that a lost archive index is recovered from the segments."""
+    persistence = ActivityPersistence(None, None, stream_archive=archive)
+    persistence.write_stream(7, sample_stream_df)
+    persistence.write_stream(8, sample_stream_df)
+    archive.close()
+    archive.db_path.unlink()
+    assert persistence.get_existing_stream_ids() == set()
+
+    assert persistence.rebuild_stream_index() == 2
+    assert persistence.get_existing_stream_ids() == {7, 8}
+    persistence.close()
@@ -0,0 +1,244 @@
+"""Unit tests for async_client module."""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from pydantic import SecretStr
+
+from strava_fetcher.client import RequestControls
+from strava_fetcher.exceptions import APIError, RateLimitError, UnauthorizedError
+from strava_fetcher.retry import RetryPolicy
+from strava_fetcher.settings import StravaAPISettings
+from strava_fetcher.streams import StreamOptions
+
+httpx = pytest.importorskip("httpx")
+
+from strava_fetcher.async_client import AsyncStravaClient  # noqa: E402
+
+
+def make_client(handler) -> AsyncStravaClient:
+    """Build a client whose requests are answered by `handler`."""
+    return AsyncStravaClient(
+        StravaAPISettings(
+            client_id=SecretStr("test_client_id"),
+            client_secret=SecretStr("test_client_secret"),
+        ),
+        max_connections=4,
+        transport=httpx.MockTransport(handler),
+        controls=RequestControls(retry_policy=RetryPolicy(backoff_seconds=0)),
+    )
+
+
+@pytest.mark.unit
+def test_get_activity_streams(mock_stream_response: dict):
+    """Test that streams are requested by type and decoded from JSON."""
+    seen = {}
+
+    def handler(request):
+        seen["url"] = str(request.url)
+        seen["auth"] = request.headers["Authorization"]
+        return httpx.Response(200, json=mock_stream_response)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await client.get_activity_streams(SecretStr("abc"), 42)
+
+    data = asyncio.run(run())
+
+    assert data.keys() == mock_stream_response.keys()
+    for key, stream in mock_stream_response.items():
+        np.testing.assert_array_equal(data[key]["data"], stream["data"])
+    assert "/activities/42/streams" in seen["url"]
+    assert "key_by_type=true" in seen["url"]
+    assert seen["auth"] == "Bearer abc"
+
+
+@pytest.mark.unit
+def test_get_activity_streams_decodes_chunked_body(mock_stream_response: dict):
+    """Test that a body arriving in small chunks is decoded as it is streamed."""
+    body = json.dumps(mock_stream_response).encode()
+    sent = []
+
+    class ChunkedBody(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(0, len(body), 5):
+                sent.append(i)
+                yield body[i : i + 5]
+
+    def handler(request):
+        return httpx.Response(200, stream=ChunkedBody())
+
+    async def run():
+        async with make_client(handler) as client:
+            return await client.get_activity_streams(SecretStr("abc"), 42)
+
+    data = asyncio.run(run())
+
+    assert len(sent) == -(-len(body) // 5)
+    assert data.keys() == mock_stream_response.keys()
+    for key, stream in mock_stream_response.items():
+        np.testing.assert_array_equal(data[key]["data"], stream["data"])
+
+
+@pytest.mark.unit
+def test_refresh_token(mock_token_response: dict):
+    """Test that a refresh request posts the refresh grant and returns a Token."""
+
+    def handler(request):
+        assert b"grant_type=refresh_token" in request.content
+        return httpx.Response(200, content=json.dumps(mock_token_response))
+
+    async def run():
+        async with make_client(handler) as client:
+            return await client.refresh_token(SecretStr("old"))
+
+    token = asyncio.run(run())
+
+    assert token.access_token.get_secret_value() == "mock_access_token"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("status_code", "expected"),
+    [(401, UnauthorizedError), (429, RateLimitError), (500, APIError)],
+)
+def test_error_responses(status_code: int, expected: type[Exception]):
+    """Test that error statuses map onto the package's exceptions."""
+
+    async def run():
+        async with make_client(lambda request: httpx.Response(status_code)) as client:
+            await client.get_activities(SecretStr("abc"), page=1, per_page=100)
+
+    with pytest.raises(expected):
+        asyncio.run(run())
+
+
+@pytest.mark.unit
+def test_custom_api_base_url():
+    """Test that requests go to the configured API base URL."""
+    seen = {}
+
+    def handler(request):
+        seen["url"] = str(request.url)
+        return httpx.Response(200, json=[])
+
+    client = AsyncStravaClient(
+        StravaAPISettings(
+            client_id=SecretStr("test_client_id"),
+            client_secret=SecretStr("test_client_secret"),
+            api_base_url="http://127.0.0.1:8765/api/v3/",
+        ),
+        transport=httpx.MockTransport(handler),
+    )
+
+    async def run():
+        async with client:
+            return await client.get_activities(SecretStr("abc"), page=1, per_page=10)
+
+    assert asyncio.run(run()) == []
+    assert seen["url"].startswith("http://127.0.0.1:8765/api/v3/athlete/activities?")
+
+
+@pytest.mark.unit
+def test_get_activity_streams_with_options():
+    """Test that stream keys, resolution and series type are sent."""
+    seen = {}
+
+    def handler(request):
+        seen["params"] = dict(request.url.params)
+        return httpx.Response(200, json={})
+
+    async def run():
+        async with make_client(handler) as client:
+            options = StreamOptions(("watts", "heartrate"), "low", "distance")
+            return await client.get_activity_streams(SecretStr("abc"), 42, options)
+
+    asyncio.run(run())
+
+    assert seen["params"] == {
+        "keys": "watts,heartrate",
+        "key_by_type": "true",
+        "resolution": "low",
+        "series_type": "distance",
+    }
+
+
+@pytest.mark.unit
+def test_transient_errors_are_retried():
+    """Test that a 503 and a dropped connection are retried until success."""
+    responses = iter(["503", "reset", "ok"])
+
+    def handler(request):
+        outcome = next(responses)
+        if outcome == "reset":
+            raise httpx.ConnectError("connection reset", request=request)
+        if outcome == "503":
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json=[])
+
+    async def run():
+        async with make_client(handler) as client:
+            activities = await client.get_activities(SecretStr("abc"), 1, 100)
+            return activities, client.retry_stats
+
+    activities, stats = asyncio.run(run())
+
+    assert activities == []
+    assert stats.retries == 2
+    assert stats.by_reason == {"503": 1, "ConnectError": 1}
+
+
+@pytest.mark.unit
+def test_connection_reset_while_reading_streams_is_retried(
+    mock_stream_response: dict,
+):
+    """Test that a body cut off mid-stream is fetched again."""
+    body = json.dumps(mock_stream_response).encode()
+
+    class ResetStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield body[: len(body) // 2]
+            raise httpx.ReadError("connection reset")
+
+    responses = iter([ResetStream(), httpx.ByteStream(body)])
+
+    def handler(request):
+        return httpx.Response(200, stream=next(responses))
+
+    async def run():
+        async with make_client(handler) as client:
+            streams = await client.get_activity_streams(SecretStr("abc"), 42)
+            return streams, client.retry_stats
+
+    streams, stats = asyncio.run(run())
+
+    np.testing.assert_array_equal(
+        streams["time"]["data"], mock_stream_response["time"]["data"]
+    )
+    assert stats.by_reason == {"ReadError": 1}
+
+
+@pytest.mark.unit
+def test_retries_are_exhausted_and_token_requests_not_retried():
+    """Test that persistent failures surface and POSTs are sent only once."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(502)
+
+    async def run():
+        async with make_client(handler) as client:
+            with pytest.raises(APIError):
+                await client.get_activities(SecretStr("abc"), 1, 100)
+            with pytest.raises(APIError):
+                await client.refresh_token(SecretStr("old"))
+            return client.retry_stats
+
+    stats = asyncio.run(run())
+
+    assert calls == ["GET"] * 4 + ["POST"]
+    assert stats.retries == 3
+    assert stats.exhausted == 1
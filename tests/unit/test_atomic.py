@@ -0,0 +1,60 @@
+"""Unit tests for atomic module."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from strava_fetcher.atomic import DirectorySync, atomic_write
+
+
+@pytest.mark.unit
+def test_atomic_write_replaces_contents(tmp_path: Path):
+    """Test that the file is replaced and no temporary file is left behind."""
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"old")
+
+    atomic_write(path, b"new")
+
+    assert path.read_bytes() == b"new"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.csv"]
+
+
+@pytest.mark.unit
+def test_atomic_write_keeps_old_file_on_failure(tmp_path: Path):
+    """Test that an interrupted write leaves the previous contents intact."""
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"old")
+
+    with patch("strava_fetcher.atomic.os.replace", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            atomic_write(path, b"new")
+
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.csv"]
+
+
+@pytest.mark.unit
+def test_atomic_write_sets_mode(tmp_path: Path):
+    """Test that the requested permission bits are applied."""
+    path = tmp_path / "token.json"
+
+    atomic_write(path, b"{}", mode=0o600)
+
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+@pytest.mark.unit
+def test_directory_sync_batches_directory_flushes(tmp_path: Path):
+    """Test that a directory is flushed once per batch, not once per write."""
+    directory_sync = DirectorySync(batch_size=10)
+
+    with patch("strava_fetcher.atomic.fsync_directory") as fsync_directory:
+        for i in range(25):
+            atomic_write(tmp_path / f"stream_{i}.bin", b"x", directory_sync)
+        assert fsync_directory.call_count == 2
+        directory_sync.flush()
+        directory_sync.flush()
+
+    assert fsync_directory.call_count == 3
+    assert directory_sync.flushes == 3
@@ -0,0 +1,139 @@
+"""Unit tests for auth module."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from strava_fetcher.auth import TokenManager
+from strava_fetcher.exceptions import ConfigError
+from strava_fetcher.models import Token
+from strava_fetcher.persistence import TokenPersistence
+
+
+def make_token(name: str, expires_in: float = 6 * 3600) -> Token:
+    return Token(
+        access_token=f"{name}_access",
+        refresh_token=f"{name}_refresh",
+        expires_at=int(time.time() + expires_in),
+    )
+
+
+class FakeRefresh:
+    """Stand-in for `StravaClient.refresh_token` that counts its calls."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, refresh_token) -> Token:
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return make_token(f"fresh{calls}")
+
+
+@pytest.mark.unit
+def test_get_returns_cached_token_without_refreshing():
+    """Test that a valid token is handed out as-is."""
+    refresh = FakeRefresh()
+    manager = TokenManager(refresh)
+    token = make_token("current")
+    manager.set(token)
+
+    assert manager.get() is token
+    assert manager.access_token() == token.access_token
+    assert refresh.calls == 0
+
+
+@pytest.mark.unit
+def test_get_loads_and_refreshes_expired_token(tmp_path: Path):
+    """Test that an expired token on disk is refreshed and saved on first use."""
+    persistence = TokenPersistence(tmp_path / "token.json")
+    persistence.write(make_token("old", expires_in=-10))
+    manager = TokenManager(FakeRefresh(), persistence)
+
+    token = manager.get()
+
+    assert token.access_token.get_secret_value() == "fresh1_access"
+    saved = persistence.read()
+    assert saved is not None
+    assert saved.access_token.get_secret_value() == "fresh1_access"
+
+
+@pytest.mark.unit
+def test_get_without_token_raises_config_error(tmp_path: Path):
+    """Test that a missing token is reported instead of refreshed."""
+    manager = TokenManager(FakeRefresh(), TokenPersistence(tmp_path / "token.json"))
+
+    with pytest.raises(ConfigError):
+        manager.get()
+
+
+@pytest.mark.unit
+def test_concurrent_refreshes_are_coalesced():
+    """Test that workers refreshing the same stale token share one request."""
+    refresh = FakeRefresh(delay=0.05)
+    manager = TokenManager(refresh)
+    stale = make_token("stale")
+    manager.set(stale)
+    results: list[Token] = []
+
+    def worker() -> None:
+        results.append(manager.refresh(stale))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refresh.calls == 1
+    assert len({id(token) for token in results}) == 1
+    assert manager.refreshes == 1
+
+
+@pytest.mark.unit
+def test_background_thread_refreshes_before_expiry():
+    """Test that a token inside the refresh margin is replaced in the background."""
+    refresh = FakeRefresh()
+    manager = TokenManager(refresh, refresh_margin_seconds=600)
+    manager.set(make_token("expiring", expires_in=300))
+
+    with manager:
+        deadline = time.monotonic() + 2
+        while manager.refreshes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert refresh.calls == 1
+    assert manager.get().access_token.get_secret_value() == "fresh1_access"
+
+
+@pytest.mark.unit
+def test_processes_sharing_a_token_file_refresh_once(tmp_path: Path):
+    """Test that a token refreshed by another process is reused, not refreshed."""
+    persistence = TokenPersistence(tmp_path / "token.json")
+    stale = make_token("stale", expires_in=-10)
+    persistence.write(stale)
+    refresh = FakeRefresh(delay=0.05)
+    # Separate managers, as in separate processes, share only the token file.
+    managers = [
+        TokenManager(refresh, TokenPersistence(tmp_path / "token.json"))
+        for _ in range(4)
+    ]
+    results: list[Token] = []
+
+    def worker(manager: TokenManager) -> None:
+        results.append(manager.get())
+
+    threads = [threading.Thread(target=worker, args=(m,)) for m in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refresh.calls == 1
+    assert {t.access_token.get_secret_value() for t in results} == {"fresh1_access"}
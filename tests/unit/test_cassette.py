@@ -0,0 +1,152 @@
+"""Unit tests for cassette module."""
+
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import requests
+from pydantic import SecretStr
+
+from strava_fetcher.cassette import Cassette, ReplayAdapter, request_key
+from strava_fetcher.client import StravaClient
+from strava_fetcher.exceptions import CassetteError
+from strava_fetcher.pipeline import StravaSyncPipeline
+from strava_fetcher.settings import StravaAPISettings
+from strava_fetcher.streams import StreamOptions
+
+
+@pytest.fixture
+def cassette(tmp_path: Path):
+    """Provide an empty cassette."""
+    cassette = Cassette(tmp_path / "cassette.sqlite")
+    yield cassette
+    cassette.close()
+
+
+def _record(
+    cassette: Cassette, method: str, url: str, body: dict, usage: str = "1,1"
+) -> None:
+    request = requests.Request(method, url).prepare()
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["X-RateLimit-Limit"] = "100,1000"
+    response.headers["X-RateLimit-Usage"] = usage
+    response._content = json.dumps(body).encode()
+    response.elapsed = timedelta(milliseconds=20)
+    cassette.record(request, response)
+
+
+def _replay_client(cassette: Cassette, base_url: str) -> StravaClient:
+    return StravaClient(
+        StravaAPISettings(
+            client_id="id",
+            client_secret="secret",
+            api_base_url=f"{base_url}/api/v3",
+            oauth_url=f"{base_url}/oauth",
+        ),
+        adapter=ReplayAdapter(cassette),
+    )
+
+
+@pytest.mark.unit
+def test_request_key_ignores_host_and_parameter_order():
+    """Test that recordings replay under another host and parameter order."""
+    assert request_key(
+        "get", "http://127.0.0.1:8765/api/v3/athlete/activities?page=1&per_page=30"
+    ) == request_key(
+        "GET", "https://strava.test/api/v3/athlete/activities?per_page=30&page=1"
+    )
+
+
+@pytest.mark.unit
+def test_replay_serves_recorded_responses(cassette: Cassette):
+    """Test that a client replays recorded pages without a network."""
+    _record(
+        cassette,
+        "GET",
+        "http://127.0.0.1:8765/api/v3/athlete/activities?page=1&per_page=30",
+        [{"id": 1}],
+    )
+    client = _replay_client(cassette, "https://strava.test")
+
+    activities = client.get_activities(SecretStr("token"), page=1, per_page=30)
+
+    assert activities == [{"id": 1}]
+    with pytest.raises(CassetteError):
+        client.get_activities(SecretStr("token"), page=2, per_page=30)
+
+
+@pytest.mark.unit
+def test_token_responses_are_redacted_and_redated(cassette: Cassette):
+    """Test that token secrets are not recorded and replayed tokens are valid."""
+    expires_at = int(time.time()) + 3600
+    _record(
+        cassette,
+        "POST",
+        "http://127.0.0.1:8765/oauth/token",
+        {
+            "access_token": "secret-access",
+            "refresh_token": "secret-refresh",
+            "expires_at": expires_at,
+        },
+    )
+    with cassette._lock:
+        cassette._conn.execute("UPDATE responses SET recorded_at = recorded_at - 7200")
+    client = _replay_client(cassette, "https://strava.test")
+
+    token = client.refresh_token(SecretStr("anything"))
+
+    assert token.refresh_token.get_secret_value() == "redacted-by-cassette"
+    assert token.expires_at >= expires_at + 7200 - 5
+    assert not token.is_expired()
+
+
+@pytest.mark.unit
+def test_replayed_streams_are_decoded_incrementally(cassette: Cassette):
+    """Test that a streamed (replayed) body is decoded into arrays."""
+    _record(
+        cassette,
+        "GET",
+        "http://127.0.0.1:8765/api/v3/activities/42/streams"
+        "?keys=time%2Cwatts&key_by_type=true",
+        {"time": {"data": [0, 1, 2]}, "watts": {"data": [100, None, 120]}},
+    )
+    client = _replay_client(cassette, "https://strava.test")
+
+    streams = client.get_activity_streams(
+        SecretStr("token"), 42, StreamOptions(keys=("time", "watts"))
+    )
+
+    np.testing.assert_array_equal(streams["time"]["data"], [0, 1, 2])
+    np.testing.assert_array_equal(streams["watts"]["data"], [100, np.nan, 120])
+
+
+@pytest.mark.unit
+def test_replay_is_not_rate_limited(cassette: Cassette, mock_settings):
+    """Test that replaying more requests than the short limit never waits."""
+    pages = mock_settings.sync.rate_limit_per_15_minutes + 10
+    for page in range(1, pages + 1):
+        _record(
+            cassette,
+            "GET",
+            f"http://127.0.0.1:8765/api/v3/athlete/activities?page={page}&per_page=30",
+            [{"id": page}],
+            # Recorded at the limit, which must not throttle the replay.
+            usage="100,1000",
+        )
+    cassette.close()
+    mock_settings.strava_api.cassette_mode = "replay"
+    mock_settings.strava_api.cassette_file = cassette.db_path
+    pipeline = StravaSyncPipeline(mock_settings)
+
+    with patch("strava_fetcher.ratelimit.logging") as log:
+        log.warning.side_effect = AssertionError("waited for the rate limit")
+        for page in range(1, pages + 1):
+            pipeline.client.get_activities(SecretStr("token"), page, per_page=30)
+
+    assert pipeline.rate_limiter.seconds_until_available() == 0
+    pipeline.close()
@@ -0,0 +1,70 @@
+"""Unit tests for client module."""
+
+import json
+
+import numpy as np
+import pytest
+import requests
+from pydantic import SecretStr
+from requests.adapters import BaseAdapter
+from urllib3.exceptions import ProtocolError
+
+from strava_fetcher.client import RequestControls, StravaClient
+from strava_fetcher.retry import RetryPolicy
+from strava_fetcher.settings import StravaAPISettings
+
+
+class _ChunkedBody:
+    """Raw response body that yields `chunks`, raising any exception among them."""
+
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def close(self) -> None:
+        pass
+
+
+class _ScriptedAdapter(BaseAdapter):
+    """Transport answering each request with the next of `bodies`."""
+
+    def __init__(self, bodies: list[list]):
+        super().__init__()
+        self.bodies = iter(bodies)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = _ChunkedBody(next(self.bodies))
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.mark.unit
+def test_connection_reset_while_reading_streams_is_retried(
+    mock_stream_response: dict,
+):
+    """Test that a body cut off mid-stream is fetched again."""
+    body = json.dumps(mock_stream_response).encode()
+    client = StravaClient(
+        StravaAPISettings(client_id="id", client_secret="secret"),
+        controls=RequestControls(retry_policy=RetryPolicy(backoff_seconds=0)),
+        adapter=_ScriptedAdapter(
+            [[body[: len(body) // 2], ProtocolError("connection reset")], [body]]
+        ),
+    )
+
+    streams = client.get_activity_streams(SecretStr("abc"), 42)
+
+    np.testing.assert_array_equal(
+        streams["time"]["data"], mock_stream_response["time"]["data"]
+    )
+    assert client.retry_stats.by_reason == {"ChunkedEncodingError": 1}
@@ -0,0 +1,61 @@
+"""Unit tests for failures module."""
+
+from pathlib import Path
+
+import pytest
+
+from strava_fetcher.exceptions import APIError
+from strava_fetcher.failures import FailureStore
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    """Provide a failure store with a one-minute base retry delay."""
+    store = FailureStore(
+        tmp_path / "failures.sqlite", retry_seconds=60, max_retry_seconds=300
+    )
+    yield store
+    store.close()
+
+
+@pytest.mark.unit
+def test_record_counts_attempts_and_backs_off_exponentially(store: FailureStore):
+    """Test that each failure doubles the delay, up to the maximum."""
+    delays = []
+    for now in (1000.0, 2000.0, 3000.0, 4000.0):
+        record = store.record(1, APIError(503, "unavailable"), now=now)
+        delays.append(record.next_attempt_at - now)
+
+    assert delays == [60, 120, 240, 300]
+    assert record.attempts == 4
+    assert record.first_failed_at == 1000.0
+    assert record.status_code == 503
+    assert not record.permanent
+
+
+@pytest.mark.unit
+def test_permanent_failures_are_always_skipped(store: FailureStore):
+    """Test that 404s are skipped for good and transient failures until due."""
+    store.record(1, APIError(404, "not found"), now=1000.0)
+    store.record(2, APIError(500, "boom"), now=1000.0)
+
+    assert store.skipped_ids(now=1030.0) == {1, 2}
+    assert store.skipped_ids(now=1061.0) == {1}
+    assert store.failed_ids() == [2]
+    assert store.failed_ids(include_permanent=True) == [1, 2]
+
+
+@pytest.mark.unit
+def test_clear_and_failed_before(store: FailureStore):
+    """Test that cleared activities are forgotten and re-failures filtered."""
+    store.record(1, APIError(500, "boom"), now=1000.0)
+    store.record(2, OSError("connection reset"), now=1000.0)
+    store.record(3, APIError(500, "boom"), now=2000.0)
+
+    store.clear([1])
+
+    assert store.failed_ids(failed_before=1500.0) == [2]
+    records = store.records()
+    assert [r.activity_id for r in records] == [3, 2]
+    assert records[1].status_code is None
+    assert records[1].error == "connection reset"
@@ -0,0 +1,130 @@
+"""Unit tests for http_cache module."""
+
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from pydantic import SecretStr
+
+from strava_fetcher.client import RequestControls, StravaClient
+from strava_fetcher.exceptions import APIError
+from strava_fetcher.http_cache import HTTPCache
+from strava_fetcher.retry import RetryPolicy
+from strava_fetcher.settings import StravaAPISettings
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    """Provide an HTTP cache bounded to 100 bytes."""
+    cache = HTTPCache(tmp_path / "http_cache.sqlite", max_bytes=100)
+    yield cache
+    cache.close()
+
+
+def _response(status: int, body: bytes = b"", headers: dict | None = None) -> Mock:
+    response = Mock(status_code=status, content=body, text=body.decode())
+    response.headers = headers or {}
+    response.json.side_effect = lambda: json.loads(body)
+    return response
+
+
+@pytest.mark.unit
+def test_key_ignores_parameter_order():
+    """Test that the same request maps to the same key."""
+    url = "https://example.com/athlete/activities"
+    assert HTTPCache.key(url, {"page": 1, "per_page": 30}) == HTTPCache.key(
+        url, {"per_page": 30, "page": 1}
+    )
+    assert HTTPCache.key(url, {"page": 1}) != HTTPCache.key(url, {"page": 2})
+
+
+@pytest.mark.unit
+def test_client_does_not_share_pages_between_tokens(cache: HTTPCache):
+    """Test that a page cached for one athlete never answers another's request."""
+    cache.max_bytes = 1024
+    client = StravaClient(
+        StravaAPISettings(client_id="id", client_secret="secret"),
+        http_cache=cache,
+    )
+    client.session = Mock()
+    client.session.request.side_effect = [
+        _response(200, b'[{"id": 1}]', {"ETag": '"v1"'}),
+        _response(200, b'[{"id": 2}]', {"ETag": '"v1"'}),
+    ]
+
+    client.get_activities(SecretStr("athlete-1"), page=1, per_page=30)
+    other = client.get_activities(SecretStr("athlete-2"), page=1, per_page=30)
+
+    assert other == [{"id": 2}]
+    revalidation = client.session.request.call_args_list[1]
+    assert "If-None-Match" not in revalidation.kwargs["headers"]
+
+
+@pytest.mark.unit
+def test_put_requires_a_validator(cache: HTTPCache):
+    """Test that responses without ETag or Last-Modified are not stored."""
+    assert not cache.put("a", "url", {}, b"[]")
+    assert cache.put("b", "url", {"ETag": '"v1"'}, b"[]")
+
+    assert cache.get("a") is None
+    assert cache.get("b").conditional_headers() == {"If-None-Match": '"v1"'}
+
+
+@pytest.mark.unit
+def test_put_evicts_least_recently_used(cache: HTTPCache):
+    """Test that the cache stays within its size bound, evicting LRU first."""
+    for key in "abc":
+        cache.put(key, "url", {"ETag": key}, b"x" * 30)
+    cache.touch("a", cache.get("a"))
+
+    cache.put("d", "url", {"ETag": "d"}, b"x" * 30)
+
+    assert cache.size() == 90
+    assert {k for k in "abcd" if cache.get(k) is not None} == {"a", "c", "d"}
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.unit
+def test_client_serves_not_modified_pages_from_cache(cache: HTTPCache):
+    """Test that a 304 answer to a conditional request returns the cached body."""
+    cache.max_bytes = 1024
+    client = StravaClient(
+        StravaAPISettings(client_id="id", client_secret="secret"),
+        controls=RequestControls(retry_policy=RetryPolicy(backoff_seconds=0)),
+        http_cache=cache,
+    )
+    page = b'[{"id": 1}]'
+    client.session = Mock()
+    client.session.request.side_effect = [
+        _response(200, page, {"ETag": '"v1"'}),
+        _response(304),
+    ]
+    token = SecretStr("token")
+
+    first = client.get_activities(token, page=1, per_page=30)
+    second = client.get_activities(token, page=1, per_page=30)
+
+    assert first == second == [{"id": 1}]
+    revalidation = client.session.request.call_args_list[1]
+    assert revalidation.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert cache.stats.hits == 1
+    assert cache.stats.bytes_saved == len(page)
+
+
+@pytest.mark.unit
+def test_client_rejects_not_modified_without_cached_copy(cache: HTTPCache):
+    """Test that a 304 with nothing cached raises instead of decoding no body."""
+    client = StravaClient(
+        StravaAPISettings(client_id="id", client_secret="secret"),
+        controls=RequestControls(retry_policy=RetryPolicy(backoff_seconds=0)),
+        http_cache=cache,
+    )
+    client.session = Mock()
+    client.session.request.return_value = _response(304)
+
+    with pytest.raises(APIError) as excinfo:
+        client.get_activities(SecretStr("token"), page=1, per_page=30)
+
+    assert excinfo.value.status_code == 304
+    assert "If-None-Match" not in client.session.request.call_args.kwargs["headers"]
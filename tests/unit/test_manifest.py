@@ -0,0 +1,148 @@
+"""Unit tests for manifest module."""
+
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from strava_fetcher.manifest import StreamManifest, StreamRecord
+from strava_fetcher.persistence import ActivityPersistence
+
+
+@pytest.fixture
+def manifest(tmp_path: Path) -> Iterator[StreamManifest]:
+    """Provide a manifest backed by a temporary database."""
+    manifest = StreamManifest(tmp_path / "stream_index.sqlite")
+    yield manifest
+    manifest.close()
+
+
+@pytest.mark.unit
+def test_manifest_record_and_lookup(manifest: StreamManifest):
+    """Test that recorded streams are returned by the index lookup."""
+    record = StreamRecord(42, "stream_000000042.csv", "csv", 10, 200, "abc")
+
+    manifest.record(record)
+
+    assert manifest.activity_ids() == {42}
+    assert manifest.activity_ids("parquet") == set()
+    stored = manifest.get(42)
+    assert stored is not None
+    assert (stored.rows, stored.bytes, stored.checksum) == (10, 200, "abc")
+
+
+@pytest.mark.unit
+def test_manifest_rebuild_marks_built(manifest: StreamManifest):
+    """Test that rebuilding replaces entries and flags the manifest as built."""
+    manifest.record(StreamRecord(1, "stream_000000001.csv", "csv", 1, 1, "x"))
+    assert not manifest.is_built
+
+    count = manifest.rebuild(
+        [StreamRecord(2, "stream_000000002.csv", "csv", 1, 1, "y")]
+    )
+
+    assert count == 1
+    assert manifest.is_built
+    assert manifest.activity_ids() == {2}
+
+
+@pytest.mark.unit
+def test_persistence_populates_manifest_from_existing_files(
+    tmp_path: Path, manifest: StreamManifest, sample_stream_df
+):
+    """Test that streams written before the index existed are listed, not read."""
+    streams_dir = tmp_path / "Streams"
+    legacy = ActivityPersistence(None, streams_dir)
+    legacy.write_stream(7, sample_stream_df)
+    (streams_dir / "stream_000000008.csv").touch()  # empty files are ignored
+
+    persistence = ActivityPersistence(None, streams_dir, manifest=manifest)
+
+    with patch.object(
+        ActivityPersistence, "read_stream", side_effect=AssertionError("read")
+    ):
+        assert persistence.get_existing_stream_ids() == {7}
+    record = manifest.get(7)
+    assert record is not None
+    assert record.rows is None
+    assert record.bytes == (streams_dir / "stream_000000007.csv").stat().st_size
+
+    # The row count and stream types are filled in on first inspection.
+    keys = persistence.stored_stream_keys()[7]
+    record = manifest.get(7)
+    assert record is not None
+    assert (record.rows, record.keys) == (len(sample_stream_df), keys)
+
+
+@pytest.mark.unit
+def test_persistence_lookup_uses_index_not_directory(
+    tmp_path: Path, manifest: StreamManifest, sample_stream_df
+):
+    """Test that once built, lookups come from the index until rebuilt."""
+    streams_dir = tmp_path / "Streams"
+    persistence = ActivityPersistence(None, streams_dir, manifest=manifest)
+    persistence.get_existing_stream_ids()  # builds the (empty) index
+
+    persistence.write_stream(7, sample_stream_df)
+    (streams_dir / "stream_000000007.csv").unlink()
+
+    assert persistence.get_existing_stream_ids() == {7}
+    persistence.rebuild_stream_index()
+    assert persistence.get_existing_stream_ids() == set()
+
+
+@pytest.mark.unit
+def test_manifest_records_stream_options(manifest: StreamManifest):
+    """Test that requested stream types and resolution are stored."""
+    manifest.record(
+        StreamRecord(
+            5,
+            "stream_000000005.csv",
+            "csv",
+            1,
+            1,
+            "z",
+            0.0,
+            keys=("time", "watts"),
+            resolution="low",
+            series_type="distance",
+        )
+    )
+
+    stored = manifest.get(5)
+
+    assert stored is not None
+    assert stored.keys == ("time", "watts")
+    assert (stored.resolution, stored.series_type) == ("low", "distance")
+
+
+@pytest.mark.unit
+def test_manifest_upgrades_earlier_schema(tmp_path: Path):
+    """Test that manifests written before stream options existed still open."""
+    db_path = tmp_path / "stream_index.sqlite"
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            "CREATE TABLE streams (activity_id INTEGER PRIMARY KEY, "
+            "path TEXT NOT NULL, format TEXT NOT NULL, rows INTEGER NOT NULL, "
+            "bytes INTEGER NOT NULL, checksum TEXT NOT NULL, "
+            "written_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO streams VALUES (1, 'stream_000000001.csv', 'csv', 1, 1, "
+            "'x', 0)"
+        )
+    conn.close()
+    manifest = StreamManifest(db_path)
+
+    stored = manifest.get(1)
+    manifest.record(StreamRecord(2, "b", "csv", 1, 1, "y", keys=("watts",)))
+    manifest.record(StreamRecord(3, "c", "csv", None, 1, None))
+
+    assert stored is not None
+    assert (stored.rows, stored.keys) == (1, ())
+    assert manifest.get(2).keys == ("watts",)  # type: ignore[union-attr]
+    assert manifest.get(3).rows is None  # type: ignore[union-attr]
+    manifest.close()
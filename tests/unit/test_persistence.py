@@ -1,11 +1,22 @@
 """Unit tests for persistence module."""
 
+import threading
 from pathlib import Path
+from unittest.mock import patch
 
+import pandas as pd
 import pytest
 
+from strava_fetcher.exceptions import StreamMismatchError
 from strava_fetcher.models import Token
-from strava_fetcher.persistence import TokenPersistence
+from strava_fetcher.persistence import (
+    ActivityPersistence,
+    PartitionedActivityStore,
+    SyncStatePersistence,
+    TokenPersistence,
+)
+from strava_fetcher.storage import CSVBackend
+from strava_fetcher.streams import StreamOptions, decode_streams
 
 
 @pytest.mark.unit
@@ -86,3 +97,256 @@ def test_token_persistence_none_path():
         token_type="Bearer",
     )
     persistence.write(sample_token)  # Should not raise
+
+
+@pytest.mark.unit
+def test_token_persistence_write_replaces_file_atomically(
+    tmp_path: Path, sample_token_data: dict
+):
+    """Test that writing a token leaves no temporary files behind."""
+    token_path = tmp_path / "token.json"
+    token_path.write_text("old contents")
+    persistence = TokenPersistence(token_path)
+
+    persistence.write(Token(**sample_token_data))
+
+    assert persistence.read() is not None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["token.json"]
+
+
+@pytest.mark.unit
+def test_token_persistence_lock_is_exclusive(tmp_path: Path):
+    """Test that a second holder waits until the lock is released."""
+    first = TokenPersistence(tmp_path / "token.json")
+    second = TokenPersistence(tmp_path / "token.json")
+    events: list[str] = []
+
+    def contend() -> None:
+        with second.lock():
+            events.append("second")
+
+    with first.lock():
+        thread = threading.Thread(target=contend)
+        thread.start()
+        thread.join(timeout=0.1)
+        events.append("first")
+    thread.join()
+
+    assert events == ["first", "second"]
+
+
+@pytest.mark.unit
+def test_sync_state_persistence_round_trip(tmp_path: Path):
+    """Test writing and reading the activities high-water mark."""
+    persistence = SyncStatePersistence(tmp_path / "state" / "sync_state.json")
+
+    assert persistence.read_activities_after() is None
+
+    persistence.write_activities_after(1705741200)
+
+    assert persistence.read_activities_after() == 1705741200
+
+
+@pytest.mark.unit
+def test_sync_state_persistence_invalid_json(tmp_path: Path):
+    """Test that a corrupt state file is treated as empty."""
+    state_path = tmp_path / "sync_state.json"
+    state_path.write_text("not valid json", encoding="utf-8")
+
+    assert SyncStatePersistence(state_path).read() == {}
+
+
+@pytest.mark.unit
+def test_upsert_activities_replaces_changed_rows(
+    tmp_path: Path, sample_activities_df: pd.DataFrame
+):
+    """Test that upserting into the single cache file replaces rows by id."""
+    persistence = ActivityPersistence(tmp_path / "activities.csv", None)
+    persistence.write_cache(sample_activities_df)
+
+    changed = sample_activities_df.iloc[[0]].assign(name="Renamed Ride")
+    persistence.upsert_activities(changed)
+
+    cached = persistence.read_cache()
+    assert len(cached) == 3
+    assert cached.set_index("id").loc[12345678, "name"] == "Renamed Ride"
+
+
+@pytest.mark.unit
+def test_partitioned_store_only_rewrites_touched_partitions(
+    tmp_path: Path, sample_activities_df: pd.DataFrame
+):
+    """Test that an upsert leaves unrelated partitions untouched."""
+    store = PartitionedActivityStore(tmp_path / "Activities", CSVBackend(), "month")
+    older = sample_activities_df.assign(start_date="2023-06-01T08:00:00Z")
+    older["id"] = older["id"] + 100
+    store.upsert(older)
+    store.upsert(sample_activities_df)
+    june = tmp_path / "Activities" / "activities_2023-06.csv"
+    june_mtime = june.stat().st_mtime_ns
+
+    changed = sample_activities_df.iloc[[1]].assign(name="Renamed Run")
+    rewritten = store.upsert(changed)
+
+    assert rewritten == 1
+    assert june.stat().st_mtime_ns == june_mtime
+    cached = store.read_all()
+    assert len(cached) == 6
+    assert cached.set_index("id").loc[12345679, "name"] == "Renamed Run"
+
+
+@pytest.mark.unit
+def test_partitioned_store_moves_activity_to_new_partition(
+    tmp_path: Path, sample_activities_df: pd.DataFrame
+):
+    """Test that an activity whose start date moved is not stored twice."""
+    store = PartitionedActivityStore(tmp_path / "Activities", CSVBackend(), "year")
+    older = sample_activities_df.iloc[[1]].assign(start_date="2021-06-01T08:00:00Z")
+    older["id"] = older["id"] + 100
+    store.upsert(pd.concat([sample_activities_df, older]))
+    store.close()
+
+    moved = sample_activities_df.iloc[[0]].assign(start_date="2023-12-31T08:00:00Z")
+    reopened = PartitionedActivityStore(tmp_path / "Activities", CSVBackend(), "year")
+    with patch.object(
+        CSVBackend, "read", autospec=True, side_effect=CSVBackend.read
+    ) as read:
+        rewritten = reopened.upsert(moved)
+
+    assert rewritten == 2
+    assert sorted(call.args[1].name for call in read.call_args_list) == [
+        "activities_2024.csv"
+    ]
+    cached = reopened.read_all()
+    reopened.close()
+    assert sorted(cached["id"]) == sorted([*sample_activities_df["id"], *older["id"]])
+    assert cached.set_index("id").loc[moved["id"].iloc[0], "start_date"] == (
+        "2023-12-31T08:00:00Z"
+    )
+
+
+@pytest.mark.unit
+def test_partitioned_store_migrates_legacy_cache(
+    tmp_path: Path, sample_activities_df: pd.DataFrame
+):
+    """Test that an existing single-file cache is split into partitions once."""
+    legacy_file = tmp_path / "activities.csv"
+    ActivityPersistence(legacy_file, None).write_cache(sample_activities_df)
+    store = PartitionedActivityStore(
+        tmp_path / "Activities", CSVBackend(), "year", legacy_cache_file=legacy_file
+    )
+
+    cached = store.read_all()
+
+    assert sorted(cached["id"]) == sorted(sample_activities_df["id"])
+    assert (tmp_path / "Activities" / "activities_2024.csv").is_file()
+
+
+@pytest.mark.unit
+def test_interrupted_stream_write_is_not_treated_as_stored(tmp_path: Path):
+    """Test that a write killed part way leaves no stream file to pick up."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    stream_df = decode_streams({"time": {"data": [0, 1]}})
+    persistence.write_stream(1, stream_df)
+
+    with patch("strava_fetcher.atomic.os.replace", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            persistence.write_stream(2, stream_df)
+    persistence.close()
+
+    assert persistence.get_existing_stream_ids() == {1}
+    assert [p.name for p in (tmp_path / "Streams").iterdir()] == [
+        "stream_000000001.csv"
+    ]
+
+
+@pytest.mark.unit
+def test_streams_missing_keys_inspects_unrecorded_streams(tmp_path: Path):
+    """Test that streams without a manifest are checked by their columns."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(
+        1, decode_streams({"time": {"data": [0]}, "latlng": {"data": [[1.0, 2.0]]}})
+    )
+
+    assert persistence.stored_stream_keys() == {1: ("time", "latlng")}
+    assert persistence.streams_missing_keys(["latlng", "watts", "time"]) == {
+        1: ("watts",)
+    }
+
+
+@pytest.mark.unit
+def test_merge_stream_replaces_and_adds_columns(tmp_path: Path):
+    """Test that merged columns overwrite stored ones and pad shorter streams."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(
+        1, decode_streams({"time": {"data": [0, 1, 2]}, "watts": {"data": [1, 2, 3]}})
+    )
+
+    persistence.merge_stream(
+        1,
+        decode_streams({"watts": {"data": [7, 8, 9]}, "cadence": {"data": [80, 81]}}),
+        StreamOptions(("watts", "cadence")),
+    )
+
+    arrays = persistence.read_stream(1)
+    assert arrays is not None
+    assert list(arrays) == ["time", "watts", "cadence"]
+    assert arrays["watts"].tolist() == [7, 8, 9]
+    assert arrays["cadence"][:2].tolist() == [80, 81]
+
+
+@pytest.mark.unit
+def test_requested_keys_are_logged_without_manifest(tmp_path: Path):
+    """Test that keys without data are not requested again without a manifest."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(
+        1, decode_streams({"time": {"data": [0]}}), StreamOptions(("time", "temp"))
+    )
+
+    reopened = ActivityPersistence(None, tmp_path / "Streams")
+    assert reopened.stored_stream_keys() == {1: ("time", "temp")}
+    assert reopened.streams_missing_keys(["time", "temp"]) == {}
+
+
+@pytest.mark.unit
+def test_streams_missing_keys_requests_all_keys_at_other_resolution(
+    tmp_path: Path,
+):
+    """Test that streams stored at another resolution are fetched again in full."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(
+        1, decode_streams({"time": {"data": [0]}}), StreamOptions(("time", "temp"))
+    )
+
+    assert persistence.streams_missing_keys(["watts"], resolution="low") == {
+        1: ("watts", "time", "temp")
+    }
+
+
+@pytest.mark.unit
+def test_merge_stream_rejects_mismatched_streams(tmp_path: Path):
+    """Test that streams of another length or resolution are not merged."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(
+        1, decode_streams({"time": {"data": [0, 1, 2]}}), StreamOptions(("time",))
+    )
+
+    with pytest.raises(StreamMismatchError):
+        persistence.merge_stream(
+            1, decode_streams({"watts": {"data": [7, 8]}}), StreamOptions(("watts",))
+        )
+    with pytest.raises(StreamMismatchError):
+        persistence.merge_stream(
+            1,
+            decode_streams({"watts": {"data": [7, 8, 9]}}),
+            StreamOptions(("watts",), resolution="low"),
+        )
+    persistence.merge_stream(
+        1,
+        decode_streams({"time": {"data": [0, 1]}, "watts": {"data": [7, 8]}}),
+        StreamOptions(("time", "watts"), resolution="low"),
+    )
+
+    arrays = persistence.read_stream(1)
+    assert arrays is not None
+    assert arrays["watts"].tolist() == [7, 8]
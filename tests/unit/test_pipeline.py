@@ -0,0 +1,476 @@
+"""Unit tests for pipeline module."""
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from unittest.mock import Mock, patch
+
+import pytest
+
+from strava_fetcher.auth import TokenManager
+from strava_fetcher.exceptions import APIError, RateLimitError, UnauthorizedError
+from strava_fetcher.journal import DONE, FAILED, PENDING
+from strava_fetcher.models import Token
+from strava_fetcher.pipeline import StravaSyncPipeline
+from strava_fetcher.streams import StreamOptions, decode_streams
+
+
+@pytest.fixture
+def token() -> Token:
+    """Provide a non-expiring token."""
+    return Token(
+        access_token="test_access_token",
+        refresh_token="test_refresh_token",
+        expires_at=4102444800,
+    )
+
+
+@pytest.fixture
+def pipeline(
+    mock_settings, sample_activities_df, token
+) -> Iterator[StravaSyncPipeline]:
+    """Provide a pipeline whose client and persistence are mocked out."""
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.tokens.set(token)
+    pipeline.client = Mock()
+    pipeline.activity_persistence = Mock()
+    pipeline.activity_persistence.read_cache.return_value = sample_activities_df
+    pipeline.activity_persistence.get_existing_stream_ids.return_value = set()
+    yield pipeline
+    pipeline.close()
+
+
+@pytest.mark.unit
+def test_sync_streams_writes_every_missing_activity(pipeline):
+    """Test that each missing activity is fetched and written once."""
+    pipeline.client.get_activity_streams.return_value = {
+        "time": {"data": [0, 1, 2]},
+        "watts": {"data": [100, 110, 120]},
+    }
+
+    pipeline._sync_streams()
+
+    written_ids = sorted(
+        call.args[0]
+        for call in pipeline.activity_persistence.write_stream.call_args_list
+    )
+    assert written_ids == [12345678, 12345679, 12345680]
+    assert pipeline.writer_stats.written == 3
+
+
+@pytest.mark.unit
+def test_sync_streams_bounds_concurrency(pipeline):
+    """Test that no more than max_concurrent_requests run at the same time."""
+    pipeline.settings.sync.max_concurrent_requests = 2
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def slow_fetch(access_token, activity_id, options=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = slow_fetch
+
+    pipeline._sync_streams()
+
+    assert peak == 2
+    assert pipeline.activity_persistence.write_stream.call_count == 3
+
+
+@pytest.mark.unit
+def test_sync_streams_logs_and_continues_on_api_error(pipeline):
+    """Test that a failing activity does not prevent the others from syncing."""
+
+    def fetch(access_token, activity_id, options=None):
+        if activity_id == 12345679:
+            raise APIError(500, "boom")
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = fetch
+
+    pipeline._sync_streams()
+
+    assert pipeline.activity_persistence.write_stream.call_count == 2
+
+
+@pytest.mark.unit
+def test_sync_streams_records_and_skips_failures(pipeline):
+    """Test that failed activities are stored and skipped by the next sync."""
+
+    def fetch(access_token, activity_id, options=None):
+        if activity_id == 12345679:
+            raise APIError(404, "Record Not Found")
+        if activity_id == 12345680:
+            raise APIError(503, "unavailable")
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = fetch
+
+    pipeline._sync_streams()
+    pipeline.client.get_activity_streams.reset_mock()
+    pipeline._sync_streams()
+
+    records = {r.activity_id: r for r in pipeline.failures.records()}
+    assert records[12345679].permanent
+    assert not records[12345680].permanent
+    requested = [
+        call.args[1] for call in pipeline.client.get_activity_streams.call_args_list
+    ]
+    assert requested == [12345678]
+
+
+@pytest.mark.unit
+def test_retry_failed_fetches_recorded_activities(pipeline, token):
+    """Test that retry_failed ignores the schedule and clears recovered ones."""
+    pipeline.failures.record(12345679, APIError(404, "Record Not Found"))
+    pipeline.failures.record(12345680, APIError(503, "unavailable"))
+    pipeline.client.get_activity_streams.return_value = {"time": {"data": [0]}}
+
+    with patch.object(pipeline, "_get_valid_token", return_value=token):
+        recovered = pipeline.retry_failed()
+
+    assert recovered == 1
+    assert pipeline.failures.failed_ids(include_permanent=True) == [12345679]
+    pipeline.client.get_activity_streams.assert_called_once()
+
+
+@pytest.mark.unit
+def test_sync_streams_refreshes_token_once_on_unauthorized(pipeline, token):
+    """Test that workers hitting a 401 share one refresh and retry."""
+    fresh = Token(
+        access_token="fresh_access_token",
+        refresh_token="fresh_refresh_token",
+        expires_at=4102444800,
+    )
+    pipeline.client.refresh_token.return_value = fresh
+    pipeline.tokens = TokenManager(pipeline.client.refresh_token)
+    pipeline.tokens.set(token)
+
+    def fetch(access_token, activity_id, options=None):
+        if access_token == token.access_token:
+            time.sleep(0.02)
+            raise UnauthorizedError()
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = fetch
+
+    pipeline._sync_streams()
+
+    pipeline.client.refresh_token.assert_called_once()
+    assert pipeline.activity_persistence.write_stream.call_count == 3
+
+
+@pytest.mark.unit
+def test_sync_streams_stops_submitting_on_rate_limit(pipeline):
+    """Test that a rate-limit error halts new requests and is re-raised."""
+    pipeline.settings.sync.max_concurrent_requests = 1
+    pipeline.client.get_activity_streams.side_effect = RateLimitError()
+
+    with patch("strava_fetcher.pipeline.time.sleep") as mock_sleep:
+        with pytest.raises(RateLimitError):
+            pipeline._sync_streams()
+
+    assert pipeline.client.get_activity_streams.call_count == 1
+    mock_sleep.assert_called_once_with(60)
+
+
+@pytest.mark.unit
+def test_sync_streams_async_writes_every_missing_activity(pipeline):
+    """Test that the asyncio path fetches and writes each missing activity."""
+    client = Mock()
+
+    async def fetch(access_token, activity_id, options=None):
+        await asyncio.sleep(0)
+        if activity_id == 12345679:
+            raise APIError(500, "boom")
+        return {"time": {"data": [0, 1]}}
+
+    client.get_activity_streams = fetch
+
+    asyncio.run(pipeline._sync_streams_async(client))
+
+    written_ids = sorted(
+        call.args[0]
+        for call in pipeline.activity_persistence.write_stream.call_args_list
+    )
+    assert written_ids == [12345678, 12345680]
+
+
+@pytest.mark.unit
+def test_sync_activities_uses_high_water_mark(pipeline, mock_activity_response):
+    """Test that a routine sync only asks for activities after the last one."""
+    pipeline.sync_state = Mock()
+    pipeline.sync_state.read_activities_after.return_value = 1705000000
+    pipeline.client.get_activities.side_effect = [mock_activity_response, []]
+
+    pipeline._sync_activities()
+
+    for call in pipeline.client.get_activities.call_args_list:
+        assert call.kwargs["after"] == 1705000000
+    upserted_df = pipeline.activity_persistence.upsert_activities.call_args.args[0]
+    assert sorted(upserted_df["id"]) == [12345678, 12345679]
+    # Newest start_date among the fetched activities: 2024-01-16T18:00:00Z
+    pipeline.sync_state.write_activities_after.assert_called_once_with(1705428000)
+
+
+@pytest.mark.unit
+def test_sync_activities_falls_back_to_cache_high_water_mark(pipeline):
+    """Test that caches without a stored mark derive it from start_date."""
+    pipeline.sync_state = Mock()
+    pipeline.sync_state.read_activities_after.return_value = None
+    pipeline.client.get_activities.return_value = []
+
+    pipeline._sync_activities()
+
+    assert pipeline.client.get_activities.call_args.kwargs["after"] == 1705741200
+
+
+@pytest.mark.unit
+def test_sync_activities_full_walks_all_pages(pipeline):
+    """Test that a full sync does not send the after parameter."""
+    pipeline.sync_state = Mock()
+    pipeline.sync_state.read_activities_after.return_value = 1705000000
+    pipeline.client.get_activities.return_value = []
+
+    pipeline._sync_activities(full=True)
+
+    assert pipeline.client.get_activities.call_args.kwargs["after"] is None
+
+
+@pytest.mark.unit
+def test_sync_streams_records_progress_in_journal(pipeline):
+    """Test that every planned activity ends up done or failed in the journal."""
+
+    def fetch(access_token, activity_id, options=None):
+        if activity_id == 12345679:
+            raise APIError(500, "boom")
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = fetch
+
+    pipeline._sync_streams()
+
+    assert pipeline.journal.stream_plan_counts() == {DONE: 2, FAILED: 1}
+
+
+@pytest.mark.unit
+def test_sync_streams_resumes_from_journal(pipeline):
+    """Test that a rate-limited run resumes the pending plan without rescanning."""
+    pipeline.settings.sync.max_concurrent_requests = 1
+    calls = []
+
+    def fetch(access_token, activity_id, options=None):
+        calls.append(activity_id)
+        if len(calls) == 2:
+            raise RateLimitError()
+        return {"time": {"data": [0]}}
+
+    pipeline.client.get_activity_streams.side_effect = fetch
+
+    with patch("strava_fetcher.pipeline.time.sleep"):
+        with pytest.raises(RateLimitError):
+            pipeline._sync_streams()
+    assert pipeline.journal.stream_plan_counts() == {DONE: 1, PENDING: 2}
+
+    pipeline.activity_persistence.read_cache.reset_mock()
+    pipeline._sync_streams()
+
+    pipeline.activity_persistence.read_cache.assert_not_called()
+    assert calls == [12345678, 12345679, 12345679, 12345680]
+    assert pipeline.journal.stream_plan_counts() == {DONE: 3}
+
+
+@pytest.mark.unit
+def test_sync_activities_resumes_interrupted_walk(pipeline, mock_activity_response):
+    """Test that pages fetched before a crash are not requested again."""
+    pipeline.sync_state = Mock()
+    pipeline.sync_state.read_activities_after.return_value = None
+    pipeline.activity_persistence.read_cache.return_value = None
+    pipeline.client.get_activities.side_effect = [
+        mock_activity_response[:1],
+        ConnectionError("network down"),
+    ]
+
+    with pytest.raises(ConnectionError):
+        pipeline._sync_activities()
+
+    pipeline.client.get_activities.side_effect = [mock_activity_response[1:], []]
+    pipeline._sync_activities()
+
+    pages = [c.args[1] for c in pipeline.client.get_activities.call_args_list]
+    assert pages == [1, 2, 2, 3]
+    upserted_df = pipeline.activity_persistence.upsert_activities.call_args.args[0]
+    assert sorted(upserted_df["id"]) == [12345678, 12345679]
+
+
+@pytest.mark.unit
+def test_sync_activities_fetches_pages_in_growing_windows(pipeline):
+    """Test that full pages widen the window and pages are journaled in order."""
+    pipeline.settings.sync.activities_per_page = 2
+    pipeline.settings.sync.activity_page_window = 4
+    pipeline.sync_state = Mock()
+    pipeline.sync_state.read_activities_after.return_value = None
+    pipeline.activity_persistence.read_cache.return_value = None
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    requested = []
+
+    def get_activities(access_token, page, per_page, after):
+        nonlocal active, peak
+        with lock:
+            requested.append(page)
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        if page > 9:
+            return []
+        return [
+            {"id": page * 10 + i, "start_date": "2024-01-01T00:00:00Z"}
+            for i in range(2)
+        ]
+
+    pipeline.client.get_activities.side_effect = get_activities
+    pipeline.journal.record_activity_page = Mock(
+        wraps=pipeline.journal.record_activity_page
+    )
+
+    pipeline._sync_activities()
+
+    journaled = [
+        c.args[1] for c in pipeline.journal.record_activity_page.call_args_list
+    ]
+    assert journaled == list(range(1, 10))
+    assert 1 < peak <= 4
+    # At most one window of pages is requested past the end.
+    assert max(requested) <= 9 + 4
+    upserted_df = pipeline.activity_persistence.upsert_activities.call_args.args[0]
+    assert len(upserted_df) == 18
+
+
+@pytest.mark.unit
+def test_sync_streams_uses_configured_stream_options(mock_settings, token):
+    """Test that configured keys and resolution are requested and recorded."""
+    mock_settings.sync.stream_keys = ["watts", "heartrate"]
+    mock_settings.sync.stream_resolution = "medium"
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.tokens.set(token)
+    pipeline.client = Mock()
+    pipeline.client.get_activity_streams.return_value = {"watts": {"data": [1]}}
+    pipeline.activity_persistence = Mock()
+    pipeline.activity_persistence.get_existing_stream_ids.return_value = set()
+
+    pipeline._fetch_streams_concurrently([1])
+    pipeline.close()
+
+    options = pipeline.client.get_activity_streams.call_args.args[2]
+    assert options == StreamOptions(("watts", "heartrate"), "medium", None)
+    assert pipeline.activity_persistence.write_stream.call_args.args[2] == options
+
+
+@pytest.mark.unit
+def test_http_cache_is_disabled_while_recording_a_cassette(mock_settings):
+    """Test that a recorded cassette cannot depend on the local HTTP cache."""
+    mock_settings.strava_api.cassette_mode = "record"
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.close()
+
+    assert pipeline.http_cache is None
+    assert pipeline.client.http_cache is None
+
+
+@pytest.mark.unit
+def test_sync_streams_encodes_in_worker_processes(mock_settings, token):
+    """Test that streams encoded by the process pool are stored and indexed."""
+    mock_settings.sync.encoding_processes = 2
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.tokens.set(token)
+    pipeline.client = Mock()
+    pipeline.client.get_activity_streams.return_value = {
+        "time": {"data": [0, 1, 2]},
+        "watts": {"data": [100, 110, 120]},
+    }
+
+    pipeline._fetch_streams_concurrently([1, 2, 3])
+
+    assert pipeline._encoding_pool is not None
+    assert pipeline.writer_stats.written == 3
+    assert pipeline.activity_persistence.get_existing_stream_ids() == {1, 2, 3}
+    arrays = pipeline.activity_persistence.read_stream(2)
+    assert arrays is not None
+    assert list(arrays["watts"]) == [100, 110, 120]
+    pipeline.close()
+    assert pipeline._encoding_pool is None
+
+
+@pytest.mark.unit
+def test_backfill_stream_keys_fetches_only_missing_keys(mock_settings, token):
+    """Test that newly configured stream types are fetched and merged in."""
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.tokens.set(token)
+    pipeline.client = Mock()
+    persistence = pipeline.activity_persistence
+    stored = {"time": {"data": [0, 1, 2]}, "watts": {"data": [100, 110, 120]}}
+    persistence.write_stream(
+        1, decode_streams(stored), StreamOptions(("time", "watts"))
+    )
+    pipeline.stream_options = StreamOptions(("time", "watts", "heartrate", "temp"))
+    # The activity has no temperature data, so Strava omits that stream.
+    pipeline.client.get_activity_streams.return_value = {
+        "heartrate": {"data": [140, 141, 142]}
+    }
+
+    pipeline._backfill_stream_keys()
+    pipeline._backfill_stream_keys()
+
+    pipeline.client.get_activity_streams.assert_called_once()
+    options = pipeline.client.get_activity_streams.call_args.args[2]
+    assert options.keys == ("heartrate", "temp")
+    arrays = persistence.read_stream(1)
+    assert arrays is not None
+    assert list(arrays) == ["time", "watts", "heartrate"]
+    assert arrays["heartrate"].tolist() == [140, 141, 142]
+    pipeline.close()
+
+
+@pytest.mark.unit
+def test_backfill_stream_keys_refetches_mismatched_streams(mock_settings, token):
+    """Test that streams that do not line up are fetched again in full."""
+    pipeline = StravaSyncPipeline(mock_settings)
+    pipeline.tokens.set(token)
+    pipeline.client = Mock()
+    persistence = pipeline.activity_persistence
+    stored = {"time": {"data": [0, 1, 2]}, "watts": {"data": [100, 110, 120]}}
+    persistence.write_stream(
+        1, decode_streams(stored), StreamOptions(("time", "watts"))
+    )
+    pipeline.stream_options = StreamOptions(("time", "heartrate"))
+    # The activity was edited since: its streams now have four samples.
+    pipeline.client.get_activity_streams.side_effect = [
+        {"heartrate": {"data": [140, 141, 142, 143]}},
+        {
+            "time": {"data": [0, 1, 2, 3]},
+            "heartrate": {"data": [140, 141, 142, 143]},
+            "watts": {"data": [100, 110, 120, 130]},
+        },
+    ]
+
+    pipeline._backfill_stream_keys()
+
+    options = pipeline.client.get_activity_streams.call_args.args[2]
+    assert options.keys == ("time", "heartrate", "watts")
+    arrays = persistence.read_stream(1)
+    assert arrays is not None
+    assert arrays["watts"].tolist() == [100, 110, 120, 130]
+    assert persistence.streams_missing_keys(("time", "heartrate")) == {}
+    pipeline.close()
@@ -0,0 +1,123 @@
+"""Unit tests for ratelimit module."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from strava_fetcher.ratelimit import RateLimiter
+
+# 2024-01-15 08:05:00 UTC: ten minutes before the 08:15 short-window reset.
+NOW = datetime(2024, 1, 15, 8, 5, tzinfo=UTC).timestamp()
+
+
+class FakeClock:
+    """Controllable time source that advances when `sleep` is called."""
+
+    def __init__(self, now: float):
+        self.now = now
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.mark.unit
+def test_acquire_does_not_wait_with_budget_left():
+    """Test that requests within budget go out immediately."""
+    clock = FakeClock(NOW)
+    limiter = RateLimiter(short_limit=3, daily_limit=10, clock=clock)
+
+    for _ in range(3):
+        limiter.acquire(sleep=clock.sleep)
+
+    assert clock.sleeps == []
+    assert limiter.short.usage == 3
+
+
+@pytest.mark.unit
+def test_acquire_waits_until_exact_short_window_reset():
+    """Test that an exhausted short window waits until the quarter hour."""
+    clock = FakeClock(NOW)
+    limiter = RateLimiter(short_limit=2, daily_limit=10, clock=clock)
+
+    for _ in range(3):
+        limiter.acquire(sleep=clock.sleep)
+
+    assert clock.sleeps == [600]
+    assert limiter.short.usage == 1
+    assert limiter.daily.usage == 3
+
+
+@pytest.mark.unit
+def test_acquire_waits_until_midnight_for_daily_window():
+    """Test that an exhausted daily window waits until midnight UTC."""
+    clock = FakeClock(NOW)
+    limiter = RateLimiter(short_limit=100, daily_limit=1, clock=clock)
+
+    limiter.acquire(sleep=clock.sleep)
+    limiter.acquire(sleep=clock.sleep)
+
+    midnight = datetime(2024, 1, 16, tzinfo=UTC).timestamp()
+    assert clock.sleeps == [midnight - NOW]
+
+
+@pytest.mark.unit
+def test_update_from_headers_prefers_read_limits():
+    """Test that the stricter read-limit headers drive the budget."""
+    limiter = RateLimiter(clock=FakeClock(NOW))
+
+    limiter.update_from_headers(
+        {
+            "X-RateLimit-Limit": "200,2000",
+            "X-RateLimit-Usage": "10,100",
+            "X-ReadRateLimit-Limit": "100,1000",
+            "X-ReadRateLimit-Usage": "95,400",
+        }
+    )
+
+    assert (limiter.short.limit, limiter.short.usage) == (100, 95)
+    assert (limiter.daily.limit, limiter.daily.usage) == (1000, 400)
+    assert limiter.short.remaining == 5
+
+
+@pytest.mark.unit
+def test_update_from_headers_never_lowers_local_usage():
+    """Test that in-flight reservations are not erased by older server counts."""
+    clock = FakeClock(NOW)
+    limiter = RateLimiter(clock=clock)
+    for _ in range(5):
+        limiter.acquire(sleep=clock.sleep)
+
+    limiter.update_from_headers(
+        {"X-RateLimit-Limit": "100,1000", "X-RateLimit-Usage": "2,2"}
+    )
+
+    assert limiter.short.usage == 5
+
+
+@pytest.mark.unit
+def test_update_from_headers_ignores_missing_or_malformed_values():
+    """Test that absent or garbled headers leave the budget unchanged."""
+    limiter = RateLimiter(short_limit=50, clock=FakeClock(NOW))
+
+    limiter.update_from_headers({})
+    limiter.update_from_headers(
+        {"X-RateLimit-Limit": "abc", "X-RateLimit-Usage": "1,2"}
+    )
+
+    assert limiter.short.limit == 50
+    assert limiter.short.usage == 0
+
+
+@pytest.mark.unit
+def test_mark_exhausted_reports_time_until_reset():
+    """Test that a 429 makes the limiter wait for the short window reset."""
+    limiter = RateLimiter(clock=FakeClock(NOW))
+
+    limiter.mark_exhausted()
+
+    assert limiter.seconds_until_available() == 600
@@ -0,0 +1,46 @@
+"""Unit tests for retry module."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from strava_fetcher.retry import RetryPolicy, parse_retry_after
+
+
+@pytest.mark.unit
+def test_backoff_grows_exponentially_up_to_the_cap():
+    """Test that the jitter bound doubles per attempt and is capped."""
+    policy = RetryPolicy(max_retries=10, backoff_seconds=1.0, max_backoff_seconds=5.0)
+    upper = [policy.next_delay(n, uniform=lambda a, b: b) for n in range(1, 6)]
+
+    assert upper == [1.0, 2.0, 4.0, 5.0, 5.0]
+    assert policy.next_delay(3, uniform=lambda a, b: a) == 0.0
+
+
+@pytest.mark.unit
+def test_no_delay_once_retries_are_used_up():
+    """Test that the policy gives up after `max_retries` retries."""
+    policy = RetryPolicy(max_retries=2)
+
+    assert policy.next_delay(2) is not None
+    assert policy.next_delay(3) is None
+
+
+@pytest.mark.unit
+def test_retry_after_takes_precedence():
+    """Test that Retry-After is honoured, unless it exceeds the longest backoff."""
+    policy = RetryPolicy(max_backoff_seconds=60.0)
+
+    assert policy.next_delay(1, {"Retry-After": "7"}) == 7.0
+    assert policy.next_delay(1, {"Retry-After": "3600"}) is None
+
+
+@pytest.mark.unit
+def test_parse_retry_after_accepts_http_dates():
+    """Test that both delta-seconds and HTTP-date forms are understood."""
+    now = datetime(2024, 1, 15, 8, 0, 0, tzinfo=UTC)
+
+    assert parse_retry_after("Mon, 15 Jan 2024 08:00:30 GMT", now) == 30.0
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
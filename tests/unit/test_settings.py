@@ -3,10 +3,11 @@
 import os
 from pathlib import Path
 
+import pytest
 import yaml
-from pydantic import SecretStr
+from pydantic import SecretStr, ValidationError
 
-from strava_fetcher.settings import load_settings
+from strava_fetcher.settings import SyncSettings, load_settings
 
 
 def test_load_from_env_vars(monkeypatch):
@@ -129,3 +130,13 @@ def test_sync_config_defaults(mock_settings):
     assert settings.sync.max_pages > 0
     assert settings.sync.retry_interval_seconds > 0
     assert isinstance(settings.sync.skip_trainer_activities, bool)
+
+
+def test_stream_keys_are_validated():
+    """Test that unknown stream keys are rejected and duplicates dropped."""
+    assert SyncSettings(stream_keys=["watts", "time", "watts"]).stream_keys == [
+        "watts",
+        "time",
+    ]
+    with pytest.raises(ValidationError, match="Unknown stream keys"):
+        SyncSettings(stream_keys=["power"])
@@ -0,0 +1,129 @@
+"""Unit tests for storage module."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strava_fetcher.exceptions import ConfigError
+from strava_fetcher.persistence import ActivityPersistence
+from strava_fetcher.storage import (
+    BinaryBackend,
+    CSVBackend,
+    get_storage_backend,
+    get_stream_backend,
+)
+from strava_fetcher.streams import decode_streams
+
+
+@pytest.mark.unit
+def test_csv_backend_matches_legacy_format(tmp_path: Path, sample_stream_df):
+    """Test that the CSV backend writes the same bytes as before."""
+    legacy_path = tmp_path / "legacy.csv"
+    sample_stream_df.to_csv(legacy_path, sep=";", index=True)
+
+    new_path = tmp_path / "new.csv"
+    CSVBackend().write(sample_stream_df, new_path, index=True)
+
+    assert new_path.read_bytes() == legacy_path.read_bytes()
+
+
+@pytest.mark.unit
+def test_csv_backend_encode_decode_round_trip(sample_activities_df):
+    """Test that encoded CSV bytes decode to the same frame."""
+    backend = CSVBackend()
+
+    decoded = backend.decode(backend.encode(sample_activities_df))
+
+    pd.testing.assert_frame_equal(decoded, sample_activities_df)
+
+
+@pytest.mark.unit
+def test_unknown_storage_format():
+    """Test that an unknown format raises a configuration error."""
+    with pytest.raises(ConfigError):
+        get_storage_backend("xlsx")
+
+
+@pytest.mark.unit
+def test_parquet_backend_preserves_dtypes(tmp_path: Path, sample_activities_df):
+    """Test that Parquet round trips keep column dtypes."""
+    pytest.importorskip("pyarrow")
+    backend = get_storage_backend("parquet")
+    path = tmp_path / "activities.parquet"
+
+    backend.write(sample_activities_df, path)
+
+    pd.testing.assert_frame_equal(backend.read(path), sample_activities_df)
+
+
+@pytest.mark.unit
+def test_activity_persistence_with_parquet(tmp_path: Path, sample_stream_df):
+    """Test that streams are stored and discovered with the backend extension."""
+    pytest.importorskip("pyarrow")
+    streams_dir = tmp_path / "Streams"
+    persistence = ActivityPersistence(
+        tmp_path / "activities.parquet",
+        streams_dir,
+        backend=get_storage_backend("parquet"),
+    )
+
+    persistence.write_stream(42, sample_stream_df)
+
+    assert (streams_dir / "stream_000000042.parquet").is_file()
+    assert persistence.get_existing_stream_ids() == {42}
+    stored = persistence.backend.read(streams_dir / "stream_000000042.parquet")
+    pd.testing.assert_frame_equal(stored, sample_stream_df)
+
+
+@pytest.mark.unit
+def test_binary_backend_round_trip(mock_stream_response: dict):
+    """Test that typed stream columns survive the binary format unchanged."""
+    backend = get_stream_backend("binary")
+    stream_df = decode_streams(mock_stream_response)
+
+    decoded = backend.decode(backend.encode(stream_df, index=True))
+
+    pd.testing.assert_frame_equal(decoded, stream_df)
+
+
+@pytest.mark.unit
+def test_binary_backend_rejects_text_columns():
+    """Test that non-numeric columns are refused instead of pickled."""
+    with pytest.raises(ValueError, match="unsupported dtype"):
+        BinaryBackend().encode(pd.DataFrame({"name": ["a", "b"]}))
+
+
+@pytest.mark.unit
+def test_read_stream_returns_memory_mapped_views(
+    tmp_path: Path, mock_stream_response: dict
+):
+    """Test that binary streams are read back as read-only memmap views."""
+    persistence = ActivityPersistence(
+        None, tmp_path / "Streams", stream_backend=BinaryBackend()
+    )
+    persistence.write_stream(42, decode_streams(mock_stream_response))
+
+    arrays = persistence.read_stream(42)
+
+    assert (tmp_path / "Streams" / "stream_000000042.bin").is_file()
+    assert persistence.get_existing_stream_ids() == {42}
+    assert arrays is not None
+    assert isinstance(arrays["time"], np.memmap)
+    assert not arrays["time"].flags.writeable
+    assert arrays["time"].dtype == np.int32
+    assert arrays["heartrate"][:3].tolist() == [140, 141, 142]
+    assert persistence.read_stream(43) is None
+
+
+@pytest.mark.unit
+def test_read_stream_from_csv(tmp_path: Path, sample_stream_df):
+    """Test that read_stream drops the index column of CSV stream files."""
+    persistence = ActivityPersistence(None, tmp_path / "Streams")
+    persistence.write_stream(7, sample_stream_df)
+
+    arrays = persistence.read_stream(7)
+
+    assert arrays is not None
+    assert list(arrays) == list(sample_stream_df.columns)
@@ -0,0 +1,117 @@
+"""Unit tests for streams module."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strava_fetcher.storage import CSVBackend
+from strava_fetcher.streams import decode_stream_body, decode_streams
+
+
+@pytest.mark.unit
+def test_decode_streams_types(mock_stream_response: dict):
+    """Test that each stream becomes a typed column."""
+    df = decode_streams(mock_stream_response)
+
+    assert list(df.columns) == list(mock_stream_response)
+    assert len(df) == 3600
+    assert df["time"].dtype == np.int32
+    assert df["heartrate"].dtype == np.int32
+    assert df["distance"].dtype == np.float32
+    assert df["temp"].dtype == np.float32
+    assert df["moving"].dtype == bool
+    assert df["distance"].iloc[10] == pytest.approx(70.0)
+
+
+@pytest.mark.unit
+def test_decode_streams_splits_latlng():
+    """Test that latlng pairs become lat/lng float64 columns in place."""
+    df = decode_streams(
+        {
+            "time": {"data": [0, 1]},
+            "latlng": {"data": [[51.501234, -0.123456], [51.501299, -0.123401]]},
+            "altitude": {"data": [10.0, 11.0]},
+        }
+    )
+
+    assert list(df.columns) == ["time", "lat", "lng", "altitude"]
+    assert df["lat"].dtype == np.float64
+    assert df["lng"].tolist() == [-0.123456, -0.123401]
+
+
+@pytest.mark.unit
+def test_decode_streams_gaps_and_ragged_lengths():
+    """Test that nulls, short streams and empty streams are handled."""
+    df = decode_streams(
+        {
+            "time": {"data": [0, 1, 2]},
+            "latlng": {"data": [[51.5, -0.1], None, [51.6, -0.2]]},
+            "watts": {"data": [200, None, 210]},
+            "heartrate": {"data": [140, 141]},
+            "moving": {"data": [True, False]},
+            "cadence": {"data": []},
+        }
+    )
+
+    assert len(df) == 3
+    assert "cadence" not in df.columns
+    assert np.isnan(df["lat"].iloc[1])
+    assert df["watts"].dtype == np.float32
+    assert np.isnan(df["watts"].iloc[1])
+    assert df["heartrate"].iloc[:2].tolist() == [140.0, 141.0]
+    assert np.isnan(df["heartrate"].iloc[2])
+    assert df["moving"].isna().tolist() == [False, False, True]
+
+
+@pytest.mark.unit
+def test_decoded_streams_round_trip_through_csv(mock_stream_response: dict):
+    """Test that float32 columns are written without spurious digits."""
+    backend = CSVBackend()
+    df = decode_streams(mock_stream_response)
+
+    text = backend.encode(df.head(2), index=True).decode("utf-8")
+
+    assert text.splitlines()[2].startswith("1;1;7.0;100.5;7.5;141;81;201;20.5;True;")
+    assert len(backend.decode(backend.encode(df, index=True))) == 3600
+
+
+@pytest.mark.unit
+def test_decode_empty_payload():
+    """Test that an empty payload yields an empty frame."""
+    assert decode_streams({}).empty
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 30])
+def test_decode_stream_body_matches_json_decoding(chunk_size: int):
+    """Test that incremental decoding gives the same frame for any chunking."""
+    payload = {
+        "time": {"data": [0, 1, 2, 3], "series_type": "distance"},
+        "latlng": {"data": [[47.1, 8.5], None, [47.2, 8.6], [47.3, 8.7]]},
+        "heartrate": {"data": [140, None, 142, 143], "original_size": 4},
+        "moving": {"data": [True, False, None, True], "resolution": "high"},
+        "altitude": {"data": [], "series_type": "distance"},
+        "distance": {"data": [0.0, 1.5e1, -2.25, 3]},
+    }
+    body = json.dumps(payload, indent=1).encode()
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    decoded = decode_stream_body(chunks)
+
+    assert decoded["time"]["series_type"] == "distance"
+    assert decoded["heartrate"]["original_size"] == 4
+    assert isinstance(decoded["time"]["data"], np.ndarray)
+    pd.testing.assert_frame_equal(decode_streams(decoded), decode_streams(payload))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "body",
+    [b'{"time": {"data": [0, 1, 2]', b"[1, 2, 3]", b'{"time": {"data": [0, x]}}'],
+)
+def test_decode_stream_body_rejects_malformed_payloads(body: bytes):
+    """Test that truncated or malformed bodies raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_stream_body([body])
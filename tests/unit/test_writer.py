@@ -0,0 +1,85 @@
+"""Unit tests for writer module."""
+
+import threading
+import time
+
+import pytest
+
+from strava_fetcher.writer import StreamWriter
+
+
+@pytest.mark.unit
+def test_stream_writer_stores_every_payload_in_order():
+    """Test that queued payloads are all written before close returns."""
+    stored: list[int] = []
+    writer_threads: set[str] = set()
+
+    def store(activity_id, streams_data, options):
+        writer_threads.add(threading.current_thread().name)
+        stored.append(activity_id)
+
+    with StreamWriter(store, on_error=lambda *_: None) as writer:
+        for activity_id in range(10):
+            writer.submit(activity_id, {}, None)
+
+    assert stored == list(range(10))
+    assert writer_threads == {"stream-writer"}
+    assert writer.stats.submitted == writer.stats.written == 10
+
+
+@pytest.mark.unit
+def test_stream_writer_reports_failures():
+    """Test that a failing write is passed to `on_error` and writing continues."""
+    errors: list[tuple[int, Exception]] = []
+
+    def store(activity_id, streams_data, options):
+        if activity_id == 1:
+            raise OSError("disk full")
+
+    with StreamWriter(store, on_error=lambda i, e: errors.append((i, e))) as writer:
+        for activity_id in range(3):
+            writer.submit(activity_id, {}, None)
+
+    assert [activity_id for activity_id, _ in errors] == [1]
+    assert writer.stats.written == 2
+    assert writer.stats.failed == 1
+
+
+@pytest.mark.unit
+def test_stream_writer_survives_a_failing_error_handler():
+    """Test that a raising `on_error` neither stops writing nor blocks producers."""
+    stored: list[int] = []
+
+    def store(activity_id, streams_data, options):
+        if activity_id % 2:
+            raise OSError("disk full")
+        stored.append(activity_id)
+
+    def on_error(activity_id, error):
+        raise RuntimeError(f"cannot record failure of {activity_id}")
+
+    writer = StreamWriter(store, on_error=on_error, max_queue_size=1).start()
+    for activity_id in range(6):
+        writer.submit(activity_id, {}, None)
+
+    with pytest.raises(RuntimeError, match="failure of 1"):
+        writer.close()
+    assert stored == [0, 2, 4]
+    assert writer.stats.failed == 3
+
+
+@pytest.mark.unit
+def test_stream_writer_applies_backpressure():
+    """Test that producers block once the queue is full."""
+
+    def slow_store(activity_id, streams_data, options):
+        time.sleep(0.02)
+
+    with StreamWriter(slow_store, on_error=lambda *_: None, max_queue_size=2) as writer:
+        for activity_id in range(6):
+            writer.submit(activity_id, {}, None)
+            assert writer.depth <= 2
+
+    assert writer.stats.max_depth <= 2
+    assert writer.stats.producer_wait_seconds > 0
+    assert writer.stats.written == 6